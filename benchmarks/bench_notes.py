@@ -0,0 +1,118 @@
+"""
+Notes read/write throughput under parallel load.
+
+Compares the shared thread-local WAL connections in utils/database.py with
+the previous connect-per-call rollback-journal behaviour.
+
+Usage: poetry run python benchmarks/bench_notes.py [--threads 8] [--ops 2000]
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from budget_tracker_api.app.utils import database
+
+
+def legacy_save_note(db_file: Path, year: str, month: str, notes: str) -> None:
+    """save_note as it was before the connection manager."""
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO spending_notes (year, month, notes, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(year, month)
+        DO UPDATE SET notes = excluded.notes, updated_at = CURRENT_TIMESTAMP
+    """, (year, month, notes))
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_note(db_file: Path, year: str, month: str) -> None:
+    """get_note as it was before the connection manager."""
+    conn = sqlite3.connect(db_file)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT notes FROM spending_notes
+        WHERE year = ? AND month = ?
+    """, (year, month))
+    cursor.fetchone()
+    conn.close()
+
+
+def run(name: str, save, get, threads: int, ops: int, write_ratio: float) -> dict:
+    """Run `ops` mixed note operations on `threads` workers."""
+    errors = 0
+
+    def op(i: int) -> None:
+        nonlocal errors
+        month = f"{i % 12 + 1:02d}"
+        try:
+            if (i % 100) < write_ratio * 100:
+                save("2025", month, f"note {i}")
+            else:
+                get("2025", month)
+        except sqlite3.OperationalError:
+            errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(op, range(ops)))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "mode": name,
+        "threads": threads,
+        "ops": ops,
+        "seconds": round(elapsed, 3),
+        "ops_per_second": round(ops / elapsed),
+        "locked_errors": errors,
+    }
+    print(
+        f"{name:>8}: {result['ops_per_second']:>7} ops/s "
+        f"({elapsed:.2f}s, {errors} 'database is locked' errors)"
+    )
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = Path(tmp) / "legacy.db"
+        database.DATA_DIR = Path(tmp)
+        database.DB_FILE = legacy_db
+        database.init_db()
+        database.close_connection()
+        # init_db switched the file to WAL, put it back to the default journal
+        sqlite3.connect(legacy_db).execute("PRAGMA journal_mode = DELETE").close()
+
+        run(
+            "legacy",
+            lambda y, m, n: legacy_save_note(legacy_db, y, m, n),
+            lambda y, m: legacy_get_note(legacy_db, y, m),
+            args.threads,
+            args.ops,
+            args.write_ratio,
+        )
+
+        database.DB_FILE = Path(tmp) / "managed.db"
+        database.init_db()
+        run(
+            "managed",
+            database.save_note,
+            database.get_note,
+            args.threads,
+            args.ops,
+            args.write_ratio,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Cold start: app import time, and whether cached routes load the plaid SDK.
+
+Imports budget_tracker_api.app.main in fresh interpreters and compares the
+median import time with a budget. Then it boots the app on a seeded
+throwaway store, serves a cached /api/transactions month and /api/notes, and
+checks that the plaid SDK was never imported. Exits non-zero when either
+check fails.
+
+Usage: poetry run python benchmarks/bench_startup.py [--runs 5] [--budget-ms 800]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import orjson
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+ACCOUNT_NAME = "Plaid Credit Card"
+
+
+def probe_import() -> dict:
+    """Runs in a fresh interpreter: time the app import alone."""
+    start = time.perf_counter()
+    import budget_tracker_api.app.main  # noqa: F401
+
+    return {
+        "import_seconds": time.perf_counter() - start,
+        "modules": len(sys.modules),
+        "plaid_loaded": "plaid" in sys.modules,
+        "pyarrow_loaded": "pyarrow" in sys.modules,
+    }
+
+
+def probe_serve() -> dict:
+    """Runs in a fresh interpreter: serve cached routes from a seeded store."""
+    sys.path.insert(0, str(BENCHMARKS_DIR))
+    from bench_transactions import AppClient, start_app
+    from fake_plaid import ACCOUNTS, FakePlaidData, account_json
+
+    from budget_tracker_api.app.utils import (
+        database,
+        encryption,
+        file_locks,
+        metrics,
+        storage,
+    )
+
+    os.environ.update(ACCOUNT_TO_FILTER=ACCOUNT_NAME, PREFETCH_ENABLED="0")
+    tmp = tempfile.TemporaryDirectory()
+    data_dir = Path(tmp.name)
+    database.DATA_DIR = storage.DATA_DIR = data_dir
+    database.DB_FILE = data_dir / "budget_tracker.db"
+    storage.ACCESS_TOKEN_FILE = data_dir / "access-token.json"
+    storage.CACHE_DIR = data_dir / "transactions"
+    storage.SYNC_CURSOR_FILE = data_dir / "sync-cursors.json"
+    file_locks.LOCK_DIR = data_dir / "locks"
+    metrics.METRICS_DIR = data_dir / "metrics"
+    encryption.TOKEN_KEY_FILE = data_dir / "token.key"
+
+    start = time.perf_counter()
+    from budget_tracker_api.app import main
+
+    server, port = start_app(main.app)
+    boot_seconds = time.perf_counter() - start
+
+    # Seed what a previous run would have cached: item, accounts and a month
+    storage.save_access_token("access-sandbox-fake", "item-fake")
+    accounts = [account_json(index) for index in range(len(ACCOUNTS))]
+    for account in accounts:
+        account["item_id"] = "item-fake"
+    database.save_accounts("item-fake", accounts, time.time())
+    data = FakePlaidData(2000, 1)
+    year, month = data.rows[-1][0][:4], data.rows[-1][0][5:7]
+    transactions = [
+        data.transaction(row)
+        for row in data.between(f"{year}-{month}-01", f"{year}-{month}-31", None)
+        if ACCOUNTS[row[2]][1] == ACCOUNT_NAME
+    ]
+    storage.save_cached_transactions(ACCOUNT_NAME, year, month, transactions)
+    storage.mark_month_fetched(ACCOUNT_NAME, year, month)
+
+    client = AppClient(port)
+    timings = {}
+    for name, path in (
+        ("transactions", f"/api/transactions?year={year}&month={month}"),
+        ("notes", f"/api/notes?year={year}&month={month}"),
+    ):
+        started = time.perf_counter()
+        status, _, _ = client.get(path)
+        timings[f"first_{name}_seconds"] = time.perf_counter() - started
+        timings[f"{name}_status"] = status
+
+    server.should_exit = True
+    database.close_connection()
+    tmp.cleanup()
+    return {
+        "boot_seconds": boot_seconds,
+        **timings,
+        "plaid_loaded": "plaid" in sys.modules,
+    }
+
+
+def run_probe(kind: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--probe", kind],
+        capture_output=True,
+        check=True,
+    )
+    # The probe's result is its last stdout line, logs go to stderr
+    return orjson.loads(result.stdout.splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800.0)
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--probe", choices=("import", "serve"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        probe = probe_import if args.probe == "import" else probe_serve
+        print(orjson.dumps(probe()).decode())
+        return
+
+    imports = [run_probe("import") for _ in range(args.runs)]
+    import_ms = statistics.median(run["import_seconds"] for run in imports) * 1000
+    serve = run_probe("serve")
+
+    results = {
+        "import_median_ms": round(import_ms, 1),
+        "import_budget_ms": args.budget_ms,
+        "modules_loaded": imports[0]["modules"],
+        "plaid_loaded_on_import": imports[0]["plaid_loaded"],
+        "pyarrow_loaded_on_import": imports[0]["pyarrow_loaded"],
+        "boot_ms": round(serve["boot_seconds"] * 1000, 1),
+        "first_cached_transactions_ms": round(
+            serve["first_transactions_seconds"] * 1000, 1
+        ),
+        "first_notes_ms": round(serve["first_notes_seconds"] * 1000, 1),
+        "plaid_loaded_serving_cached": serve["plaid_loaded"],
+    }
+    for key, value in results.items():
+        print(f"{key:>30}: {value}")
+
+    if args.output:
+        args.output.write_bytes(orjson.dumps(results, option=orjson.OPT_INDENT_2))
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"import took {import_ms:.0f}ms, budget {args.budget_ms:.0f}ms")
+    if serve["transactions_status"] != 200 or serve["notes_status"] != 200:
+        failures.append("cached routes did not return 200")
+    if serve["plaid_loaded"]:
+        failures.append("serving cached routes imported the plaid SDK")
+    if failures:
+        print("FAILED: " + "; ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
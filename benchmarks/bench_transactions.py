@@ -0,0 +1,437 @@
+"""
+End-to-end transaction benchmarks against a local fake Plaid server.
+
+Starts benchmarks/fake_plaid.py with a synthetic dataset, links it as an item
+in a throwaway data directory and measures the FastAPI routes (over real
+HTTP, served by uvicorn), TransactionService and storage: cold and warm
+latency, throughput under concurrency and memory. Results are written as JSON
+for benchmarks/compare.py.
+
+Usage: poetry run python benchmarks/bench_transactions.py
+           [--transactions 100000] [--years 5] [--latency-ms 50]
+           [--concurrency 16] [--requests 400] [--output results.json]
+"""
+import argparse
+import http.client
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import orjson
+
+from budget_tracker_api.app.utils import (
+    database,
+    encryption,
+    file_locks,
+    metrics,
+    storage,
+)
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+RESULTS_DIR = BENCHMARKS_DIR / "results"
+ACCOUNT_NAME = "Plaid Credit Card"
+
+
+def shift_month(day: date, months: int) -> tuple[str, str]:
+    index = day.year * 12 + day.month - 1 + months
+    return f"{index // 12:04d}", f"{index % 12 + 1:02d}"
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def memory() -> dict:
+    """Current and peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak_mib = peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+    current_mib = None
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        current_mib = pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        pass
+    return {
+        "rss_mib": round(current_mib, 1) if current_mib is not None else None,
+        "peak_rss_mib": round(peak_mib, 1),
+    }
+
+
+def latency_stats(samples: list[float]) -> dict:
+    """Summarize per-call latencies given in seconds."""
+    return {
+        "calls": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+class AppClient:
+    """Minimal keep-alive HTTP client with one connection per thread."""
+
+    def __init__(self, port: int) -> None:
+        self.port = port
+        self._local = threading.local()
+
+    def get(
+        self, path: str, headers: Optional[dict] = None
+    ) -> tuple[int, dict, bytes]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(
+                "127.0.0.1", self.port, timeout=600
+            )
+        try:
+            conn.request("GET", path, headers=headers or {})
+            response = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionError):
+            # The server dropped an idle keep-alive connection, retry once
+            conn.close()
+            conn.request("GET", path, headers=headers or {})
+            response = conn.getresponse()
+        body = response.read()
+        return response.status, dict(response.getheaders()), body
+
+
+def timed(func: Callable, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def count_transactions(body: bytes) -> int:
+    return len(orjson.loads(body)["transactions"])
+
+
+def check(status: int, body: bytes, path: str) -> None:
+    if status not in (200, 304):
+        raise RuntimeError(f"GET {path} returned {status}: {body[:200]!r}")
+
+
+def start_fake_plaid(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    """Run fake_plaid.py in its own process, so it does not share our GIL."""
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            str(BENCHMARKS_DIR / "fake_plaid.py"),
+            "--port", "0",
+            "--transactions", str(args.transactions),
+            "--years", str(args.years),
+            "--latency-ms", str(args.latency_ms),
+            "--jitter-ms", str(args.latency_ms / 5),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    line = process.stdout.readline()
+    if "PLAID_HOST=" not in line:
+        process.kill()
+        raise RuntimeError(f"Fake Plaid failed to start: {line!r}")
+    return process, line.rsplit("PLAID_HOST=", 1)[1].rstrip(")\n")
+
+
+def start_app(app) -> tuple[object, int]:
+    """Serve the FastAPI app with uvicorn on a free port in a thread."""
+    import uvicorn
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, port
+
+
+class Benchmark:
+    """The scenarios, each returning a dict of metrics."""
+
+    def __init__(self, client: AppClient, args: argparse.Namespace) -> None:
+        self.client = client
+        self.args = args
+        self.today = date.today()
+        self.results: dict = {}
+
+    def record(self, name: str, result: dict) -> None:
+        result.update(memory())
+        self.results[name] = result
+        summary = ", ".join(f"{key}={value}" for key, value in result.items())
+        print(f"{name:>28}: {summary}")
+
+    def fetch(self, path: str, headers: Optional[dict] = None) -> bytes:
+        status, _, body = self.client.get(path, headers)
+        check(status, body, path)
+        return body
+
+    def repeat(self, path: str, headers: Optional[dict] = None) -> dict:
+        samples = [
+            timed(self.fetch, path, headers)[0] for _ in range(self.args.requests)
+        ]
+        return latency_stats(samples)
+
+    def cold_current_month(self) -> None:
+        # The first miss runs a full /transactions/sync of the sync window
+        year, month = shift_month(self.today, 0)
+        seconds, body = timed(
+            self.fetch, f"/api/transactions?year={year}&month={month}"
+        )
+        self.record(
+            "cold_current_month",
+            {"seconds": round(seconds, 3), "transactions": count_transactions(body)},
+        )
+
+    def cold_old_month(self) -> None:
+        # Outside the sync window, so the month comes from /transactions/get
+        year, month = shift_month(self.today, -(self.args.years * 12 - 2))
+        seconds, body = timed(
+            self.fetch, f"/api/transactions?year={year}&month={month}"
+        )
+        self.record(
+            "cold_old_month",
+            {"seconds": round(seconds, 3), "transactions": count_transactions(body)},
+        )
+
+    def concurrent_cold_months(self) -> None:
+        # Distinct uncached months fetched in parallel from /transactions/get
+        last = min(30 + self.args.concurrency, 12 * self.args.years)
+        months = [shift_month(self.today, -offset) for offset in range(30, last)]
+        paths = [f"/api/transactions?year={y}&month={m}" for y, m in months]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            samples = [s for s, _ in pool.map(lambda p: timed(self.fetch, p), paths)]
+        elapsed = time.perf_counter() - start
+        self.record(
+            "concurrent_cold_months",
+            {
+                "months": len(paths),
+                "seconds": round(elapsed, 3),
+                **latency_stats(samples),
+            },
+        )
+
+    def warm_month(self) -> None:
+        year, month = shift_month(self.today, -3)
+        path = f"/api/transactions?year={year}&month={month}"
+        self.fetch(path)
+        self.record("warm_month", self.repeat(path))
+        self.record(
+            "warm_month_projected", self.repeat(path + "&fields=date,name,amount")
+        )
+
+    def revalidate_month(self) -> None:
+        year, month = shift_month(self.today, -3)
+        path = f"/api/transactions?year={year}&month={month}"
+        _, headers, _ = self.client.get(path)
+        etag = {key.lower(): value for key, value in headers.items()}["etag"]
+        self.record("revalidate_304", self.repeat(path, {"If-None-Match": etag}))
+
+    def warm_concurrency(self) -> None:
+        year, month = shift_month(self.today, -3)
+        path = f"/api/transactions?year={year}&month={month}"
+        requests = self.args.requests * 2
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            samples = [
+                seconds
+                for seconds, _ in pool.map(
+                    lambda _: timed(self.fetch, path), range(requests)
+                )
+            ]
+        elapsed = time.perf_counter() - start
+        self.record(
+            "warm_month_concurrent",
+            {
+                "concurrency": self.args.concurrency,
+                "requests_per_second": round(requests / elapsed, 1),
+                **latency_stats(samples),
+            },
+        )
+
+    def month_range(self) -> None:
+        start_year, start_month = shift_month(self.today, -11)
+        end_year, end_month = shift_month(self.today, 0)
+        path = (
+            f"/api/transactions?from={start_year}-{start_month}"
+            f"&to={end_year}-{end_month}"
+        )
+        cold, body = timed(self.fetch, path)
+        warm = [timed(self.fetch, path)[0] for _ in range(10)]
+        self.record(
+            "range_12_months_ndjson",
+            {
+                "transactions": body.count(b"\n"),
+                "first_seconds": round(cold, 3),
+                **latency_stats(warm),
+            },
+        )
+
+    def summary(self) -> None:
+        start_year, start_month = shift_month(self.today, -(self.args.years * 12 - 1))
+        end_year, end_month = shift_month(self.today, 0)
+        path = (
+            f"/api/summary?from={start_year}-{start_month}"
+            f"&to={end_year}-{end_month}&group_by=merchant"
+        )
+        self.fetch(path)
+        self.record("summary_all_years", self.repeat(path))
+
+    def search(self) -> None:
+        self.record("search_text", self.repeat("/api/transactions/search?q=starb"))
+        self.record(
+            "search_filtered",
+            self.repeat(
+                "/api/transactions/search?category=ENTERTAINMENT"
+                "&min_amount=20&max_amount=200"
+            ),
+        )
+
+    def export(self) -> None:
+        for export_format in ("csv", "ndjson"):
+            seconds, body = timed(self.fetch, f"/api/export?format={export_format}")
+            rows = body.count(b"\n") - (export_format == "csv")
+            self.record(
+                f"export_{export_format}",
+                {
+                    "seconds": round(seconds, 3),
+                    "rows": rows,
+                    "rows_per_second": round(rows / seconds),
+                    "mib": round(len(body) / 1024 / 1024, 2),
+                },
+            )
+
+    def direct(self, transaction_service, storage) -> None:
+        """The same warm month without HTTP, routing or serialization."""
+        year, month = shift_month(self.today, -3)
+        samples = [
+            timed(storage.get_cached_transactions, ACCOUNT_NAME, year, month)[0]
+            for _ in range(self.args.requests)
+        ]
+        self.record("storage_get_cached_month", latency_stats(samples))
+        samples = [
+            timed(transaction_service.get_transactions, year, month)[0]
+            for _ in range(self.args.requests)
+        ]
+        self.record("service_get_transactions", latency_stats(samples))
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCHMARKS_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--requests", type=int, default=400, help="Calls per latency scenario"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Results file (default benchmarks/results/<commit>-<time>.json)",
+    )
+    args = parser.parse_args()
+
+    fake_plaid, plaid_host = start_fake_plaid(args)
+    tmp = tempfile.TemporaryDirectory()
+    try:
+        os.environ.update(
+            PLAID_HOST=plaid_host,
+            PLAID_CLIENT_ID="benchmark",
+            PLAID_SECRET="benchmark",
+            ACCOUNT_TO_FILTER=ACCOUNT_NAME,
+            PREFETCH_ENABLED="0",
+        )
+        # Point the store at the throwaway directory before the app initializes it
+        data_dir = Path(tmp.name)
+        database.DATA_DIR = storage.DATA_DIR = data_dir
+        database.DB_FILE = data_dir / "budget_tracker.db"
+        storage.ACCESS_TOKEN_FILE = data_dir / "access-token.json"
+        storage.CACHE_DIR = data_dir / "transactions"
+        storage.SYNC_CURSOR_FILE = data_dir / "sync-cursors.json"
+        file_locks.LOCK_DIR = data_dir / "locks"
+        metrics.METRICS_DIR = data_dir / "metrics"
+        encryption.TOKEN_KEY_FILE = data_dir / "token.key"
+
+        baseline = memory()
+        start = time.perf_counter()
+        from budget_tracker_api.app import main as app_main
+
+        import_seconds = time.perf_counter() - start
+        # The app's lifespan creates the store, link the fake item after it
+        server, port = start_app(app_main.app)
+        storage.save_access_token(
+            "access-sandbox-fake", "item-fake", institution_name="Fake Plaid"
+        )
+
+        benchmark = Benchmark(AppClient(port), args)
+        benchmark.record(
+            "startup",
+            {"import_seconds": round(import_seconds, 3), **{
+                f"baseline_{key}": value for key, value in baseline.items()
+            }},
+        )
+        benchmark.cold_current_month()
+        benchmark.cold_old_month()
+        benchmark.concurrent_cold_months()
+        benchmark.warm_month()
+        benchmark.revalidate_month()
+        benchmark.warm_concurrency()
+        benchmark.month_range()
+        benchmark.summary()
+        benchmark.search()
+        benchmark.export()
+        benchmark.direct(app_main.transaction_service, storage)
+        server.should_exit = True
+    finally:
+        fake_plaid.kill()
+        database.close_connection()
+        tmp.cleanup()
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parameters": vars(args) | {"output": None},
+        },
+        "results": benchmark.results,
+    }
+    output = args.output or RESULTS_DIR / (
+        f"{commit or 'unknown'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(orjson.dumps(report, option=orjson.OPT_INDENT_2))
+    print(f"Wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Compare two benchmark result files written by bench_transactions.py.
+
+Prints the change of every shared metric and exits non-zero when a metric
+regressed by more than the threshold, so it can gate a commit.
+
+Usage: poetry run python benchmarks/compare.py base.json new.json
+           [--threshold 10]
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional
+
+import orjson
+
+# Metrics where a larger number is an improvement, everything else is a cost
+HIGHER_IS_BETTER = ("requests_per_second", "rows_per_second")
+# Descriptive values that are compared for sanity but never flagged
+IGNORED = ("calls", "months", "rows", "transactions", "concurrency", "mib")
+
+
+def change(metric: str, base: float, new: float) -> Optional[float]:
+    """Percent change where positive is always worse."""
+    if not base:
+        return None
+    percent = (new - base) / base * 100
+    return -percent if metric in HIGHER_IS_BETTER else percent
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("base", type=Path)
+    parser.add_argument("new", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="Percent a metric may worsen before it counts as a regression",
+    )
+    args = parser.parse_args()
+
+    base = orjson.loads(args.base.read_bytes())
+    new = orjson.loads(args.new.read_bytes())
+    print(f"base: {base['meta']['commit']} ({base['meta']['timestamp']})")
+    print(f" new: {new['meta']['commit']} ({new['meta']['timestamp']})")
+    if base["meta"]["parameters"] != new["meta"]["parameters"]:
+        print("warning: runs used different parameters, compare with care")
+
+    regressions = []
+    for scenario, metrics in new["results"].items():
+        base_metrics = base["results"].get(scenario)
+        if base_metrics is None:
+            continue
+        for metric, value in metrics.items():
+            base_value = base_metrics.get(metric)
+            if metric in IGNORED or value is None or base_value is None:
+                continue
+            worse = change(metric, base_value, value)
+            if worse is None:
+                continue
+            flag = ""
+            if worse > args.threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{scenario}.{metric}")
+            elif worse < -args.threshold:
+                flag = "  improved"
+            print(
+                f"{scenario:>28} {metric:<22} {base_value:>12} -> {value:>12} "
+                f"({-worse if metric in HIGHER_IS_BETTER else worse:+.1f}%){flag}"
+            )
+
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
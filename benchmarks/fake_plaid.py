@@ -0,0 +1,492 @@
+"""
+Local stand-in for the Plaid API, for benchmarks and offline development.
+
+Serves the endpoints the app uses (link/token/create, item/public_token/exchange,
+accounts/get, transactions/get, transactions/sync,
+webhook_verification_key/get) from a deterministic synthetic dataset, with
+configurable latency and rate limiting. Point the app at it with PLAID_HOST.
+
+As a webhook simulator it posts new transactions every --post-every seconds
+and sends SYNC_UPDATES_AVAILABLE to --webhook-url, signed like Plaid's when
+the cryptography package is installed.
+
+Usage: poetry run python benchmarks/fake_plaid.py [--port 8010]
+           [--transactions 100000] [--years 5] [--latency-ms 50]
+           [--webhook-url http://127.0.0.1:8000/api/plaid/webhook --post-every 5]
+"""
+import argparse
+import base64
+import bisect
+import hashlib
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+import orjson
+
+ACCOUNTS = (
+    ("acc-checking", "Plaid Checking", "depository", "checking"),
+    ("acc-credit", "Plaid Credit Card", "credit", "credit card"),
+)
+MERCHANTS = (
+    ("Starbucks", "FOOD_AND_DRINK"),
+    ("Tim Hortons", "FOOD_AND_DRINK"),
+    ("Uber Eats", "FOOD_AND_DRINK"),
+    ("Loblaws", "FOOD_AND_DRINK"),
+    ("Amazon", "GENERAL_MERCHANDISE"),
+    ("Best Buy", "GENERAL_MERCHANDISE"),
+    ("Shell", "TRANSPORTATION"),
+    ("Uber", "TRANSPORTATION"),
+    ("Netflix", "ENTERTAINMENT"),
+    ("Spotify", "ENTERTAINMENT"),
+    ("Hydro One", "RENT_AND_UTILITIES"),
+    ("Rogers", "RENT_AND_UTILITIES"),
+)
+# Plaid only returns this much history from /transactions/sync
+SYNC_WINDOW_DAYS = 730
+
+
+class FakePlaidData:
+    """
+    Synthetic transactions spread evenly over the last `years`, kept as
+    compact tuples sorted by date and expanded to Plaid JSON on demand.
+    """
+
+    def __init__(self, transactions: int, years: int, seed: int = 7) -> None:
+        rng = random.Random(seed)
+        today = date.today()
+        days = years * 365
+        rows = []
+        for index in range(transactions):
+            day = today - timedelta(days=rng.randrange(days))
+            rows.append((
+                day.isoformat(),
+                f"tx-{index:08d}",
+                rng.randrange(len(ACCOUNTS)),
+                rng.randrange(len(MERCHANTS)),
+                round(rng.lognormvariate(3, 1), 2),
+            ))
+        rows.sort()
+        self.rows = rows
+        self.dates = [row[0] for row in rows]
+        sync_start = (today - timedelta(days=SYNC_WINDOW_DAYS)).isoformat()
+        self.sync_offset = bisect.bisect_left(self.dates, sync_start)
+        self._rng = rng
+
+    def post_transactions(self, count: int) -> list[tuple]:
+        """
+        Add `count` transactions dated today. They sort after every existing
+        row, so outstanding sync cursors see them as added.
+        """
+        today = date.today().isoformat()
+        rows = [
+            (
+                today,
+                f"tx-{len(self.rows) + index:08d}",
+                self._rng.randrange(len(ACCOUNTS)),
+                self._rng.randrange(len(MERCHANTS)),
+                round(self._rng.lognormvariate(3, 1), 2),
+            )
+            for index in range(count)
+        ]
+        # Rows first, between() slices rows by positions found in dates
+        self.rows.extend(rows)
+        self.dates.extend(row[0] for row in rows)
+        return rows
+
+    def transaction(self, row: tuple) -> Dict[str, Any]:
+        day, transaction_id, account, merchant, amount = row
+        merchant_name, category = MERCHANTS[merchant]
+        return {
+            "transaction_id": transaction_id,
+            "account_id": ACCOUNTS[account][0],
+            "date": day,
+            "authorized_date": day,
+            "authorized_datetime": None,
+            "datetime": None,
+            "name": f"{merchant_name.upper()} #{int(amount * 100) % 997}",
+            "merchant_name": merchant_name,
+            "amount": amount,
+            "iso_currency_code": "CAD",
+            "unofficial_currency_code": None,
+            "category": None,
+            "category_id": None,
+            "pending": False,
+            "pending_transaction_id": None,
+            "account_owner": None,
+            "payment_channel": "in store",
+            "transaction_code": None,
+            "transaction_type": "place",
+            "location": {
+                "address": None,
+                "city": None,
+                "region": None,
+                "postal_code": None,
+                "country": None,
+                "lat": None,
+                "lon": None,
+                "store_number": None,
+            },
+            "payment_meta": {
+                "reference_number": None,
+                "ppd_id": None,
+                "payee": None,
+                "by_order_of": None,
+                "payer": None,
+                "payment_method": None,
+                "payment_processor": None,
+                "reason": None,
+            },
+            "personal_finance_category": {
+                "primary": category,
+                "detailed": f"{category}_OTHER",
+            },
+        }
+
+    def between(
+        self, start: str, end: str, account_ids: Optional[list[str]]
+    ) -> list[tuple]:
+        """Rows with start <= date <= end, optionally for some accounts only."""
+        low = bisect.bisect_left(self.dates, start)
+        high = bisect.bisect_right(self.dates, end)
+        rows = self.rows[low:high]
+        if account_ids:
+            wanted = {
+                index for index, account in enumerate(ACCOUNTS)
+                if account[0] in account_ids
+            }
+            rows = [row for row in rows if row[2] in wanted]
+        return rows
+
+
+def account_json(index: int) -> Dict[str, Any]:
+    account_id, name, account_type, subtype = ACCOUNTS[index]
+    return {
+        "account_id": account_id,
+        "balances": {
+            "available": 1000.0,
+            "current": 1000.0,
+            "limit": None,
+            "iso_currency_code": "CAD",
+            "unofficial_currency_code": None,
+        },
+        "mask": f"{index:04d}",
+        "name": name,
+        "official_name": name,
+        "type": account_type,
+        "subtype": subtype,
+    }
+
+
+ITEM = {
+    "item_id": "item-fake",
+    "webhook": None,
+    "error": None,
+    "available_products": [],
+    "billed_products": ["transactions"],
+    "consent_expiration_time": None,
+    "update_type": "background",
+}
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+class WebhookSigner:
+    """
+    Signs webhook bodies the way Plaid does: an ES256 JWT carrying the
+    body's SHA-256, verifiable with the JWK served at
+    /webhook_verification_key/get. Needs the cryptography package.
+    """
+
+    def __init__(self) -> None:
+        from cryptography.hazmat.primitives.asymmetric import ec
+
+        self.key_id = f"fake-{uuid.uuid4().hex[:12]}"
+        self._private_key = ec.generate_private_key(ec.SECP256R1())
+        numbers = self._private_key.public_key().public_numbers()
+        self.jwk = {
+            "alg": "ES256",
+            "crv": "P-256",
+            "kid": self.key_id,
+            "kty": "EC",
+            "use": "sig",
+            "x": _b64url(numbers.x.to_bytes(32, "big")),
+            "y": _b64url(numbers.y.to_bytes(32, "big")),
+            "created_at": int(time.time()),
+            "expired_at": None,
+        }
+
+    def sign(self, body: bytes) -> str:
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.hazmat.primitives.asymmetric.utils import (
+            decode_dss_signature,
+        )
+
+        header = _b64url(
+            orjson.dumps({"alg": "ES256", "kid": self.key_id, "typ": "JWT"})
+        )
+        claims = _b64url(orjson.dumps({
+            "iat": int(time.time()),
+            "request_body_sha256": hashlib.sha256(body).hexdigest(),
+        }))
+        signing_input = f"{header}.{claims}".encode()
+        r, s = decode_dss_signature(
+            self._private_key.sign(signing_input, ec.ECDSA(hashes.SHA256()))
+        )
+        signature = _b64url(r.to_bytes(32, "big") + s.to_bytes(32, "big"))
+        return f"{header}.{claims}.{signature}"
+
+
+class FakePlaidHandler(BaseHTTPRequestHandler):
+    """Routes Plaid API calls to the handler methods below."""
+
+    server: "FakePlaidServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        body = orjson.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        route = getattr(self, "handle_" + self.path.strip("/").replace("/", "_"), None)
+        self.server.record(self.path)
+
+        time.sleep(self.server.latency())
+        if route is None:
+            return self.send_error_json(404, "INVALID_REQUEST", "UNKNOWN_ENDPOINT")
+        if self.server.rate_limited():
+            return self.send_error_json(
+                429, "RATE_LIMIT_EXCEEDED", "TRANSACTIONS_LIMIT"
+            )
+        response = route(body)
+        if response is not None:
+            self.send_json(response)
+
+    def handle_link_token_create(self, body: dict) -> dict:
+        return {
+            "link_token": f"link-sandbox-{uuid.uuid4()}",
+            "expiration": "2099-01-01T00:00:00Z",
+            "request_id": self.request_id(),
+        }
+
+    def handle_item_public_token_exchange(self, body: dict) -> dict:
+        return {
+            "access_token": "access-sandbox-fake",
+            "item_id": ITEM["item_id"],
+            "request_id": self.request_id(),
+        }
+
+    def handle_accounts_get(self, body: dict) -> dict:
+        return {
+            "accounts": [account_json(index) for index in range(len(ACCOUNTS))],
+            "item": ITEM,
+            "request_id": self.request_id(),
+        }
+
+    def handle_transactions_get(self, body: dict) -> dict:
+        options = body.get("options") or {}
+        count = options.get("count", 100)
+        offset = options.get("offset", 0)
+        data = self.server.data
+        rows = data.between(
+            body["start_date"], body["end_date"], options.get("account_ids")
+        )
+        return {
+            "accounts": [account_json(index) for index in range(len(ACCOUNTS))],
+            "transactions": [
+                data.transaction(row) for row in rows[offset:offset + count]
+            ],
+            "total_transactions": len(rows),
+            "item": ITEM,
+            "request_id": self.request_id(),
+        }
+
+    def handle_transactions_sync(self, body: dict) -> dict:
+        data = self.server.data
+        # Cursors are offsets into the date-sorted rows, "" is the start
+        offset = int(body.get("cursor") or data.sync_offset)
+        end = min(offset + body.get("count", 100), len(data.rows))
+        return {
+            "added": [data.transaction(row) for row in data.rows[offset:end]],
+            "modified": [],
+            "removed": [],
+            "next_cursor": str(end),
+            "has_more": end < len(data.rows),
+            "request_id": self.request_id(),
+        }
+
+    def handle_webhook_verification_key_get(self, body: dict) -> Optional[dict]:
+        key = self.server.webhook_signer
+        if key is None or body.get("key_id") != key.key_id:
+            self.send_error_json(
+                400, "INVALID_INPUT", "INVALID_WEBHOOK_VERIFICATION_KEY_ID"
+            )
+            return None
+        return {"key": key.jwk, "request_id": self.request_id()}
+
+    def request_id(self) -> str:
+        return uuid.uuid4().hex[:16]
+
+    def send_json(self, payload: dict, status: int = 200) -> None:
+        body = orjson.dumps(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, error_type: str, error_code: str) -> None:
+        self.send_json(
+            {
+                "error_type": error_type,
+                "error_code": error_code,
+                "error_message": f"fake {error_code}",
+                "display_message": None,
+                "request_id": self.request_id(),
+            },
+            status,
+        )
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class FakePlaidServer(ThreadingHTTPServer):
+    """Threaded fake Plaid API with simulated latency and rate limiting."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        port: int = 0,
+        transactions: int = 100_000,
+        years: int = 5,
+        latency_ms: float = 50.0,
+        jitter_ms: float = 10.0,
+        rate_limit_rate: float = 0.0,
+    ) -> None:
+        super().__init__(("127.0.0.1", port), FakePlaidHandler)
+        self.data = FakePlaidData(transactions, years)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(11)
+        self._lock = threading.Lock()
+        self.calls: Dict[str, int] = {}
+        try:
+            self.webhook_signer: Optional[WebhookSigner] = WebhookSigner()
+        except ImportError:
+            # Webhooks go out unsigned, the app needs PLAID_WEBHOOK_VERIFY=0
+            self.webhook_signer = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def latency(self) -> float:
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        return max(self.latency_ms + jitter, 0.0) / 1000
+
+    def rate_limited(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.rate_limit_rate
+
+    def record(self, path: str) -> None:
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def send_webhook(
+        self,
+        url: str,
+        webhook_type: str,
+        webhook_code: str,
+        item_id: str = ITEM["item_id"],
+        **fields: Any,
+    ) -> int:
+        """POST a webhook to the app, signed when possible. Returns the status."""
+        body = orjson.dumps({
+            "webhook_type": webhook_type,
+            "webhook_code": webhook_code,
+            "item_id": item_id,
+            "environment": "sandbox",
+            **fields,
+        })
+        headers = {"Content-Type": "application/json"}
+        if self.webhook_signer is not None:
+            headers["Plaid-Verification"] = self.webhook_signer.sign(body)
+        request = urllib.request.Request(url, body, headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def post_and_notify(self, url: str, count: int) -> int:
+        """Add `count` new transactions and send SYNC_UPDATES_AVAILABLE."""
+        self.data.post_transactions(count)
+        return self.send_webhook(
+            url,
+            "TRANSACTIONS",
+            "SYNC_UPDATES_AVAILABLE",
+            initial_update_complete=True,
+            historical_update_complete=True,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=0.0,
+        help="Fraction of calls answered with 429 RATE_LIMIT_EXCEEDED",
+    )
+    parser.add_argument("--webhook-url", help="The app's /api/plaid/webhook URL")
+    parser.add_argument(
+        "--post-every",
+        type=float,
+        default=0.0,
+        help="Post new transactions and send a webhook every this many seconds",
+    )
+    parser.add_argument("--post-count", type=int, default=3)
+    args = parser.parse_args()
+
+    server = FakePlaidServer(
+        args.port,
+        args.transactions,
+        args.years,
+        args.latency_ms,
+        args.jitter_ms,
+        args.rate_limit_rate,
+    )
+    print(f"Fake Plaid listening on {server.url} (PLAID_HOST={server.url})")
+    if args.webhook_url and args.post_every > 0:
+        if server.webhook_signer is None:
+            print("cryptography not installed, sending unsigned webhooks")
+        server.start_in_thread()
+        while True:
+            time.sleep(args.post_every)
+            status = server.post_and_notify(args.webhook_url, args.post_count)
+            print(f"Posted {args.post_count} transactions, webhook answered {status}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,112 @@
+import asyncio
 import logging
+import os
+import tempfile
+from contextlib import asynccontextmanager
 from pathlib import Path
-
+from typing import Optional
+
+from budget_tracker_api.app.models.transaction import parse_fields
+from budget_tracker_api.app.services.account_service import AccountService
+from budget_tracker_api.app.services.export_service import ExportService
+from budget_tracker_api.app.services.import_service import (
+    ImportService,
+    detect_format,
+)
+from budget_tracker_api.app.services.live_update_service import LiveUpdateService
+from budget_tracker_api.app.services.plaid_client import PlaidClient
 from budget_tracker_api.app.services.plaid_service import PlaidService
+from budget_tracker_api.app.services.plaid_transport import PlaidTransport
+from budget_tracker_api.app.services.prefetch_scheduler import (
+    PREFETCH_ENABLED,
+    PrefetchScheduler,
+)
+from budget_tracker_api.app.services.search_service import (
+    SEARCH_DEFAULT_LIMIT,
+    SearchService,
+)
+from budget_tracker_api.app.services.summary_service import SummaryService
 from budget_tracker_api.app.services.transaction_service import TransactionService
+from budget_tracker_api.app.services.webhook_service import WebhookService
+from budget_tracker_api.app.utils.concurrency import run_blocking
 from budget_tracker_api.app.utils.database import init_db, save_note, get_note
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
-
-app = FastAPI(title="Budget Tracker APP")
-
-# Initialize database on startup
-init_db()
+from budget_tracker_api.app.utils.encryption import check_encryption
+from budget_tracker_api.app.utils.file_locks import FileLock
+from budget_tracker_api.app.utils.http_cache import (
+    CompressionMiddleware,
+    ConditionalGetMiddleware,
+    OrjsonResponse,
+    encoded_etag,
+    etag_matches,
+)
+from budget_tracker_api.app.utils.metrics import (
+    METRICS_SNAPSHOT_SECONDS,
+    PROMETHEUS_CONTENT_TYPE,
+    MetricsMiddleware,
+    all_worker_metrics,
+    collect_metrics,
+    publish_metrics,
+    record_cache,
+    render_families,
+    retire_metrics,
+    stage,
+)
+from budget_tracker_api.app.utils.static_files import StaticIndex
+from budget_tracker_api.app.utils.structured_logging import (
+    RequestIdMiddleware,
+    configure_logging,
+    dropped_log_records,
+)
+from budget_tracker_api.app.utils.storage import (
+    backfill_monthly_rollups,
+    migrate_access_token_file,
+    migrate_json_cache,
+)
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepare the database on startup, then run the prefetch scheduler for the
+    lifetime of the server. Startup I/O lives here rather than at import, so
+    importing the app (worker boot, --reload) stays cheap.
+    """
+    # Workers boot together, one runs the migrations while the others wait
+    with FileLock("startup"):
+        check_encryption()
+        init_db()
+        migrate_json_cache()
+        migrate_access_token_file()
+        backfill_monthly_rollups()
+    if PREFETCH_ENABLED:
+        prefetch_scheduler.start()
+    metrics_task = asyncio.create_task(publish_metrics_periodically())
+    yield
+    await prefetch_scheduler.stop()
+    await live_update_service.stop()
+    metrics_task.cancel()
+    # Keep this worker's counts in the totals other workers report
+    with FileLock("metrics"):
+        retire_metrics(worker_metric_families())
+
+
+app = FastAPI(
+    title="Budget Tracker APP",
+    default_response_class=OrjsonResponse,
+    lifespan=lifespan,
+)
+# Outermost last: conditional GETs are answered before compression runs, the
+# metrics middleware times the whole stack and every log line carries the
+# request ID
+app.add_middleware(ConditionalGetMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
+# JSON logs through a background writer, before anything logs at startup
+configure_logging()
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -21,9 +116,25 @@ BASE_DIR = Path(__file__).resolve().parent
 PUBLIC_DIR = BASE_DIR / "public"
 TEMPLATES_DIR = BASE_DIR / "assets" / "templates"
 
-# Initialize services
-plaid_service = PlaidService()
-transaction_service = TransactionService()
+# Index the React build once, dev mode re-indexes when Vite rebuilds it
+static_index = StaticIndex(PUBLIC_DIR, watch=os.getenv("BUDGET_TRACKER_DEV") == "1")
+
+# Initialize services. Construction does no I/O and does not load the plaid
+# SDK, which is imported by the first call that actually reaches Plaid.
+# One Plaid transport (connection pool, timeouts, retries) shared by all services
+plaid_transport = PlaidTransport()
+plaid_client = PlaidClient(plaid_transport)
+account_service = AccountService(plaid_client)
+plaid_service = PlaidService(account_service, plaid_client)
+transaction_service = TransactionService(account_service, plaid_client)
+summary_service = SummaryService()
+search_service = SearchService()
+export_service = ExportService()
+import_service = ImportService()
+sync_service = transaction_service.sync_service
+prefetch_scheduler = PrefetchScheduler(transaction_service)
+webhook_service = WebhookService(sync_service, account_service, plaid_client)
+live_update_service = LiveUpdateService()
 
 # API Routes (must be defined BEFORE static file mounting)
 @app.get("/api/status")
@@ -32,9 +143,69 @@ def hello_api():
 
 # Plaid Link API Routes
 @app.get("/api/plaid/create-link-token")
-def create_link_token():
+async def create_link_token():
     """Create a Plaid link token for account linking."""
-    return plaid_service.create_link_token()
+    return await plaid_service.create_link_token_async()
+
+@app.get("/api/plaid/items")
+def list_linked_items(user_id: Optional[str] = None):
+    """Linked institutions, without their access tokens."""
+    return {"items": plaid_service.list_items(user_id)}
+
+@app.get("/api/plaid/metrics")
+def plaid_transport_metrics():
+    """Connection pool usage, retries and error codes for Plaid calls."""
+    return plaid_transport.metrics()
+
+
+def worker_metric_families() -> list:
+    """Every metric this worker records, as utils.metrics families."""
+    log_drops = (
+        "budget_tracker_log_dropped_total",
+        "counter",
+        "Log records dropped because the log queue was full",
+        [({}, dropped_log_records())],
+    )
+    live_subscribers = (
+        "budget_tracker_live_subscribers",
+        "gauge",
+        "Clients subscribed to /api/transactions/live",
+        [({}, live_update_service.status()["subscribers"])],
+    )
+    return collect_metrics(
+        *plaid_transport.metric_families(), log_drops, live_subscribers
+    )
+
+
+async def publish_metrics_periodically() -> None:
+    """Publish this worker's metrics for /metrics served by other workers."""
+    while True:
+        try:
+            await run_blocking(publish_metrics, worker_metric_families())
+        except Exception:
+            logger.exception("Failed to publish worker metrics")
+        await asyncio.sleep(METRICS_SNAPSHOT_SECONDS)
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    Stage, request, cache and Plaid metrics in Prometheus text format, summed
+    over every worker process.
+    """
+    families = worker_metric_families()
+    publish_metrics(families)
+    return Response(
+        render_families(all_worker_metrics(families)),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
+
+
+@app.get("/api/prefetch/status")
+def prefetch_status():
+    """State of the background prefetch scheduler."""
+    return prefetch_scheduler.status()
+
 
 @app.get("/link")
 def link_page():
@@ -46,8 +217,8 @@ def link_page():
 async def exchange_token(request: Request):
     """Exchange public token for access token."""
     data = await request.json()
-    result, status_code, error = plaid_service.exchange_public_token(
-        data.get("public_token")
+    result, status_code, error = await plaid_service.exchange_public_token_async(
+        data.get("public_token"), data.get("user_id"), data.get("institution_name")
     )
 
     if error:
@@ -56,9 +227,39 @@ async def exchange_token(request: Request):
 
 
 @app.get("/api/plaid/create-update-link-token")
-def create_update_link_token():
+async def create_update_link_token(item_id: Optional[str] = None):
     """Create a Plaid link token for re-authentication (update mode)."""
-    result, status_code, error = plaid_service.create_update_link_token()
+    result, status_code, error = await plaid_service.create_update_link_token_async(
+        item_id
+    )
+
+    if error:
+        raise HTTPException(status_code=status_code, detail=error)
+    return result
+
+
+@app.post("/api/plaid/update-complete")
+async def update_complete(request: Request):
+    """Called by /update once Plaid Link re-authenticated an item."""
+    data = await request.json()
+    result, status_code, error = await plaid_service.complete_update_async(
+        data.get("item_id")
+    )
+
+    if error:
+        raise HTTPException(status_code=status_code, detail=error)
+    return result
+
+
+@app.post("/api/plaid/webhook")
+async def plaid_webhook(request: Request):
+    """
+    Receive Plaid webhooks. New transactions sync only the item that changed,
+    ITEM errors flag the item for update mode (see /api/plaid/items).
+    """
+    result, status_code, error = await webhook_service.handle_webhook_async(
+        await request.body(), request.headers.get("Plaid-Verification")
+    )
 
     if error:
         raise HTTPException(status_code=status_code, detail=error)
@@ -73,18 +274,277 @@ def update_page():
 
 # Add more API routes here
 @app.get("/api/transactions")
-def get_transactions(year: str = "2025", month: str = "12"):
+async def get_transactions(
+    request: Request,
+    year: str = "2025",
+    month: str = "12",
+    from_month: Optional[str] = Query(None, alias="from"),
+    to_month: Optional[str] = Query(None, alias="to"),
+    accounts: Optional[str] = None,
+    fields: Optional[str] = None,
+):
     """
     Get list of transactions from plaid api for specified year and month.
-    Query params: year (default: 2025), month (default: 12)
+    Query params: year (default: 2025), month (default: 12), fields (comma
+    separated projection, e.g. fields=date,name,amount; default full payload)
+
+    Range mode: from=YYYY-MM&to=YYYY-MM&accounts=Name1,Name2 streams every
+    month in the range as NDJSON (one transaction per line). `to` defaults to
+    `from` and `accounts` defaults to ACCOUNT_TO_FILTER.
+
+    Single-month responses carry a strong ETag derived from the stored month,
+    so If-None-Match revalidation of unchanged months returns 304 without
+    touching Plaid or re-serializing.
     """
-    transactions, status_code, error = transaction_service.get_transactions(
-        year, month
+    if from_month or accounts:
+        start = from_month or f"{year}-{month}"
+        account_names = (
+            [name.strip() for name in accounts.split(",") if name.strip()]
+            if accounts
+            else None
+        )
+        stream, status_code, error = (
+            await transaction_service.stream_transaction_range(
+                start, to_month or start, account_names, parse_fields(fields)
+            )
+        )
+
+        if error:
+            raise HTTPException(status_code=status_code, detail=error)
+        return StreamingResponse(stream, media_type="application/x-ndjson")
+
+    projection = parse_fields(fields)
+    validators = await run_blocking(
+        transaction_service.get_month_validators, year, month, projection
+    )
+    # Stale months go through the service so the background refresh starts
+    if validators and validators[2] != "stale":
+        etag, cache_control, _ = validators
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            record_cache("http", "not_modified")
+            return Response(
+                status_code=304,
+                headers={
+                    "ETag": encoded_etag(
+                        etag, request.headers.get("accept-encoding", "")
+                    ),
+                    "Cache-Control": cache_control,
+                    "Vary": "Accept-Encoding",
+                },
+            )
+
+    transactions, status_code, error = (
+        await transaction_service.get_transactions_async(year, month, projection)
     )
 
     if error:
         raise HTTPException(status_code=status_code, detail=error)
-    return {"transactions": transactions}
+
+    headers = {}
+    validators = await run_blocking(
+        transaction_service.get_month_validators, year, month, projection
+    )
+    if validators:
+        headers = {"ETag": validators[0], "Cache-Control": validators[1]}
+    with stage("serialize"):
+        return OrjsonResponse({"transactions": transactions}, headers=headers)
+
+
+@app.get("/api/transactions/live")
+def live_transactions(
+    year: str = "2025",
+    month: str = "12",
+    accounts: Optional[str] = None,
+    fields: Optional[str] = None,
+):
+    """
+    Server-Sent Events for one month: a "ready" event per account with the
+    month's totals and content hash, then a "delta" event (added, modified,
+    removed and new totals) whenever the local store changes, or "changed"
+    when the month should be re-read from /api/transactions. `accounts`
+    defaults to ACCOUNT_TO_FILTER, `fields` projects delta transactions.
+    """
+    account_names = (
+        [name.strip() for name in accounts.split(",") if name.strip()]
+        if accounts
+        else [os.getenv("ACCOUNT_TO_FILTER")]
+    )
+    stream, status_code, error = live_update_service.stream_month(
+        year, month, account_names, parse_fields(fields)
+    )
+
+    if error:
+        raise HTTPException(status_code=status_code, detail=error)
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        # No proxy buffering, events must reach the browser as they happen
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/transactions/sync")
+async def sync_transactions():
+    """
+    Pull only the transactions added, modified or removed since the last sync
+    and apply them to the local cache.
+    """
+    summary, status_code, error = await sync_service.sync_async()
+
+    if error:
+        raise HTTPException(status_code=status_code, detail=error)
+    return summary
+
+
+@app.get("/api/transactions/search")
+def search_transactions(
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    accounts: Optional[str] = None,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+    offset: int = 0,
+    fields: Optional[str] = None,
+):
+    """
+    Search cached transactions by text in name/merchant, category, amount
+    range and date range (from/to as YYYY-MM or YYYY-MM-DD, inclusive).
+    Results are newest first and paginated with limit/offset; facets count
+    matches per category and merchant.
+    """
+    account_names = (
+        [name.strip() for name in accounts.split(",") if name.strip()]
+        if accounts
+        else None
+    )
+    results, status_code, error = search_service.search(
+        q,
+        category,
+        min_amount,
+        max_amount,
+        from_date,
+        to_date,
+        account_names,
+        limit,
+        offset,
+        parse_fields(fields),
+    )
+
+    if error:
+        raise HTTPException(status_code=status_code, detail=error)
+    return results
+
+
+@app.get("/api/export")
+def export_transactions(
+    export_format: str = Query("csv", alias="format"),
+    from_date: Optional[str] = Query(None, alias="from"),
+    to_date: Optional[str] = Query(None, alias="to"),
+    accounts: Optional[str] = None,
+    fields: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+):
+    """
+    Stream cached transactions as csv, ndjson, arrow (IPC stream) or parquet,
+    oldest first. from/to are YYYY-MM or YYYY-MM-DD, inclusive. Resume an
+    interrupted or chunked download with after=<last transaction_id>.
+    """
+    account_names = (
+        [name.strip() for name in accounts.split(",") if name.strip()]
+        if accounts
+        else None
+    )
+    result, status_code, error = export_service.export(
+        export_format,
+        from_date,
+        to_date,
+        account_names,
+        parse_fields(fields),
+        after,
+        limit,
+    )
+
+    if error:
+        raise HTTPException(status_code=status_code, detail=error)
+    chunks, media_type, filename = result
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.post("/api/import")
+async def import_statement(
+    request: Request,
+    account: str,
+    filename: str = "statement",
+    import_format: Optional[str] = Query(None, alias="format"),
+    date_format: Optional[str] = None,
+    amount_sign: str = "bank",
+):
+    """
+    Import a CSV or OFX/QFX statement sent as the raw request body into
+    `account`. format defaults to the filename extension. amount_sign "bank"
+    treats negative CSV amounts as money out, "plaid" as money in.
+    """
+    import_format = import_format or detect_format(filename)
+    if amount_sign not in ("bank", "plaid"):
+        raise HTTPException(status_code=400, detail="amount_sign must be bank or plaid")
+
+    # Spool the upload so the import can stream it from a blocking thread
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as upload:
+        async for chunk in request.stream():
+            upload.write(chunk)
+        total_bytes = upload.tell()
+        upload.seek(0)
+
+        summary, status_code, error = await run_blocking(
+            import_service.import_file,
+            upload,
+            account,
+            import_format,
+            filename,
+            total_bytes,
+            date_format,
+            amount_sign == "bank",
+        )
+
+    if error:
+        raise HTTPException(status_code=status_code, detail=error)
+    return summary
+
+
+@app.get("/api/summary")
+def get_summary(
+    from_month: str = Query(..., alias="from"),
+    to_month: Optional[str] = Query(None, alias="to"),
+    group_by: str = "category",
+    accounts: Optional[str] = None,
+    percentiles: str = "50,90",
+):
+    """
+    Summarize cached transactions for from..to (YYYY-MM, inclusive).
+    Query params: group_by (category, merchant or month), accounts
+    (comma separated, default ACCOUNT_TO_FILTER), percentiles (default 50,90;
+    empty skips them, whose cost grows with the number of transactions)
+    """
+    account_names = (
+        [name.strip() for name in accounts.split(",") if name.strip()]
+        if accounts
+        else None
+    )
+    summary, status_code, error = summary_service.get_summary(
+        from_month, to_month or from_month, group_by, account_names, percentiles
+    )
+
+    if error:
+        raise HTTPException(status_code=status_code, detail=error)
+    return summary
 
 
 @app.get("/api/notes")
@@ -108,32 +568,17 @@ async def save_notes(request: Request):
     save_note(year, month, notes)
     return {"success": True}
 
-# Mount static files (JS, CSS, images)
-# This serves files from /public/assets/* as /assets/*
-if PUBLIC_DIR.exists() and (PUBLIC_DIR / "assets").exists():
-    app.mount(
-        "/assets",
-        StaticFiles(directory=str(PUBLIC_DIR / "assets")),
-        name="static"
-    )
-
 # Catch-all route for React Router (client-side routing)
 # This must be LAST to avoid catching API routes
 @app.get("/{full_path:path}")
-def serve_react_app(full_path: str):
+def serve_react_app(full_path: str, request: Request):
     """
-    Serves the React app for all non-API routes.
-    This enables client-side routing in React.
+    Serves the React app for all non-API routes from the in-memory static
+    index. This enables client-side routing in React.
     """
-    # If requesting a file that exists, serve it
-    file_path = PUBLIC_DIR / full_path
-    if file_path.is_file():
-        return FileResponse(file_path)
-
-    # Otherwise, serve index.html (for React Router)
-    index_path = PUBLIC_DIR / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
+    response = static_index.response(request, full_path)
+    if response is not None:
+        return response
 
     # Fallback if build doesn't exist yet
     return {
@@ -0,0 +1,98 @@
+"""Compact in-memory transaction representation."""
+from typing import Any, Dict, Iterable, Optional
+
+import orjson
+
+# Fields held directly on the record, anything else is read from the payload
+COMPACT_FIELDS = (
+    "transaction_id",
+    "account_id",
+    "date",
+    "name",
+    "merchant_name",
+    "amount",
+    "iso_currency_code",
+    "category",
+    "pending",
+    "transaction_type",
+)
+
+
+class TransactionRecord:
+    """
+    The transaction fields the app uses, with the full Plaid payload kept as
+    undecoded JSON bytes and only parsed when a caller asks for it.
+    """
+
+    __slots__ = COMPACT_FIELDS + ("pfc_primary", "payload", "_raw")
+
+    def __init__(
+        self,
+        transaction_id: str,
+        account_id: Optional[str],
+        date: str,
+        name: Optional[str],
+        merchant_name: Optional[str],
+        amount: float,
+        iso_currency_code: Optional[str],
+        category: Optional[str],
+        pending: bool,
+        transaction_type: Optional[str],
+        pfc_primary: Optional[str],
+        payload: bytes,
+    ) -> None:
+        self.transaction_id = transaction_id
+        self.account_id = account_id
+        self.date = date
+        self.name = name
+        self.merchant_name = merchant_name
+        self.amount = amount
+        self.iso_currency_code = iso_currency_code
+        self.category = category
+        self.pending = pending
+        self.transaction_type = transaction_type
+        self.pfc_primary = pfc_primary
+        self.payload = payload
+        self._raw: Optional[Dict[str, Any]] = None
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """The full Plaid transaction dict, decoded on first access."""
+        if self._raw is None:
+            self._raw = orjson.loads(self.payload)
+        return self._raw
+
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Project the record onto `fields`, or return the full payload when no
+        fields are given. `personal_finance_category` is served from the
+        compact primary category so the dashboard never needs the payload; it
+        is None like Plaid's when only a legacy category was sent.
+        """
+        if fields is None:
+            return self.raw
+
+        result = {}
+        for field in fields:
+            if field in COMPACT_FIELDS:
+                result[field] = getattr(self, field)
+            elif field == "personal_finance_category":
+                result[field] = (
+                    {"primary": self.pfc_primary} if self.pfc_primary else None
+                )
+            else:
+                result[field] = self.raw.get(field)
+        return result
+
+    def to_json(self, fields: Optional[Iterable[str]] = None) -> bytes:
+        """Serialize the projection, reusing the stored bytes when unprojected."""
+        if fields is None:
+            return self.payload
+        return orjson.dumps(self.to_dict(fields))
+
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple[str, ...]]:
+    """Parse a comma separated `fields=` query param, None means everything."""
+    if not fields:
+        return None
+    return tuple(field.strip() for field in fields.split(",") if field.strip())
@@ -0,0 +1,158 @@
+"""Service layer for cached Plaid account metadata."""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from budget_tracker_api.app.services.plaid_client import PlaidClient
+from budget_tracker_api.app.services.plaid_transport import parse_plaid_error
+from budget_tracker_api.app.utils.concurrency import fan_out
+from budget_tracker_api.app.utils.database import (
+    clear_cached_accounts,
+    get_cached_accounts,
+    save_accounts,
+)
+from budget_tracker_api.app.utils.file_locks import bump_generation, get_generation
+from budget_tracker_api.app.utils.metrics import record_cache
+from budget_tracker_api.app.utils.storage import get_linked_items
+
+logger = logging.getLogger(__name__)
+
+# How long accounts_get results are trusted before refreshing from Plaid
+ACCOUNTS_CACHE_TTL_SECONDS = int(os.getenv("ACCOUNTS_CACHE_TTL_SECONDS", "86400"))
+# Least seconds between accounts_get refreshes forced by an unknown account
+# name, so a wrong ACCOUNT_TO_FILTER or accounts= value can't hammer Plaid
+ACCOUNTS_MISS_REFRESH_SECONDS = float(
+    os.getenv("ACCOUNTS_MISS_REFRESH_SECONDS", "300")
+)
+# Generation bumped when cached accounts are invalidated, by any worker
+ACCOUNTS_GENERATION = "accounts"
+
+
+class AccountService:
+    """
+    Caches accounts_get results per linked item in memory and in SQLite so
+    resolving ACCOUNT_TO_FILTER costs no network round-trip on cached requests.
+    Cached accounts carry the "item_id" of the item they belong to.
+    """
+
+    def __init__(self, client: PlaidClient = None):
+        self.client = client or PlaidClient()
+        self._lock = threading.Lock()
+        # item_id -> (accounts, fetched_at)
+        self._accounts: Dict[str, tuple[list[Dict[str, Any]], float]] = {}
+        self._item_locks: Dict[str, threading.Lock] = {}
+        self._generation = 0
+        # time.monotonic() of the last refresh forced by resolve_account
+        self._last_miss_refresh: Optional[float] = None
+
+    def get_accounts(
+        self, item: Dict[str, Any], force_refresh: bool = False
+    ) -> list[Dict[str, Any]]:
+        """Get an item's accounts, from cache while it is within the TTL."""
+        item_id = item["item_id"]
+        generation = get_generation(ACCOUNTS_GENERATION)
+        with self._lock:
+            if generation != self._generation:
+                # Another worker invalidated accounts, drop our copies too
+                self._accounts.clear()
+                self._generation = generation
+            item_lock = self._item_locks.setdefault(item_id, threading.Lock())
+
+        # Per-item lock, so refreshing one institution never blocks another
+        with item_lock:
+            cached = self._accounts.get(item_id)
+            if not force_refresh and cached is None:
+                accounts, fetched_at = get_cached_accounts(item_id)
+                if fetched_at is not None:
+                    cached = self._accounts[item_id] = (accounts, fetched_at)
+
+            if not force_refresh and _is_fresh(cached):
+                record_cache("accounts", "hit")
+                return cached[0]
+
+            record_cache("accounts", "miss")
+            logger.info(f"Refreshing account metadata for item {item_id}")
+            accounts = self.client.get_accounts(item["access_token"])
+            for acc in accounts:
+                acc["item_id"] = item_id
+            fetched_at = time.time()
+            save_accounts(item_id, accounts, fetched_at)
+            self._accounts[item_id] = (accounts, fetched_at)
+            return accounts
+
+    def get_all_accounts(self, force_refresh: bool = False) -> list[Dict[str, Any]]:
+        """Accounts of every linked item, stale items are refreshed in parallel."""
+        per_item = fan_out(
+            lambda item: self.get_accounts(item, force_refresh), get_linked_items()
+        )
+        return [acc for accounts in per_item for acc in accounts]
+
+    def resolve_account(
+        self, name: str
+    ) -> tuple[Optional[Dict[str, Any]], list[Dict[str, Any]]]:
+        """
+        Find an account by name across linked items, refreshing once if the
+        cached lists are missing it. Such refreshes happen at most once per
+        ACCOUNTS_MISS_REFRESH_SECONDS, later misses are answered from cache.
+        Returns: (account or None, accounts searched)
+        """
+        accounts = self.get_all_accounts()
+        account = _find_account(accounts, name)
+        if account is None and self._take_miss_refresh():
+            accounts = self.get_all_accounts(force_refresh=True)
+            account = _find_account(accounts, name)
+        return account, accounts
+
+    def _take_miss_refresh(self) -> bool:
+        """Whether a miss may force a refresh now, claiming it if so."""
+        now = time.monotonic()
+        with self._lock:
+            if (
+                self._last_miss_refresh is not None
+                and now - self._last_miss_refresh < ACCOUNTS_MISS_REFRESH_SECONDS
+            ):
+                return False
+            self._last_miss_refresh = now
+            return True
+
+    def get_account_names(self, item: Dict[str, Any]) -> Dict[str, str]:
+        """Map account_id to account name for a linked item."""
+        return {acc["account_id"]: acc["name"] for acc in self.get_accounts(item)}
+
+    def invalidate(self, item_id: Optional[str] = None) -> None:
+        """Drop cached accounts of one item (or all), e.g. after re-linking."""
+        with self._lock:
+            if item_id is None:
+                self._accounts.clear()
+            else:
+                self._accounts.pop(item_id, None)
+            clear_cached_accounts(item_id)
+        bump_generation(ACCOUNTS_GENERATION)
+
+    def invalidate_on_error(self, error: Exception, item_id: Optional[str]) -> None:
+        """
+        Drop the failing item's cached accounts when Plaid reports an ITEM
+        error. Other institutions keep theirs. Errors raised before an item
+        was chosen (e.g. by accounts_get itself) left nothing to drop.
+        """
+        if (
+            item_id is not None
+            and parse_plaid_error(error).get("error_type") == "ITEM_ERROR"
+        ):
+            logger.info(f"Plaid ITEM error, invalidating accounts of item {item_id}")
+            self.invalidate(item_id)
+
+
+def _is_fresh(cached: Optional[tuple[list[Dict[str, Any]], float]]) -> bool:
+    return (
+        cached is not None
+        and time.time() - cached[1] < ACCOUNTS_CACHE_TTL_SECONDS
+    )
+
+
+def _find_account(
+    accounts: list[Dict[str, Any]], name: str
+) -> Optional[Dict[str, Any]]:
+    return next((acc for acc in accounts if acc["name"] == name), None)
@@ -0,0 +1,233 @@
+"""Service layer for streaming bulk exports of stored transactions."""
+import csv
+import importlib.util
+import io
+import logging
+import os
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from budget_tracker_api.app.models.transaction import (
+    COMPACT_FIELDS,
+    TransactionRecord,
+)
+from budget_tracker_api.app.utils.database import (
+    get_transaction_date,
+    iter_transactions,
+)
+from budget_tracker_api.app.utils.storage import parse_date_bound
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# pyarrow is optional and only imported by the first columnar export
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+logger = logging.getLogger(__name__)
+
+# Rows read from SQLite and encoded per step of the pipeline
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+COLUMNAR_FORMATS = ("arrow", "parquet")
+
+
+class ExportService:
+    """
+    Streams transactions for any date range and account set as CSV, NDJSON,
+    Arrow IPC or Parquet. Rows flow through a generator pipeline
+    (keyset batches -> limit -> encoder), so memory is bounded by one batch.
+    """
+
+    def export(
+        self,
+        export_format: str = "csv",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        account_names: Optional[list[str]] = None,
+        fields: Optional[tuple[str, ...]] = None,
+        after: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[Optional[tuple[Iterator[bytes], str, str]], int, str]:
+        """
+        Build an export stream. start and end are inclusive YYYY-MM or
+        YYYY-MM-DD. Rows are ordered by (date, transaction_id); pass the last
+        transaction_id received as `after` to resume, and `limit` to download
+        in chunks. CSV and columnar formats default to the compact fields,
+        NDJSON to the full Plaid payload.
+        Returns: ((chunks, media_type, filename), status_code, error_message)
+        """
+        if export_format not in EXPORT_FORMATS:
+            return None, 400, f"format must be one of {list(EXPORT_FORMATS)}"
+        if export_format in COLUMNAR_FORMATS and not PYARROW_AVAILABLE:
+            return (
+                None,
+                501,
+                f"{export_format} export requires the pyarrow package",
+            )
+        if limit is not None and limit < 1:
+            return None, 400, "limit must be positive"
+
+        try:
+            start_date = parse_date_bound(start, inclusive_end=False) if start else None
+            end_date = parse_date_bound(end, inclusive_end=True) if end else None
+        except ValueError:
+            return None, 400, "from and to must be YYYY-MM or YYYY-MM-DD"
+
+        if export_format != "ndjson":
+            fields = fields or COMPACT_FIELDS
+            unknown = [field for field in fields if field not in COMPACT_FIELDS]
+            if unknown:
+                return (
+                    None,
+                    400,
+                    f"{export_format} export supports the fields "
+                    f"{list(COMPACT_FIELDS)}, got {unknown}",
+                )
+
+        resume_from = None
+        if after:
+            after_date = get_transaction_date(after)
+            if after_date is None:
+                return None, 400, f"Unknown export cursor '{after}'"
+            resume_from = (after_date, after)
+
+        batches = iter_transactions(
+            account_names or [os.getenv("ACCOUNT_TO_FILTER")],
+            start_date,
+            end_date,
+            resume_from,
+            EXPORT_BATCH_SIZE,
+        )
+        if limit is not None:
+            batches = _limit_batches(batches, limit)
+
+        encoder = {
+            "csv": _encode_csv,
+            "ndjson": _encode_ndjson,
+            "arrow": _encode_arrow,
+            "parquet": _encode_parquet,
+        }[export_format]
+        media_type, extension = EXPORT_FORMATS[export_format]
+        filename = f"transactions-{start or 'all'}-{end or 'latest'}.{extension}"
+        return (encoder(batches, fields), media_type, filename), 200, None
+
+
+def _limit_batches(
+    batches: Iterator[list[TransactionRecord]], limit: int
+) -> Iterator[list[TransactionRecord]]:
+    """Stop the pipeline after `limit` rows."""
+    remaining = limit
+    for batch in batches:
+        if len(batch) >= remaining:
+            yield batch[:remaining]
+            return
+        remaining -= len(batch)
+        yield batch
+
+
+def _encode_csv(
+    batches: Iterator[list[TransactionRecord]], fields: tuple[str, ...]
+) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for batch in batches:
+        writer.writerows(
+            [getattr(record, field) for field in fields] for record in batch
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _encode_ndjson(
+    batches: Iterator[list[TransactionRecord]], fields: Optional[tuple[str, ...]]
+) -> Iterator[bytes]:
+    for batch in batches:
+        yield b"".join(record.to_json(fields) + b"\n" for record in batch)
+
+
+def _arrow_schema(fields: tuple[str, ...]) -> "pa.Schema":
+    import pyarrow as pa
+
+    types = {"amount": pa.float64(), "pending": pa.bool_()}
+    return pa.schema([(field, types.get(field, pa.string())) for field in fields])
+
+
+def _arrow_batch(
+    batch: list[TransactionRecord], schema: "pa.Schema"
+) -> "pa.RecordBatch":
+    import pyarrow as pa
+
+    return pa.record_batch(
+        [
+            [getattr(record, field) for record in batch]
+            for field in schema.names
+        ],
+        schema=schema,
+    )
+
+
+def _encode_arrow(
+    batches: Iterator[list[TransactionRecord]], fields: tuple[str, ...]
+) -> Iterator[bytes]:
+    """Arrow IPC stream format, one record batch per pipeline batch."""
+    import pyarrow as pa
+
+    schema = _arrow_schema(fields)
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(_arrow_batch(batch, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _encode_parquet(
+    batches: Iterator[list[TransactionRecord]], fields: tuple[str, ...]
+) -> Iterator[bytes]:
+    """Parquet file written as a stream, one row group per pipeline batch."""
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(fields)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_batch(_arrow_batch(batch, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
@@ -0,0 +1,217 @@
+"""Service layer for importing bank statement files into the transaction store."""
+import hashlib
+import io
+import logging
+import os
+import time
+from collections import Counter
+from itertools import islice
+from typing import IO, Any, Callable, Dict, Iterator, Optional
+
+from budget_tracker_api.app.utils.database import (
+    IMPORT_ID_PREFIX,
+    count_fingerprints,
+    insert_new_transactions,
+    matching_fingerprints,
+    transaction_fingerprint,
+)
+from budget_tracker_api.app.utils.statements import (
+    StatementError,
+    parse_csv_statement,
+    parse_ofx_statement,
+)
+
+logger = logging.getLogger(__name__)
+
+# Parsed rows deduplicated and inserted per database transaction
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+IMPORT_FORMATS = ("csv", "ofx")
+IMPORT_EXTENSIONS = {".csv": "csv", ".ofx": "ofx", ".qfx": "ofx"}
+# Errors kept in the summary, the rest are only counted
+IMPORT_MAX_REPORTED_ERRORS = 20
+
+
+class ImportService:
+    """
+    Loads CSV and OFX/QFX statements into the transaction store, for history
+    older than Plaid's window or from institutions Plaid cannot reach.
+    Files are parsed as a stream and written in batches. Rows already stored
+    (from Plaid or an earlier import) are skipped by fingerprint: account and
+    amount on the same day or a day either side. Each stored transaction
+    absorbs at most one imported row.
+    """
+
+    def import_file(
+        self,
+        stream: IO[bytes],
+        account_name: str,
+        file_format: str,
+        filename: str = "statement",
+        total_bytes: Optional[int] = None,
+        date_format: Optional[str] = None,
+        negate_amounts: bool = True,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> tuple[dict, int, str]:
+        """
+        Import one statement file opened in binary mode. `progress` is called
+        with the running summary after every batch.
+        Returns: (import_summary, status_code, error_message)
+        """
+        if file_format not in IMPORT_FORMATS:
+            return None, 400, f"format must be one of {list(IMPORT_FORMATS)}"
+        if not account_name:
+            return None, 400, "An account name is required"
+
+        summary = {
+            "file": filename,
+            "account": account_name,
+            "bytes_read": 0,
+            "total_bytes": total_bytes,
+            "rows": 0,
+            "inserted": 0,
+            "duplicates": 0,
+            "errors": 0,
+            "error_samples": [],
+            "seconds": 0.0,
+        }
+        started = time.perf_counter()
+        text = None
+        try:
+            if file_format == "csv":
+                text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+                entries = parse_csv_statement(text, date_format, negate_amounts)
+            else:
+                entries = parse_ofx_statement(stream)
+
+            # Occurrences of each fingerprint so far in this file, and stored
+            # transactions per fingerprint not yet matched to an imported row.
+            # A row's own fingerprint is loaded before any row carrying it is
+            # inserted, so rows this import wrote are never counted as stored.
+            seen: Counter = Counter()
+            unmatched: Dict[str, int] = {}
+            for batch in _batched(entries, IMPORT_BATCH_SIZE):
+                rows = []
+                for entry in batch:
+                    summary["rows"] += 1
+                    if "error" in entry:
+                        _record_error(summary, entry["error"])
+                        continue
+                    rows.append(_transaction(account_name, filename, entry))
+
+                unloaded = {
+                    fingerprint for tx in rows for fingerprint in tx["candidates"]
+                } - unmatched.keys()
+                stored = count_fingerprints(unloaded)
+                unmatched.update(
+                    (fingerprint, stored.get(fingerprint, 0))
+                    for fingerprint in unloaded
+                )
+
+                to_insert = []
+                for tx in rows:
+                    fingerprint = tx.pop("fingerprint")
+                    candidates = tx.pop("candidates")
+                    occurrence = seen[fingerprint]
+                    seen[fingerprint] += 1
+                    # Repeated identical rows are real (two coffees in a day),
+                    # only as many as are already stored are duplicates
+                    match = next(
+                        (fp for fp in candidates if unmatched[fp] > 0), None
+                    )
+                    if match is not None:
+                        unmatched[match] -= 1
+                        summary["duplicates"] += 1
+                        continue
+                    if tx["transaction_id"] is None:
+                        tx["transaction_id"] = _import_id(fingerprint, occurrence)
+                    to_insert.append((account_name, tx))
+
+                inserted = insert_new_transactions(to_insert)
+                summary["inserted"] += inserted
+                summary["duplicates"] += len(to_insert) - inserted
+                summary["bytes_read"] = _position(stream)
+                summary["seconds"] = round(time.perf_counter() - started, 3)
+                if progress:
+                    progress(dict(summary))
+
+        except (StatementError, UnicodeDecodeError) as e:
+            return None, 400, f"{filename}: {e}"
+        except Exception as e:
+            logger.error(f"Failed to import {filename}: {e}", exc_info=True)
+            return None, 500, str(e)
+        finally:
+            if text is not None:
+                # Leave the caller's stream open
+                text.detach()
+
+        summary["bytes_read"] = _position(stream) or summary["bytes_read"]
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Imported {filename} into {account_name}: {summary['inserted']} new, "
+            f"{summary['duplicates']} duplicates, {summary['errors']} errors"
+        )
+        return summary, 200, None
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """Statement format from a file name's extension, None when unknown."""
+    return IMPORT_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def _transaction(
+    account_name: str, filename: str, entry: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Shape a parsed statement entry like a Plaid transaction dict."""
+    transaction_id = None
+    if entry["external_id"]:
+        # Bank ids (OFX FITID) make re-imports of the same entry idempotent
+        key = f"{account_name}|{entry['external_id']}"
+        transaction_id = IMPORT_ID_PREFIX + hashlib.sha1(key.encode()).hexdigest()[:24]
+
+    return {
+        "transaction_id": transaction_id,
+        "account_id": None,
+        "date": entry["date"],
+        "name": entry["name"],
+        "merchant_name": None,
+        "amount": entry["amount"],
+        "iso_currency_code": entry["iso_currency_code"],
+        "personal_finance_category": (
+            {"primary": entry["category"]} if entry["category"] else None
+        ),
+        "pending": False,
+        "transaction_type": None,
+        "import_source": filename,
+        "fingerprint": transaction_fingerprint(
+            account_name, entry["date"], entry["amount"]
+        ),
+        "candidates": matching_fingerprints(
+            account_name, entry["date"], entry["amount"]
+        ),
+    }
+
+
+def _import_id(fingerprint: str, occurrence: int) -> str:
+    key = f"{fingerprint}|{occurrence}"
+    return IMPORT_ID_PREFIX + hashlib.sha1(key.encode()).hexdigest()[:24]
+
+
+def _record_error(summary: Dict[str, Any], message: str) -> None:
+    summary["errors"] += 1
+    if len(summary["error_samples"]) < IMPORT_MAX_REPORTED_ERRORS:
+        summary["error_samples"].append(message)
+
+
+def _batched(entries: Iterator[Dict[str, Any]], size: int) -> Iterator[list]:
+    while True:
+        batch = list(islice(entries, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _position(stream: IO[bytes]) -> int:
+    try:
+        return stream.tell()
+    except (OSError, ValueError):
+        return 0
@@ -0,0 +1,253 @@
+"""Service layer for live transaction updates, streamed as Server-Sent Events."""
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
+
+import orjson
+
+from budget_tracker_api.app.models.transaction import (
+    COMPACT_FIELDS,
+    TransactionRecord,
+)
+from budget_tracker_api.app.utils.broadcast import Broadcaster
+from budget_tracker_api.app.utils.concurrency import run_blocking
+from budget_tracker_api.app.utils.database import (
+    MonthChange,
+    add_change_listener,
+    get_month_content_hash,
+    get_rollups,
+    get_transactions_by_ids,
+)
+from budget_tracker_api.app.utils.storage import month_range
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on an idle stream, under proxy timeouts
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+# Seconds between checks for months changed by other processes
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "5"))
+# Streams end after this long and the browser reconnects, so restarts drain
+# and reconnecting clients spread over the current workers
+LIVE_MAX_STREAM_SECONDS = float(os.getenv("LIVE_MAX_STREAM_SECONDS", "300"))
+# Milliseconds EventSource waits before reconnecting
+LIVE_RETRY_MS = 3000
+# Fields sent for added and modified transactions unless the client picks
+LIVE_DEFAULT_FIELDS = COMPACT_FIELDS + ("personal_finance_category",)
+
+
+class LiveEvent:
+    """
+    One SSE event for an account month. Added and modified transactions are
+    kept as records and serialized once per distinct field projection.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        month: Dict[str, Any],
+        added: Optional[list[TransactionRecord]] = None,
+        modified: Optional[list[TransactionRecord]] = None,
+        removed: Optional[list[str]] = None,
+    ) -> None:
+        self.name = name
+        self.month = month
+        self.added = added
+        self.modified = modified
+        self.removed = removed
+        self._rendered: Dict[tuple[str, ...], bytes] = {}
+
+    def render(self, fields: tuple[str, ...]) -> bytes:
+        rendered = self._rendered.get(fields)
+        if rendered is None:
+            data = dict(self.month)
+            if self.added is not None:
+                data["added"] = [record.to_dict(fields) for record in self.added]
+                data["modified"] = [
+                    record.to_dict(fields) for record in self.modified
+                ]
+                data["removed"] = self.removed
+            rendered = b"event: %s\ndata: %s\n\n" % (
+                self.name.encode(),
+                orjson.dumps(data),
+            )
+            self._rendered[fields] = rendered
+        return rendered
+
+
+class LiveUpdateService:
+    """
+    Pushes changes to the local store to subscribed clients. Writes made by
+    this process arrive as row level deltas through the database change hook;
+    writes by other processes (other workers, the import CLI) are noticed by
+    polling the content hash of subscribed months and sent as "changed".
+    """
+
+    def __init__(self, broadcaster: Broadcaster = None):
+        self.broadcaster = broadcaster or Broadcaster()
+        # Last content hash announced per (account_name, YYYY-MM) topic,
+        # shared by the event loop, writer threads and the Plaid executor
+        self._hashes: Dict[tuple[str, str], str] = {}
+        self._hashes_lock = threading.Lock()
+        self._poll_task: Optional[asyncio.Task] = None
+        add_change_listener(self._on_store_change)
+
+    def stream_month(
+        self,
+        year: str,
+        month: str,
+        account_names: list[str],
+        fields: Optional[tuple[str, ...]] = None,
+    ) -> tuple[Optional[AsyncIterator[bytes]], int, str]:
+        """
+        Subscribe to changes of one month across the named accounts.
+        Returns: (sse_chunks, status_code, error_message)
+        """
+        try:
+            ((year, month),) = month_range(f"{year}-{month}", f"{year}-{month}")
+        except ValueError:
+            return None, 400, "year and month must be a valid YYYY and MM"
+
+        topics = [(name, f"{year}-{month}") for name in account_names]
+        return self._stream(topics, fields or LIVE_DEFAULT_FIELDS), 200, None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "subscribers": self.broadcaster.subscriber_count(),
+            "months": len(self.broadcaster.topics()),
+        }
+
+    async def stop(self) -> None:
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+
+    async def _stream(
+        self, topics: list[tuple[str, str]], fields: tuple[str, ...]
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield a "ready" event per account with the month's totals, then
+        "delta" and "changed" events until the stream's time is up.
+        """
+        # Subscribe first, so nothing committed after the snapshot is missed
+        subscription = self.broadcaster.subscribe(topics)
+        self._ensure_polling()
+        try:
+            yield b"retry: %d\n\n" % LIVE_RETRY_MS
+            for topic in topics:
+                event = await run_blocking(self._current_event, "ready", topic)
+                yield event.render(fields)
+
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + LIVE_MAX_STREAM_SECONDS
+            while loop.time() < deadline:
+                event = await subscription.get(
+                    min(LIVE_HEARTBEAT_SECONDS, max(deadline - loop.time(), 0))
+                )
+                if subscription.overflowed:
+                    # Too far behind for deltas, resend where each month stands
+                    subscription.clear()
+                    for topic in topics:
+                        event = await run_blocking(
+                            self._current_event, "changed", topic
+                        )
+                        yield event.render(fields)
+                elif event is None:
+                    yield b": keep-alive\n\n"
+                else:
+                    yield event.render(fields)
+        finally:
+            self.broadcaster.unsubscribe(subscription)
+
+    def _on_store_change(self, changes: list[MonthChange]) -> None:
+        """Database change hook, runs on the writing thread after commit."""
+        for change in changes:
+            topic = (change.account_name, change.year_month)
+            if not self.broadcaster.has_subscribers(topic):
+                continue
+            with self._hashes_lock:
+                if self._hashes.get(topic) == change.content_hash:
+                    continue
+                self._hashes[topic] = change.content_hash
+            try:
+                event = self._change_event(change)
+            except Exception:
+                logger.exception(f"Failed to build live update for {topic}")
+                continue
+            self.broadcaster.publish(topic, event)
+
+    def _change_event(self, change: MonthChange) -> LiveEvent:
+        month = self._month_state(
+            change.account_name, change.year_month, change.content_hash
+        )
+        if change.added is None:
+            return LiveEvent("changed", month)
+
+        records = get_transactions_by_ids(change.added + change.modified)
+        added_ids = set(change.added)
+        return LiveEvent(
+            "delta",
+            month,
+            added=[r for r in records if r.transaction_id in added_ids],
+            modified=[r for r in records if r.transaction_id not in added_ids],
+            removed=change.removed,
+        )
+
+    def _current_event(self, name: str, topic: tuple[str, str]) -> LiveEvent:
+        content_hash = get_month_content_hash(*topic)
+        with self._hashes_lock:
+            self._hashes[topic] = content_hash
+        return LiveEvent(name, self._month_state(*topic, content_hash))
+
+    def _month_state(
+        self, account_name: str, year_month: str, content_hash: str
+    ) -> Dict[str, Any]:
+        """Totals mirror /api/summary, which leaves "special" payments out."""
+        rows = get_rollups(
+            [account_name], year_month, year_month, "month", with_amounts=False
+        )
+        total, count = (rows[0][2], rows[0][3]) if rows else (0.0, 0)
+        return {
+            "account": account_name,
+            "month": year_month,
+            "content_hash": content_hash,
+            "totals": {"total": round(total, 2), "count": count},
+        }
+
+    def _ensure_polling(self) -> None:
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_other_writers())
+
+    async def _poll_other_writers(self) -> None:
+        """Runs while anyone is subscribed, one hash lookup per subscribed month."""
+        while True:
+            await asyncio.sleep(LIVE_POLL_SECONDS)
+            topics = self.broadcaster.topics()
+            with self._hashes_lock:
+                # Forget months nobody watches anymore
+                for topic in set(self._hashes).difference(topics):
+                    del self._hashes[topic]
+            if not topics:
+                return
+            try:
+                events = await run_blocking(self._poll_hashes, topics)
+            except Exception:
+                logger.exception("Failed to poll subscribed months for changes")
+                continue
+            for topic, event in events:
+                self.broadcaster.publish(topic, event)
+
+    def _poll_hashes(
+        self, topics: list[tuple[str, str]]
+    ) -> list[tuple[tuple[str, str], LiveEvent]]:
+        events = []
+        for topic in topics:
+            with self._hashes_lock:
+                known = self._hashes.get(topic)
+            if known is None:
+                # Its first subscriber has not been sent "ready" yet
+                continue
+            if get_month_content_hash(*topic) != known:
+                events.append((topic, self._current_event("changed", topic)))
+        return events
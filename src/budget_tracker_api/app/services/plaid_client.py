@@ -1,57 +1,52 @@
-"""Plaid API client implementation."""
+"""
+Plaid API client implementation. Request models are imported inside each
+call, so importing this module does not load the plaid SDK.
+"""
+import logging
 import os
+import random
+import time
 import uuid
 from datetime import date
+from typing import TYPE_CHECKING, Optional
 
-import plaid
-from dotenv import load_dotenv
-from plaid.api import plaid_api
-from plaid.model.accounts_get_request import AccountsGetRequest
-from plaid.model.country_code import CountryCode
-from plaid.model.item_public_token_exchange_request import (
-    ItemPublicTokenExchangeRequest,
-)
-from plaid.model.link_token_create_request import LinkTokenCreateRequest
-from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
-from plaid.model.products import Products
-from plaid.model.transaction import Transaction
-from plaid.model.transactions_get_request import TransactionsGetRequest
-
-load_dotenv()
-
-
-def get_plaid_environment():
-    """Get Plaid environment based on PLAID_ENV setting."""
-    env = os.getenv("PLAID_ENV", "sandbox").lower()
-    if env == "production":
-        return plaid.Environment.Production
-    elif env == "development":
-        return plaid.Environment.Development
-    else:
-        return plaid.Environment.Sandbox
-
-
-configuration = plaid.Configuration(
-    host=get_plaid_environment(),
-    api_key={
-        "clientId": os.getenv("PLAID_CLIENT_ID"),
-        "secret": os.getenv("PLAID_SECRET"),
-    },
+from budget_tracker_api.app.services.plaid_transport import (
+    PlaidTransport,
+    get_shared_transport,
+    parse_plaid_error,
 )
 
+if TYPE_CHECKING:
+    from plaid.model.transaction import Transaction
+
+logger = logging.getLogger(__name__)
+
+# Page size for paginated /transactions/get and /transactions/sync calls
+TRANSACTIONS_PAGE_SIZE = 500
+# Times a sync restarts after the item changed mid-pagination before giving up
+SYNC_MAX_RESTARTS = 3
+# Public URL of /api/plaid/webhook, registered on items when they are linked
+PLAID_WEBHOOK_URL = os.getenv("PLAID_WEBHOOK_URL")
+
 
 class PlaidClient:
     """Plaid API client for banking operations."""
 
-    def __init__(self) -> None:
-        """Initialize the Plaid client."""
-        api_client = plaid.ApiClient(configuration)
-        self.client = plaid_api.PlaidApi(api_client)
+    def __init__(self, transport: Optional[PlaidTransport] = None) -> None:
+        """Initialize the Plaid client on a (shared by default) transport."""
+        self.transport = transport or get_shared_transport()
 
     def create_link_token(
         self, redirect_uri: str = None, access_token: str = None
     ) -> dict:
         """Create a link token for account linking or update mode."""
+        from plaid.model.country_code import CountryCode
+        from plaid.model.link_token_create_request import LinkTokenCreateRequest
+        from plaid.model.link_token_create_request_user import (
+            LinkTokenCreateRequestUser,
+        )
+        from plaid.model.products import Products
+
         request_params = {
             "user": LinkTokenCreateRequestUser(
                 client_user_id=str(uuid.uuid4()),
@@ -66,6 +61,9 @@ class PlaidClient:
         if redirect_uri:
             request_params["redirect_uri"] = redirect_uri
 
+        if PLAID_WEBHOOK_URL:
+            request_params["webhook"] = PLAID_WEBHOOK_URL
+
         # Add update mode if access_token is provided
         if access_token:
             request_params["access_token"] = access_token
@@ -73,7 +71,7 @@ class PlaidClient:
             del request_params["products"]
 
         request = LinkTokenCreateRequest(**request_params)
-        response = self.client.link_token_create(request)
+        response = self.transport.call("link_token_create", request)
         link_token = response["link_token"]
         result = {
             "link_token": link_token,
@@ -88,27 +86,49 @@ class PlaidClient:
 
     def exchange_public_token(self, public_token: str) -> dict:
         """Exchange public token for access token."""
+        from plaid.model.item_public_token_exchange_request import (
+            ItemPublicTokenExchangeRequest,
+        )
+
         request = ItemPublicTokenExchangeRequest(public_token=public_token)
-        response = self.client.item_public_token_exchange(request)
+        response = self.transport.call(
+            "item_public_token_exchange", request, idempotent=False
+        )
         access_token = response["access_token"]
-        print(f"Access token: {access_token}")
         item_id = response["item_id"]
+        logger.info(f"Exchanged public token for item {item_id}")
         return {
             "access_token": access_token,
             "item_id": item_id,
         }
 
+    def get_webhook_verification_key(self, key_id: str) -> dict:
+        """Get the public JWK Plaid signs webhooks with for `key_id`."""
+        from plaid.model.webhook_verification_key_get_request import (
+            WebhookVerificationKeyGetRequest,
+        )
+
+        request = WebhookVerificationKeyGetRequest(key_id=key_id)
+        response = self.transport.call("webhook_verification_key_get", request)
+        return response["key"].to_dict()
+
     def get_accounts(self, access_token: str) -> list:
         """Get account information."""
+        from plaid.model.accounts_get_request import AccountsGetRequest
+
         request = AccountsGetRequest(access_token=access_token)
-        response = self.client.accounts_get(request)
+        response = self.transport.call("accounts_get", request)
         accounts = response["accounts"]
-        return accounts
+        return [acc.to_dict() for acc in accounts]
 
     def get_transactions(
         self, access_token: str, account_id: str, year: str, month: str
-    ) -> list[Transaction]:
+    ) -> list["Transaction"]:
         """Get transactions for a date range."""
+        from plaid.model.transactions_get_request import TransactionsGetRequest
+        from plaid.model.transactions_get_request_options import (
+            TransactionsGetRequestOptions,
+        )
 
         # Convert strings to date objects
         start_date = date(int(year), int(month), 1)
@@ -119,13 +139,92 @@ class PlaidClient:
         else:
             end_date = date(int(year), int(month) + 1, 1) - date.resolution
 
-        request = TransactionsGetRequest(
-            access_token=access_token, start_date=start_date, end_date=end_date
-        )
-        response = self.client.transactions_get(request)
-        all_transactions = response["transactions"]
+        # Page through the month, Plaid caps each response at `count` rows
+        all_transactions = []
+        total_transactions = None
+        while total_transactions is None or len(all_transactions) < total_transactions:
+            request = TransactionsGetRequest(
+                access_token=access_token,
+                start_date=start_date,
+                end_date=end_date,
+                options=TransactionsGetRequestOptions(
+                    account_ids=[account_id],
+                    count=TRANSACTIONS_PAGE_SIZE,
+                    offset=len(all_transactions),
+                ),
+            )
+            response = self.transport.call("transactions_get", request)
+            all_transactions.extend(response["transactions"])
+            total_transactions = response["total_transactions"]
+            if not response["transactions"]:
+                break
 
         filtered_transactions = [
             tx for tx in all_transactions if tx.account_id == account_id
         ]
         return filtered_transactions
+
+    def sync_transactions(
+        self, access_token: str, cursor: Optional[str] = None
+    ) -> dict:
+        """
+        Pull every change since `cursor` from /transactions/sync. An item
+        that keeps changing mid-pagination is retried SYNC_MAX_RESTARTS times
+        with the transport's backoff, then the error is raised.
+        Returns: {"added", "modified", "removed", "next_cursor"} where
+        added/modified are transaction dicts and removed are transaction ids.
+        """
+        from plaid import ApiException
+
+        restarts = 0
+        while True:
+            try:
+                return self._sync_pages(access_token, cursor)
+            except ApiException as e:
+                # The item changed while we were paging, restart from the
+                # cursor we started with as recommended by Plaid
+                if (
+                    parse_plaid_error(e).get("error_code")
+                    != "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"
+                    or restarts >= SYNC_MAX_RESTARTS
+                ):
+                    raise
+            restarts += 1
+            delay = random.uniform(0, self.transport.backoff_seconds * 2**restarts)
+            logger.warning(
+                f"Item changed during sync pagination, restart {restarts} "
+                f"in {delay:.2f}s"
+            )
+            time.sleep(delay)
+
+    def _sync_pages(self, access_token: str, cursor: Optional[str]) -> dict:
+        """Follow has_more until the sync delta is complete."""
+        from plaid.model.transactions_sync_request import TransactionsSyncRequest
+
+        added = []
+        modified = []
+        removed = []
+        has_more = True
+        while has_more:
+            request_params = {
+                "access_token": access_token,
+                "count": TRANSACTIONS_PAGE_SIZE,
+            }
+            if cursor:
+                request_params["cursor"] = cursor
+
+            request = TransactionsSyncRequest(**request_params)
+            response = self.transport.call("transactions_sync", request)
+            added.extend(tx.to_dict() for tx in response["added"])
+            modified.extend(tx.to_dict() for tx in response["modified"])
+            removed.extend(tx["transaction_id"] for tx in response["removed"])
+            has_more = response["has_more"]
+            cursor = response["next_cursor"]
+
+        return {
+            "added": added,
+            "modified": modified,
+            "removed": removed,
+            "next_cursor": cursor,
+        }
+
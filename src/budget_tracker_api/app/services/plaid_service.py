@@ -1,24 +1,72 @@
 """Service layer for Plaid operations."""
+from budget_tracker_api.app.services.account_service import AccountService
 from budget_tracker_api.app.services.plaid_client import PlaidClient
-from budget_tracker_api.app.utils.storage import get_access_token, save_access_token
+from budget_tracker_api.app.utils.concurrency import run_blocking
+from budget_tracker_api.app.utils.storage import (
+    DEFAULT_USER_ID,
+    get_access_token,
+    get_item_id,
+    get_linked_items,
+    save_access_token,
+    set_item_needs_update,
+)
 
 
 class PlaidService:
     """High-level service for Plaid operations."""
 
-    def __init__(self):
-        self.client = PlaidClient()
+    def __init__(
+        self, account_service: AccountService = None, client: PlaidClient = None
+    ):
+        self.client = client or PlaidClient()
+        self.account_service = account_service or AccountService(self.client)
 
     def create_link_token(self) -> dict:
         """Create a link token for account linking."""
         return self.client.create_link_token(redirect_uri=None)
 
-    def create_update_link_token(self) -> tuple[dict, int, str]:
+    async def create_link_token_async(self) -> dict:
+        """Async create_link_token run on the Plaid executor."""
+        return await run_blocking(self.create_link_token)
+
+    async def create_update_link_token_async(
+        self, item_id: str = None
+    ) -> tuple[dict, int, str]:
+        """Async create_update_link_token run on the Plaid executor."""
+        return await run_blocking(self.create_update_link_token, item_id)
+
+    async def complete_update_async(
+        self, item_id: str = None
+    ) -> tuple[dict, int, str]:
+        """Async complete_update run on the Plaid executor."""
+        return await run_blocking(self.complete_update, item_id)
+
+    async def exchange_public_token_async(
+        self,
+        public_token: str,
+        user_id: str = DEFAULT_USER_ID,
+        institution_name: str = None,
+    ) -> tuple[dict, int, str]:
+        """Async exchange_public_token run on the Plaid executor."""
+        return await run_blocking(
+            self.exchange_public_token, public_token, user_id, institution_name
+        )
+
+    def list_items(self, user_id: str = None) -> list[dict]:
+        """Linked items without their access tokens."""
+        return [
+            {key: value for key, value in item.items() if key != "access_token"}
+            for item in get_linked_items(user_id)
+        ]
+
+    def create_update_link_token(self, item_id: str = None) -> tuple[dict, int, str]:
         """
-        Create a link token for re-authentication (update mode).
+        Create a link token for re-authentication (update mode) of an item,
+        the most recently linked one by default.
         Returns: (response_data, status_code, error_message)
         """
-        access_token = get_access_token()
+        item_id = item_id or get_item_id()
+        access_token = get_access_token(item_id) if item_id else None
         if not access_token:
             return (
                 None,
@@ -34,9 +82,30 @@ class PlaidService:
         except Exception as e:
             return None, 500, str(e)
 
-    def exchange_public_token(self, public_token: str) -> tuple[dict, int, str]:
+    def complete_update(self, item_id: str = None) -> tuple[dict, int, str]:
         """
-        Exchange public token for access token and save it.
+        Record that update mode succeeded for an item, the most recently
+        linked one by default. Re-linking can add or rename accounts, so its
+        cached accounts are dropped only now that the new ones are in place.
+        Returns: (response_data, status_code, error_message)
+        """
+        item_id = item_id or get_item_id()
+        if not item_id or not get_access_token(item_id):
+            return None, 404, "No linked item found"
+
+        set_item_needs_update(item_id, False)
+        self.account_service.invalidate(item_id)
+        return {"success": True, "item_id": item_id}, 200, None
+
+    def exchange_public_token(
+        self,
+        public_token: str,
+        user_id: str = DEFAULT_USER_ID,
+        institution_name: str = None,
+    ) -> tuple[dict, int, str]:
+        """
+        Exchange public token for access token and add the item to the
+        token registry alongside any items linked before it.
         Returns: (response_data, status_code, error_message)
         """
         if not public_token:
@@ -44,11 +113,14 @@ class PlaidService:
 
         try:
             result = self.client.exchange_public_token(public_token)
-            save_access_token(result["access_token"], result["item_id"])
-            return {
-                "success": True,
-                "item_id": result["item_id"],
-                "access_token": result["access_token"]
-            }, 200, None
+            save_access_token(
+                result["access_token"],
+                result["item_id"],
+                user_id or DEFAULT_USER_ID,
+                institution_name,
+            )
+            self.account_service.invalidate(result["item_id"])
+            # The access token never leaves the server
+            return {"success": True, "item_id": result["item_id"]}, 200, None
         except Exception as e:
             return None, 500, str(e)
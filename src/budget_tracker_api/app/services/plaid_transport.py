@@ -0,0 +1,234 @@
+"""
+Shared HTTP transport for Plaid API calls. The plaid SDK is imported on the
+first call, so processes that only serve cached data never load it.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+from budget_tracker_api.app.utils.metrics import (
+    PLAID_REQUEST_SECONDS,
+    MetricFamily,
+    trace_span,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PLAID_POOL_SIZE = int(os.getenv("PLAID_POOL_SIZE", "10"))
+PLAID_CONNECT_TIMEOUT = float(os.getenv("PLAID_CONNECT_TIMEOUT", "5"))
+PLAID_READ_TIMEOUT = float(os.getenv("PLAID_READ_TIMEOUT", "30"))
+PLAID_MAX_RETRIES = int(os.getenv("PLAID_MAX_RETRIES", "3"))
+PLAID_BACKOFF_SECONDS = float(os.getenv("PLAID_BACKOFF_SECONDS", "0.5"))
+
+# 429 is Plaid's RATE_LIMIT_EXCEEDED, 5xx are transient Plaid/edge failures
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def get_plaid_environment():
+    """Get Plaid environment based on PLAID_ENV setting."""
+    import plaid
+
+    # PLAID_HOST points the client at a local fake Plaid server for testing
+    if os.getenv("PLAID_HOST"):
+        return os.getenv("PLAID_HOST")
+
+    env = os.getenv("PLAID_ENV", "sandbox").lower()
+    if env == "production":
+        return plaid.Environment.Production
+    elif env == "development":
+        return plaid.Environment.Development
+    else:
+        return plaid.Environment.Sandbox
+
+
+def parse_plaid_error(error: Exception) -> dict:
+    """Extract the Plaid error (error_type, error_code, ...) from an exception."""
+    try:
+        return json.loads(error.body) or {}
+    except (AttributeError, TypeError, ValueError):
+        return {}
+
+
+class PlaidTransport:
+    """
+    One urllib3 connection pool shared by every PlaidClient, with explicit
+    timeouts, jittered retries on 429/5xx and pool usage metrics. The SDK
+    client and its pool are created on the first call.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = PLAID_POOL_SIZE,
+        connect_timeout: float = PLAID_CONNECT_TIMEOUT,
+        read_timeout: float = PLAID_READ_TIMEOUT,
+        max_retries: int = PLAID_MAX_RETRIES,
+        backoff_seconds: float = PLAID_BACKOFF_SECONDS,
+    ) -> None:
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+        self._api = None
+        self._api_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._saturated_calls = 0
+        self._calls = 0
+        self._retries = 0
+        self._errors: Counter = Counter()
+
+    @property
+    def api(self) -> Any:
+        """The plaid PlaidApi client, importing the SDK on first use."""
+        if self._api is None:
+            with self._api_lock:
+                if self._api is None:
+                    self._api = self._create_api()
+        return self._api
+
+    def _create_api(self) -> Any:
+        import plaid
+        from plaid.api import plaid_api
+
+        configuration = plaid.Configuration(
+            host=get_plaid_environment(),
+            api_key={
+                "clientId": os.getenv("PLAID_CLIENT_ID"),
+                "secret": os.getenv("PLAID_SECRET"),
+            },
+        )
+        # Keep up to pool_size keep-alive connections open to Plaid
+        configuration.connection_pool_maxsize = self.pool_size
+        return plaid_api.PlaidApi(plaid.ApiClient(configuration))
+
+    def call(self, operation: str, request: Any, idempotent: bool = True) -> Any:
+        """
+        Invoke a PlaidApi operation (e.g. "accounts_get") with timeouts and
+        retries. Non-idempotent calls are only retried on 429, which Plaid
+        returns before doing any work.
+        """
+        from plaid import ApiException
+
+        method = getattr(self.api, operation)
+        attempt = 0
+        while True:
+            self._acquire()
+            start = time.perf_counter()
+            result = "ok"
+            try:
+                return method(request, _request_timeout=self.timeout)
+            except ApiException as e:
+                result = _error_code(e)
+                retryable = e.status == 429 or (
+                    idempotent and e.status in RETRYABLE_STATUSES
+                )
+                if not retryable or attempt >= self.max_retries:
+                    self._record_error(e)
+                    raise
+            except Exception as e:
+                # Timeouts and connection errors never reached Plaid's API
+                result = _error_code(e)
+                self._record_error(e)
+                raise
+            finally:
+                self._release()
+                seconds = time.perf_counter() - start
+                PLAID_REQUEST_SECONDS.observe(seconds, operation, result)
+                trace_span(f"plaid.{operation}", start, seconds)
+
+            attempt += 1
+            delay = random.uniform(0, self.backoff_seconds * 2**attempt)
+            with self._lock:
+                self._retries += 1
+            logger.warning(
+                f"Plaid {operation} throttled or failed, retry {attempt} "
+                f"in {delay:.2f}s"
+            )
+            time.sleep(delay)
+
+    def metrics(self) -> dict:
+        """Snapshot of pool usage, retries and error codes."""
+        with self._lock:
+            return {
+                "pool_size": self.pool_size,
+                "in_flight": self._in_flight,
+                "peak_in_flight": self._peak_in_flight,
+                "saturated_calls": self._saturated_calls,
+                "calls": self._calls,
+                "retries": self._retries,
+                "errors": dict(self._errors),
+            }
+
+    def metric_families(self) -> list[MetricFamily]:
+        """metrics() as Prometheus families for utils.metrics.render_families."""
+        snapshot = self.metrics()
+        families = []
+        for key, metric_type, help in (
+            ("pool_size", "gauge", "Plaid connection pool size"),
+            ("in_flight", "gauge", "Plaid calls in flight"),
+            ("peak_in_flight", "gauge", "Most Plaid calls in flight at once"),
+            ("saturated_calls", "counter", "Plaid calls made with the pool full"),
+            ("calls", "counter", "Plaid call attempts"),
+            ("retries", "counter", "Plaid calls retried after 429/5xx"),
+        ):
+            name = f"budget_tracker_plaid_{key}"
+            if metric_type == "counter":
+                name += "_total"
+            families.append((name, metric_type, help, [({}, snapshot[key])]))
+
+        families.append((
+            "budget_tracker_plaid_errors_total",
+            "counter",
+            "Plaid calls that failed after retries, by error code",
+            [({"code": code}, count) for code, count in snapshot["errors"].items()],
+        ))
+        return families
+
+    def _acquire(self) -> None:
+        with self._lock:
+            self._calls += 1
+            self._in_flight += 1
+            self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+            # Past pool_size urllib3 opens throwaway connections or blocks
+            if self._in_flight > self.pool_size:
+                self._saturated_calls += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def _record_error(self, error: Exception) -> None:
+        with self._lock:
+            self._errors[_error_code(error)] += 1
+
+
+def _error_code(error: Exception) -> str:
+    """Plaid error code, else HTTP status, else the exception type."""
+    status = getattr(error, "status", None)
+    if status is None:
+        return type(error).__name__
+    return parse_plaid_error(error).get("error_code") or f"HTTP_{status}"
+
+
+_shared_transport: Optional[PlaidTransport] = None
+_shared_transport_lock = threading.Lock()
+
+
+def get_shared_transport() -> PlaidTransport:
+    """Get the process-wide Plaid transport, creating it on first use."""
+    global _shared_transport
+    with _shared_transport_lock:
+        if _shared_transport is None:
+            _shared_transport = PlaidTransport()
+        return _shared_transport
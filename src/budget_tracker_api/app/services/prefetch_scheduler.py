@@ -0,0 +1,210 @@
+"""Background scheduler that keeps recent months warm in the local store."""
+import asyncio
+import logging
+import os
+import time
+from datetime import date
+from typing import Optional
+
+from budget_tracker_api.app.services.transaction_service import TransactionService
+from budget_tracker_api.app.utils.concurrency import run_blocking
+from budget_tracker_api.app.utils.file_locks import FileLock
+from budget_tracker_api.app.utils.storage import get_month_freshness, month_range
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") == "1"
+# Seconds between runs, matches the open month TTL by default
+PREFETCH_INTERVAL_SECONDS = int(os.getenv("PREFETCH_INTERVAL_SECONDS", "900"))
+# How many months before the current one to keep warm
+PREFETCH_MONTHS_BACK = int(os.getenv("PREFETCH_MONTHS_BACK", "3"))
+# Months fetched at once, kept below PLAID_MAX_WORKERS so user requests
+# always have executor capacity
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+# Minimum spacing between Plaid-bound prefetches
+PREFETCH_MIN_INTERVAL_SECONDS = float(os.getenv("PREFETCH_MIN_INTERVAL_SECONDS", "1"))
+# Longest pause after Plaid reports RATE_LIMIT_EXCEEDED
+PREFETCH_MAX_BACKOFF_SECONDS = 3600
+# Lock held by the one worker process that runs prefetch passes
+PREFETCH_LEADER_LOCK = "prefetch-leader"
+
+
+class PrefetchScheduler:
+    """
+    Periodically syncs the current month and prefetches the previous
+    PREFETCH_MONTHS_BACK months, so user requests hit warm local data.
+    With several worker processes only the leader, the holder of the
+    PREFETCH_LEADER_LOCK lease, runs passes; another takes over within an
+    interval if the leader exits.
+    """
+
+    def __init__(
+        self,
+        transaction_service: TransactionService,
+        interval_seconds: int = PREFETCH_INTERVAL_SECONDS,
+        months_back: int = PREFETCH_MONTHS_BACK,
+        concurrency: int = PREFETCH_CONCURRENCY,
+        min_interval_seconds: float = PREFETCH_MIN_INTERVAL_SECONDS,
+    ) -> None:
+        self.transaction_service = transaction_service
+        self.interval_seconds = interval_seconds
+        self.months_back = months_back
+        self.concurrency = concurrency
+        self.min_interval_seconds = min_interval_seconds
+
+        self._task: Optional[asyncio.Task] = None
+        # Created on the server's event loop, not at import time
+        self._wake: Optional[asyncio.Event] = None
+        self._rate_lock: Optional[asyncio.Lock] = None
+        self._leader_lock = FileLock(PREFETCH_LEADER_LOCK)
+        self._last_call_at = 0.0
+        self._backoff_seconds = 0.0
+        self._status = {
+            "running": False,
+            "leader": False,
+            "in_progress": False,
+            "runs": 0,
+            "last_run_started_at": None,
+            "last_run_finished_at": None,
+            "last_run_months": [],
+            "last_error": None,
+            "next_run_at": None,
+        }
+
+    def start(self) -> None:
+        """Start the scheduler loop on the running event loop."""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._loop(), name="prefetch")
+            self._status["running"] = True
+
+    async def stop(self) -> None:
+        """Cancel the scheduler loop and wait for it to exit."""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._status["running"] = False
+        self._leader_lock.release()
+        self._status["leader"] = False
+
+    def trigger(self) -> None:
+        """Run the next pass now instead of waiting for the interval."""
+        if self._wake is not None:
+            self._wake.set()
+
+    def status(self) -> dict:
+        """Snapshot of scheduler state for the status endpoint."""
+        return {
+            **self._status,
+            "interval_seconds": self.interval_seconds,
+            "months_back": self.months_back,
+            "concurrency": self.concurrency,
+            "backoff_seconds": self._backoff_seconds,
+        }
+
+    async def run_once(self) -> None:
+        """Sync the current month, then warm any cold or stale recent months."""
+        self._status["in_progress"] = True
+        self._status["last_run_started_at"] = time.time()
+        self._status["last_error"] = None
+        warmed = []
+        try:
+            _, status_code, error = await self._rate_limited(
+                self.transaction_service.sync_service.sync_async
+            )
+            if error:
+                self._record_error(status_code, error)
+                return
+
+            today = date.today()
+            months = month_range(
+                _shift_month(today, -self.months_back), f"{today:%Y-%m}"
+            )
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def warm(year: str, month: str) -> None:
+                async with semaphore:
+                    if not await self._needs_warming(year, month):
+                        return
+                    _, status_code, error = await self._rate_limited(
+                        self.transaction_service.warm_month_async, year, month
+                    )
+                    if error:
+                        self._record_error(status_code, error)
+                    else:
+                        warmed.append(f"{year}-{month}")
+
+            await asyncio.gather(*(warm(year, month) for year, month in months))
+            if not self._status["last_error"]:
+                self._backoff_seconds = 0.0
+        finally:
+            self._status["runs"] += 1
+            self._status["in_progress"] = False
+            self._status["last_run_finished_at"] = time.time()
+            self._status["last_run_months"] = sorted(warmed)
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                if self._is_leader():
+                    await self.run_once()
+            except Exception as e:
+                logger.error(f"Prefetch run failed: {e}", exc_info=True)
+                self._status["last_error"] = str(e)
+
+            delay = max(self.interval_seconds, self._backoff_seconds)
+            self._status["next_run_at"] = time.time() + delay
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _is_leader(self) -> bool:
+        """Take the leader lease if it is free, never waiting for it."""
+        if not self._leader_lock.held and self._leader_lock.acquire(timeout=0):
+            logger.info("Prefetch leader lease acquired")
+        self._status["leader"] = self._leader_lock.held
+        return self._leader_lock.held
+
+    async def _needs_warming(self, year: str, month: str) -> bool:
+        freshness = await run_blocking(
+            get_month_freshness, os.getenv("ACCOUNT_TO_FILTER"), year, month
+        )
+        return freshness in (None, "stale")
+
+    async def _rate_limited(self, func, *args):
+        """Space Plaid-bound calls at least min_interval_seconds apart."""
+        if self._rate_lock is None:
+            self._rate_lock = asyncio.Lock()
+        async with self._rate_lock:
+            wait = self._last_call_at + self.min_interval_seconds - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_call_at = time.monotonic()
+        return await func(*args)
+
+    def _record_error(self, status_code: int, error: str) -> None:
+        self._status["last_error"] = error
+        if status_code == 429 or "RATE_LIMIT" in str(error):
+            # Plaid is throttling us, back off exponentially between runs
+            self._backoff_seconds = min(
+                max(self._backoff_seconds * 2, self.interval_seconds * 2),
+                PREFETCH_MAX_BACKOFF_SECONDS,
+            )
+            logger.warning(
+                f"Plaid rate limit hit, prefetch backing off "
+                f"{self._backoff_seconds:.0f}s"
+            )
+
+
+def _shift_month(day: date, months: int) -> str:
+    """YYYY-MM for the month `months` away from day's month."""
+    index = day.year * 12 + day.month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
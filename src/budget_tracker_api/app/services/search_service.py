@@ -0,0 +1,82 @@
+"""Service layer for searching locally stored transactions."""
+import logging
+import os
+from typing import Optional
+
+from budget_tracker_api.app.utils.database import search_transactions
+from budget_tracker_api.app.utils.storage import parse_date_bound
+
+logger = logging.getLogger(__name__)
+
+# Page size bounds for search results
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 500
+
+
+class SearchService:
+    """
+    Full-text and faceted search over the local transaction store. Never
+    calls Plaid, so results cover whatever has been synced or fetched.
+    """
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        account_names: Optional[list[str]] = None,
+        limit: int = SEARCH_DEFAULT_LIMIT,
+        offset: int = 0,
+        fields: Optional[tuple[str, ...]] = None,
+    ) -> tuple[dict, int, str]:
+        """
+        Search transactions. start and end are inclusive and either
+        YYYY-MM (whole months) or YYYY-MM-DD.
+        Returns: (results, status_code, error_message)
+        """
+        if not 1 <= limit <= SEARCH_MAX_LIMIT:
+            return None, 400, f"limit must be between 1 and {SEARCH_MAX_LIMIT}"
+        if offset < 0:
+            return None, 400, "offset must not be negative"
+
+        try:
+            start_date = parse_date_bound(start, inclusive_end=False) if start else None
+            end_date = parse_date_bound(end, inclusive_end=True) if end else None
+        except ValueError:
+            return None, 400, "from and to must be YYYY-MM or YYYY-MM-DD"
+
+        if start_date and end_date and end_date <= start_date:
+            return None, 400, "from must not be after to"
+
+        try:
+            records, total, facets = search_transactions(
+                account_names or [os.getenv("ACCOUNT_TO_FILTER")],
+                query=query.strip() if query else None,
+                category=category,
+                min_amount=min_amount,
+                max_amount=max_amount,
+                start_date=start_date,
+                end_date=end_date,
+                limit=limit,
+                offset=offset,
+            )
+        except Exception as e:
+            logger.error(f"Failed to search transactions: {e}", exc_info=True)
+            return None, 500, str(e)
+
+        next_offset = offset + len(records)
+        return {
+            "transactions": [record.to_dict(fields) for record in records],
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "next_offset": next_offset if next_offset < total else None,
+            "facets": {
+                facet: [{"value": value, "count": count} for value, count in rows]
+                for facet, rows in facets.items()
+            },
+        }, 200, None
+
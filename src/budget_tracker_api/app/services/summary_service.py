@@ -0,0 +1,126 @@
+"""Service layer for spending summaries over cached transactions."""
+import logging
+import os
+from array import array
+from typing import Optional
+
+from budget_tracker_api.app.utils.database import get_rollups
+from budget_tracker_api.app.utils.storage import month_range
+
+logger = logging.getLogger(__name__)
+
+GROUP_BY_OPTIONS = ("category", "merchant", "month")
+
+
+class SummaryService:
+    """
+    Computes totals, counts and averages from the per-month rollups, so their
+    cost depends on months and groups, not transactions. Percentiles are
+    exact and read and sort every amount in the range, O(n log n) in the
+    number of transactions; without percentiles the amounts are not read.
+    """
+
+    def get_summary(
+        self,
+        start: str,
+        end: str,
+        group_by: str = "category",
+        account_names: Optional[list[str]] = None,
+        percentiles: str = "50,90",
+    ) -> tuple[dict, int, str]:
+        """
+        Summarize spending for start..end (YYYY-MM, inclusive).
+        Returns: (summary, status_code, error_message)
+        """
+        if group_by not in GROUP_BY_OPTIONS:
+            return None, 400, f"group_by must be one of {list(GROUP_BY_OPTIONS)}"
+
+        try:
+            months = month_range(start, end)
+            quantiles = [float(p) for p in percentiles.split(",") if p.strip()]
+        except ValueError:
+            return (
+                None,
+                400,
+                "from and to must be YYYY-MM with from <= to, "
+                "percentiles must be numbers",
+            )
+
+        if any(q < 0 or q > 100 for q in quantiles):
+            return None, 400, "percentiles must be between 0 and 100"
+
+        try:
+            account_names = account_names or [os.getenv("ACCOUNT_TO_FILTER")]
+            rows = get_rollups(
+                account_names,
+                f"{months[0][0]}-{months[0][1]}",
+                f"{months[-1][0]}-{months[-1][1]}",
+                group_by,
+                with_amounts=bool(quantiles),
+            )
+
+            # Merge the per-month rollups into one column of amounts per group
+            groups: dict[str, tuple[float, int, array]] = {}
+            for _, group_key, total, count, amounts in rows:
+                group_total, group_count, group_amounts = groups.get(
+                    group_key, (0.0, 0, array("d"))
+                )
+                if amounts is not None:
+                    group_amounts.frombytes(amounts)
+                groups[group_key] = (
+                    group_total + total,
+                    group_count + count,
+                    group_amounts,
+                )
+
+            month_count = len(months)
+            summary_groups = [
+                {
+                    "key": group_key,
+                    "total": round(total, 2),
+                    "count": count,
+                    "average": round(total / count, 2) if count else 0.0,
+                    "monthly_average": round(total / month_count, 2),
+                    "percentiles": _percentiles(amounts, quantiles),
+                }
+                for group_key, (total, count, amounts) in groups.items()
+            ]
+            if group_by == "month":
+                summary_groups.sort(key=lambda group: group["key"])
+            else:
+                summary_groups.sort(key=lambda group: group["total"], reverse=True)
+
+            grand_total = sum(total for total, _, _ in groups.values())
+            return {
+                "from": start,
+                "to": end,
+                "group_by": group_by,
+                "months": month_count,
+                "total": round(grand_total, 2),
+                "count": sum(count for _, count, _ in groups.values()),
+                "monthly_average": round(grand_total / month_count, 2),
+                "groups": summary_groups,
+            }, 200, None
+
+        except Exception as e:
+            logger.error(f"Failed to build summary: {e}", exc_info=True)
+            return None, 500, str(e)
+
+
+def _percentiles(amounts: array, quantiles: list[float]) -> dict[str, float]:
+    """Linear-interpolated percentiles of an amount column, sorting a copy."""
+    if not amounts or not quantiles:
+        return {}
+
+    ordered = sorted(amounts)
+    last = len(ordered) - 1
+    result = {}
+    for q in quantiles:
+        position = last * q / 100
+        lower = int(position)
+        upper = min(lower + 1, last)
+        value = ordered[lower] + (ordered[upper] - ordered[lower]) * (
+            position - lower
+        )
+        result[f"p{q:g}"] = round(value, 2)
+    return result
@@ -0,0 +1,137 @@
+"""Service layer for incremental transaction sync."""
+import logging
+from typing import Any, Dict
+
+from budget_tracker_api.app.services.account_service import AccountService
+from budget_tracker_api.app.services.plaid_client import PlaidClient
+from budget_tracker_api.app.services.plaid_transport import parse_plaid_error
+from budget_tracker_api.app.utils.concurrency import SingleFlight, fan_out
+from budget_tracker_api.app.utils.database import (
+    get_cached_month,
+    get_open_cached_months,
+)
+from budget_tracker_api.app.utils.file_locks import cache_key_lock
+from budget_tracker_api.app.utils.storage import (
+    apply_transaction_changes,
+    get_linked_items,
+    get_sync_cursor,
+    mark_month_fetched,
+    save_sync_cursor,
+    set_item_needs_update,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SyncService:
+    """Keeps the local transaction store current via /transactions/sync."""
+
+    def __init__(
+        self, client: PlaidClient = None, account_service: AccountService = None
+    ):
+        self.client = client or PlaidClient()
+        self.account_service = account_service or AccountService(self.client)
+        self._in_flight = SingleFlight()
+
+    async def sync_async(self) -> tuple[dict, int, str]:
+        """Async sync on the Plaid executor, overlapping syncs are collapsed."""
+        return await self._in_flight.run("sync", self.sync)
+
+    def sync(self) -> tuple[dict, int, str]:
+        """
+        Pull added/modified/removed transactions since each linked item's
+        stored cursor and apply them to the local store. Items are synced in
+        parallel; failed items are listed under "failed_items".
+        Returns: (sync_summary, status_code, error_message)
+        """
+        items = get_linked_items()
+        if not items:
+            return (
+                None,
+                404,
+                "No access token found. Please link an account first.",
+            )
+
+        results = fan_out(self.sync_item, items)
+        summary = {"added": 0, "modified": 0, "removed": 0, "failed_items": {}}
+        for item, (item_summary, _, error) in zip(items, results):
+            if error:
+                summary["failed_items"][item["item_id"]] = error
+                continue
+            for key in ("added", "modified", "removed"):
+                summary[key] += item_summary[key]
+
+        if len(summary["failed_items"]) == len(items):
+            _, status_code, error = results[0]
+            return None, status_code, error
+        return summary, 200, None
+
+    def sync_item(self, item: Dict[str, Any]) -> tuple[dict, int, str]:
+        """
+        Sync a single linked item from its stored cursor. The item's
+        cross-process lock covers reading the cursor through saving the next
+        one, so workers never apply the same delta twice. ITEM errors flag
+        the item for update mode, a successful sync clears the flag.
+        Returns: (sync_summary, status_code, error_message)
+        """
+        item_id = item["item_id"]
+        try:
+            with cache_key_lock(f"sync-{item_id}"):
+                result = self._sync_item_locked(item)
+            if item.get("needs_update"):
+                set_item_needs_update(item_id, False)
+            return result
+
+        except Exception as e:
+            self.account_service.invalidate_on_error(e, item_id)
+            plaid_error = parse_plaid_error(e)
+            if plaid_error.get("error_type") == "ITEM_ERROR":
+                set_item_needs_update(item_id, True, plaid_error.get("error_code"))
+            logger.error(f"Failed to sync item {item_id}: {e}", exc_info=True)
+            return None, getattr(e, "status", None) or 500, str(e)
+
+    def _sync_item_locked(self, item: Dict[str, Any]) -> tuple[dict, int, str]:
+        item_id = item["item_id"]
+        cursor = get_sync_cursor(item_id)
+        delta = self.client.sync_transactions(item["access_token"], cursor)
+
+        if delta["added"] or delta["modified"] or delta["removed"]:
+            account_names = self.account_service.get_account_names(item)
+            apply_transaction_changes(
+                account_names,
+                delta["added"],
+                delta["modified"],
+                delta["removed"],
+            )
+
+        save_sync_cursor(item_id, delta["next_cursor"])
+        self._mark_months_synced(item, delta["added"] + delta["modified"])
+
+        summary = {
+            "added": len(delta["added"]),
+            "modified": len(delta["modified"]),
+            "removed": len(delta["removed"]),
+        }
+        logger.info(f"Synced transactions for item {item_id}: {summary}")
+        return summary, 200, None
+
+    def _mark_months_synced(
+        self, item: Dict[str, Any], transactions: list[Dict[str, Any]]
+    ) -> None:
+        """
+        Every open month fetched before, and every month the delta touched,
+        is current as of this sync, so none needs a refetch (and another
+        sync) until its TTL runs out again. Only months fetched in full
+        before are marked, the oldest month of the sync window may be partial.
+        """
+        account_names = self.account_service.get_account_names(item)
+        months = {
+            (account_names[tx["account_id"]], str(tx["date"])[:7])
+            for tx in transactions
+            if tx["account_id"] in account_names
+        }
+        months.update(get_open_cached_months(account_names.values()))
+        for account_name, year_month in sorted(months):
+            if get_cached_month(account_name, year_month) is not None:
+                year, month = year_month.split("-")
+                mark_month_fetched(account_name, year, month)
@@ -1,46 +1,94 @@
 """Service layer for transaction operations."""
+import asyncio
 import logging
 import os
+from typing import Any, AsyncIterator, Dict, Optional
 
+import orjson
+
+from budget_tracker_api.app.models.transaction import TransactionRecord
+from budget_tracker_api.app.services.account_service import AccountService
 from budget_tracker_api.app.services.plaid_client import PlaidClient
+from budget_tracker_api.app.services.sync_service import SyncService
+from budget_tracker_api.app.utils.concurrency import SingleFlight, run_blocking
+from budget_tracker_api.app.utils.database import (
+    get_cached_month,
+    get_month_content_hash,
+)
+from budget_tracker_api.app.utils.file_locks import cache_key_lock
+from budget_tracker_api.app.utils.http_cache import (
+    FINAL_MONTH_CACHE_CONTROL,
+    OPEN_MONTH_CACHE_CONTROL,
+    make_etag,
+)
+from budget_tracker_api.app.utils.metrics import record_cache, stage
 from budget_tracker_api.app.utils.storage import (
     get_access_token,
     get_cached_transactions,
+    get_linked_items,
+    get_month_freshness,
+    mark_month_fetched,
+    month_range,
     save_cached_transactions,
 )
 
 logger = logging.getLogger(__name__)
 
+# Largest from/to range accepted by the range API (ten years)
+MAX_RANGE_MONTHS = 120
+
 
 class TransactionService:
     """High-level service for transaction operations."""
 
-    def __init__(self):
-        self.client = PlaidClient()
+    def __init__(
+        self, account_service: AccountService = None, client: PlaidClient = None
+    ):
+        self.client = client or PlaidClient()
+        self.account_service = account_service or AccountService(self.client)
+        self.sync_service = SyncService(self.client, self.account_service)
+        self._in_flight = SingleFlight()
 
-    def get_transactions(self, year: str, month: str) -> tuple[list, int, str]:
+    async def get_transactions_async(
+        self, year: str, month: str, fields: Optional[tuple[str, ...]] = None
+    ) -> tuple[list, int, str]:
+        """
+        Async get_transactions run on the Plaid executor. Concurrent requests
+        for the same year/month share a single upstream fetch.
         """
-        Get transactions for specified year and month.
+        return await self._in_flight.run(
+            ("transactions", year, month, fields),
+            self.get_transactions,
+            year,
+            month,
+            fields,
+        )
+
+    def get_transactions(
+        self, year: str, month: str, fields: Optional[tuple[str, ...]] = None
+    ) -> tuple[list, int, str]:
+        """
+        Get transactions for specified year and month, projected onto
+        `fields` when given (see TransactionRecord.to_dict).
         Returns: (transactions, status_code, error_message)
         """
+        account = None
         try:
-            access_token = get_access_token()
-            if not access_token:
+            with stage("token_load"):
+                linked = get_linked_items()
+            if not linked:
                 return (
                     None,
                     404,
                     "No access token found. Please link an account first.",
                 )
 
-            # Get accounts
-            accounts = self.client.get_accounts(access_token)
-
-            # Find the account to filter
+            # Find the account to filter from cached account metadata
             account_filter = os.getenv("ACCOUNT_TO_FILTER")
-            account = next(
-                (acc for acc in accounts if acc["name"] == account_filter),
-                None,
-            )
+            with stage("accounts_lookup"):
+                account, accounts = self.account_service.resolve_account(
+                    account_filter
+                )
 
             if not account:
                 logger.error(f"Account '{account_filter}' not found")
@@ -53,23 +101,290 @@ class TransactionService:
                     f"Available accounts: {available}",
                 )
 
-            # Check cache first
-            transactions = get_cached_transactions(account["name"], year, month)
+            with stage("token_load"):
+                access_token = get_access_token(account["item_id"])
+            records = self._load_month(access_token, account, year, month)
+            with stage("project"):
+                transactions = [record.to_dict(fields) for record in records]
+            return transactions, 200, None
+
+        except Exception as e:
+            self.account_service.invalidate_on_error(
+                e, account["item_id"] if account else None
+            )
+            logger.error(f"Failed to fetch transactions: {e}", exc_info=True)
+            return None, 500, str(e)
+
+    async def warm_month_async(self, year: str, month: str) -> tuple[int, int, str]:
+        """Async warm_month on the Plaid executor, shared with identical calls."""
+        return await self._in_flight.run(
+            ("warm", year, month), self.warm_month, year, month
+        )
+
+    def warm_month(self, year: str, month: str) -> tuple[int, int, str]:
+        """
+        Make sure a month of ACCOUNT_TO_FILTER is in the local store, without
+        building a response. Used by the prefetch scheduler. A cold or stale
+        month is fetched before returning, so the scheduler's pacing covers
+        the Plaid call instead of a background refresh.
+        Returns: (transaction_count, status_code, error_message)
+        """
+        account = None
+        try:
+            if not get_linked_items():
+                return 0, 404, "No access token found."
 
-            if not transactions:
-                # Fetch from Plaid if not cached
-                logger.info(f"Fetching transactions from Plaid for {year}-{month}")
+            account_filter = os.getenv("ACCOUNT_TO_FILTER")
+            account, _ = self.account_service.resolve_account(account_filter)
+            if not account:
+                return 0, 404, f"Account '{account_filter}' not found."
+
+            access_token = get_access_token(account["item_id"])
+            records = self._fetch_month(access_token, account, year, month)
+            return len(records), 200, None
+
+        except Exception as e:
+            self.account_service.invalidate_on_error(
+                e, account["item_id"] if account else None
+            )
+            logger.error(f"Failed to warm {year}-{month}: {e}", exc_info=True)
+            return 0, getattr(e, "status", None) or 500, str(e)
+
+    def get_month_validators(
+        self, year: str, month: str, fields: Optional[tuple[str, ...]] = None
+    ) -> Optional[tuple[str, str, str]]:
+        """
+        HTTP validators for a cached month of ACCOUNT_TO_FILTER, computed from
+        local state only. None when the month has never been fetched.
+        Returns: (etag, cache_control, freshness)
+        """
+        account_name = os.getenv("ACCOUNT_TO_FILTER")
+        freshness = get_month_freshness(account_name, year, month)
+        if freshness is None:
+            return None
+
+        content_hash = get_month_content_hash(account_name, f"{year}-{month}")
+        etag = make_etag(account_name, content_hash, ",".join(fields or ["*"]))
+        cache_control = (
+            FINAL_MONTH_CACHE_CONTROL
+            if freshness == "final"
+            else OPEN_MONTH_CACHE_CONTROL
+        )
+        return etag, cache_control, freshness
+
+    async def stream_transaction_range(
+        self,
+        start: str,
+        end: str,
+        account_names: Optional[list[str]] = None,
+        fields: Optional[tuple[str, ...]] = None,
+    ) -> tuple[Optional[AsyncIterator[bytes]], int, str]:
+        """
+        Stream transactions for every month in start..end (YYYY-MM, inclusive)
+        across the named accounts as NDJSON. Missing months are fetched from
+        Plaid in parallel and months are emitted in order as they are ready.
+        Returns: (ndjson_chunks, status_code, error_message)
+        """
+        try:
+            months = month_range(start, end)
+        except ValueError:
+            return None, 400, "from and to must be YYYY-MM with from <= to"
+
+        if len(months) > MAX_RANGE_MONTHS:
+            return None, 400, f"Range is limited to {MAX_RANGE_MONTHS} months"
+
+        try:
+            accounts, status_code, error = await run_blocking(
+                self._resolve_range_accounts, account_names
+            )
+        except Exception as e:
+            logger.error(f"Failed to prepare transaction range: {e}", exc_info=True)
+            return None, 500, str(e)
+        if error:
+            return None, status_code, error
+
+        futures = [
+            (
+                account["item_id"],
+                self._in_flight.submit(
+                    ("month", account["account_id"], year, month),
+                    self._load_month,
+                    access_token,
+                    account,
+                    year,
+                    month,
+                ),
+            )
+            for account, access_token in accounts
+            for year, month in months
+        ]
+        return self._stream_ndjson(futures, fields), 200, None
+
+    def _resolve_range_accounts(
+        self, account_names: Optional[list[str]]
+    ) -> tuple[list[tuple[Dict[str, Any], str]], int, str]:
+        """
+        Resolve the named accounts and each one's access token, once per
+        account rather than once per month.
+        Returns: ([(account, access_token)], status_code, error_message)
+        """
+        if not get_linked_items():
+            return None, 404, "No access token found. Please link an account first."
+
+        accounts = []
+        for name in account_names or [os.getenv("ACCOUNT_TO_FILTER")]:
+            account, available = self.account_service.resolve_account(name)
+            if not account:
+                names = [acc["name"] for acc in available]
+                return (
+                    None,
+                    404,
+                    f"Account '{name}' not found. Available accounts: {names}",
+                )
+            accounts.append((account, get_access_token(account["item_id"])))
+        return accounts, 200, None
+
+    async def _stream_ndjson(
+        self, futures: list, fields: Optional[tuple[str, ...]]
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield each month's transactions as NDJSON once its fetch completes.
+        `futures` are (item_id, future) pairs.
+        """
+        for item_id, future in futures:
+            try:
+                records = await asyncio.wrap_future(future)
+            except Exception as e:
+                self.account_service.invalidate_on_error(e, item_id)
+                logger.error(f"Failed to stream transactions: {e}", exc_info=True)
+                yield orjson.dumps({"error": str(e)}) + b"\n"
+                return
+
+            if records:
+                yield b"".join(record.to_json(fields) + b"\n" for record in records)
+
+    def _load_month(
+        self,
+        access_token: str,
+        account: Dict[str, Any],
+        year: str,
+        month: str,
+    ) -> list[TransactionRecord]:
+        """
+        Read a month from the local store, pulling it from Plaid on a miss.
+        Closed months are immutable once cached. Open months past their TTL
+        are served stale while a background refresh brings them up to date.
+        """
+        freshness = get_month_freshness(account["name"], year, month)
+        if freshness is None:
+            record_cache("month", "miss")
+            return self._fetch_month(access_token, account, year, month)
+
+        record_cache("month", "stale" if freshness == "stale" else "hit")
+        if freshness == "stale":
+            self._in_flight.submit(
+                ("refresh", account["account_id"], year, month),
+                self._refresh_month,
+                access_token,
+                account,
+                year,
+                month,
+            )
+
+        with stage("cache_read"):
+            transactions = (
+                get_cached_transactions(account["name"], year, month) or []
+            )
+        # Logged on every cached request, so sampled and formatted lazily
+        logger.info(
+            "Using %s cached transactions: %d transactions",
+            freshness,
+            len(transactions),
+            extra={"sample": "month_cache_read"},
+        )
+        return transactions
+
+    def _refresh_month(
+        self, access_token: str, account: Dict[str, Any], year: str, month: str
+    ) -> None:
+        """Background refresh of a stale open month."""
+        try:
+            self._fetch_month(access_token, account, year, month)
+        except Exception as e:
+            self.account_service.invalidate_on_error(e, account["item_id"])
+            logger.error(f"Failed to refresh {year}-{month}: {e}", exc_info=True)
+
+    def _fetch_month(
+        self,
+        access_token: str,
+        account: Dict[str, Any],
+        year: str,
+        month: str,
+    ) -> list[TransactionRecord]:
+        """
+        Pull a month from Plaid into the local store and record the fetch.
+        Holds the month's cross-process lock, so when several workers miss
+        the same month only the first calls Plaid and the rest read its result.
+        """
+        with cache_key_lock(f"month-{account['account_id']}-{year}-{month}"):
+            # Another worker may have filled the month while we waited
+            if get_month_freshness(account["name"], year, month) in (
+                "fresh",
+                "final",
+            ):
+                with stage("cache_read"):
+                    transactions = get_cached_transactions(
+                        account["name"], year, month
+                    )
+                return transactions or []
+            return self._fetch_month_locked(access_token, account, year, month)
+
+    def _fetch_month_locked(
+        self,
+        access_token: str,
+        account: Dict[str, Any],
+        year: str,
+        month: str,
+    ) -> list[TransactionRecord]:
+        """
+        A month fetched in full before is brought current by a sync. Any other
+        month is fetched directly: rows already stored for it (from a statement
+        import, or a sync window that starts mid-month) may be partial. A
+        failed sync serves the stored rows but leaves the month stale, so the
+        next request tries again.
+        """
+        if get_cached_month(account["name"], f"{year}-{month}") is not None:
+            # Pull the delta since the last sync, which updates every month
+            # inside Plaid's sync window in one call
+            logger.info(f"Syncing transactions from Plaid for {year}-{month}")
+            with stage("plaid_sync"):
+                summary, _, error = self.sync_service.sync()
+            if summary is not None:
+                error = summary["failed_items"].get(account["item_id"])
+            with stage("cache_read"):
+                transactions = get_cached_transactions(
+                    account["name"], year, month
+                )
+            if error:
+                logger.warning(
+                    f"Sync failed, serving stored {year}-{month}: {error}"
+                )
+                return transactions or []
+        else:
+            logger.info(f"Fetching transactions from Plaid for {year}-{month}")
+            with stage("plaid_fetch"):
                 transactions = self.client.get_transactions(
                     access_token, account["account_id"], year, month
                 )
                 transactions = [tx.to_dict() for tx in transactions]
-                save_cached_transactions(account["name"], year, month, transactions)
-            else:
-                count = len(transactions)
-                logger.info(f"Using cached transactions: {count} transactions")
-
-            return transactions, 200, None
+            with stage("cache_write"):
+                save_cached_transactions(
+                    account["name"], year, month, transactions
+                )
+            with stage("cache_read"):
+                transactions = get_cached_transactions(
+                    account["name"], year, month
+                )
 
-        except Exception as e:
-            logger.error(f"Failed to fetch transactions: {e}", exc_info=True)
-            return None, 500, str(e)
+        mark_month_fetched(account["name"], year, month)
+        return transactions or []
@@ -0,0 +1,180 @@
+"""Service layer for Plaid webhooks: push-driven sync and item status."""
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import orjson
+
+from budget_tracker_api.app.services.account_service import AccountService
+from budget_tracker_api.app.services.plaid_client import PlaidClient
+from budget_tracker_api.app.services.sync_service import SyncService
+from budget_tracker_api.app.utils.concurrency import run_blocking, submit_blocking
+from budget_tracker_api.app.utils.storage import (
+    get_linked_items,
+    set_item_needs_update,
+)
+from budget_tracker_api.app.utils.webhook_verification import WebhookVerifier
+
+logger = logging.getLogger(__name__)
+
+# Set to 0 to accept unsigned webhooks, only for local simulators
+PLAID_WEBHOOK_VERIFY = os.getenv("PLAID_WEBHOOK_VERIFY", "1") == "1"
+
+# TRANSACTIONS webhooks meaning /transactions/sync has something new
+SYNC_WEBHOOK_CODES = {
+    "SYNC_UPDATES_AVAILABLE",
+    "DEFAULT_UPDATE",
+    "INITIAL_UPDATE",
+    "HISTORICAL_UPDATE",
+    "TRANSACTIONS_REMOVED",
+}
+# ITEM webhooks meaning the user must re-authenticate in update mode
+NEEDS_UPDATE_WEBHOOK_CODES = {
+    "ERROR",
+    "PENDING_EXPIRATION",
+    "PENDING_DISCONNECT",
+    "USER_PERMISSION_REVOKED",
+    "USER_ACCOUNT_REVOKED",
+}
+
+
+class WebhookService:
+    """
+    Verifies Plaid webhooks and turns them into targeted work: a sync of
+    just the item that changed, or an update mode flag on an item. Webhooks
+    are acknowledged straight away and syncs run on the Plaid executor.
+    """
+
+    def __init__(
+        self,
+        sync_service: SyncService,
+        account_service: AccountService = None,
+        client: PlaidClient = None,
+        verify: bool = PLAID_WEBHOOK_VERIFY,
+    ):
+        self.client = client or PlaidClient()
+        self.account_service = account_service or AccountService(self.client)
+        self.sync_service = sync_service
+        self.verifier = (
+            WebhookVerifier(self.client.get_webhook_verification_key)
+            if verify
+            else None
+        )
+        if not verify:
+            logger.warning("PLAID_WEBHOOK_VERIFY=0, accepting unsigned webhooks")
+
+        self._lock = threading.Lock()
+        # Items with a sync running, and those with webhooks received meanwhile
+        self._syncing: set[str] = set()
+        self._resync: set[str] = set()
+
+    async def handle_webhook_async(
+        self, body: bytes, verification: Optional[str]
+    ) -> tuple[dict, int, str]:
+        """Async handle_webhook on the Plaid executor (key fetches block)."""
+        return await run_blocking(self.handle_webhook, body, verification)
+
+    def handle_webhook(
+        self, body: bytes, verification: Optional[str]
+    ) -> tuple[dict, int, str]:
+        """
+        Verify a webhook against its Plaid-Verification header and act on it.
+        Webhooks for unknown items or codes are acknowledged and ignored, so
+        Plaid does not retry them.
+        Returns: ({"status": action}, status_code, error_message)
+        """
+        if self.verifier is not None:
+            try:
+                self.verifier.verify(body, verification)
+            except RuntimeError as e:
+                logger.error(f"Cannot verify Plaid webhook: {e}")
+                return None, 503, str(e)
+            except Exception as e:
+                # Includes failures fetching the key for an unknown key id
+                logger.warning(f"Rejected Plaid webhook: {e}")
+                return None, 401, "Webhook verification failed"
+
+        try:
+            webhook = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return None, 400, "Webhook body must be JSON"
+        if not isinstance(webhook, dict):
+            return None, 400, "Webhook body must be a JSON object"
+
+        webhook_type = webhook.get("webhook_type")
+        webhook_code = webhook.get("webhook_code")
+        item = self._find_item(webhook.get("item_id"))
+        logger.info(
+            f"Plaid webhook {webhook_type}/{webhook_code} "
+            f"for item {webhook.get('item_id')}"
+        )
+        if item is None:
+            return {"status": "ignored"}, 200, None
+
+        if webhook_type == "TRANSACTIONS" and webhook_code in SYNC_WEBHOOK_CODES:
+            self.enqueue_sync(item["item_id"])
+            return {"status": "sync_queued"}, 200, None
+
+        if webhook_type == "ITEM":
+            return self._handle_item_webhook(item, webhook_code, webhook)
+
+        return {"status": "ignored"}, 200, None
+
+    def enqueue_sync(self, item_id: str) -> None:
+        """
+        Sync one item in the background. Webhooks arriving while its sync
+        runs queue exactly one more pass, so bursts collapse without missing
+        changes posted mid-sync.
+        """
+        with self._lock:
+            if item_id in self._syncing:
+                self._resync.add(item_id)
+                return
+            self._syncing.add(item_id)
+        submit_blocking(self._sync_until_current, item_id)
+
+    def _sync_until_current(self, item_id: str) -> None:
+        while True:
+            try:
+                item = self._find_item(item_id)
+                if item is not None:
+                    self.sync_service.sync_item(item)
+            except Exception as e:
+                logger.error(f"Webhook sync of {item_id} failed: {e}", exc_info=True)
+
+            with self._lock:
+                if item_id not in self._resync:
+                    self._syncing.discard(item_id)
+                    return
+                self._resync.discard(item_id)
+
+    def _handle_item_webhook(
+        self, item: Dict[str, Any], webhook_code: str, webhook: Dict[str, Any]
+    ) -> tuple[dict, int, str]:
+        item_id = item["item_id"]
+        if webhook_code in NEEDS_UPDATE_WEBHOOK_CODES:
+            error = webhook.get("error") or {}
+            reason = error.get("error_code") or webhook_code
+            set_item_needs_update(item_id, True, reason)
+            return {"status": "needs_update"}, 200, None
+
+        if webhook_code == "LOGIN_REPAIRED":
+            set_item_needs_update(item_id, False)
+            # Repaired outside /update, which would have dropped them itself
+            self.account_service.invalidate(item_id)
+            self.enqueue_sync(item_id)
+            return {"status": "repaired"}, 200, None
+
+        if webhook_code == "NEW_ACCOUNTS_AVAILABLE":
+            self.account_service.invalidate(item_id)
+            return {"status": "accounts_invalidated"}, 200, None
+
+        return {"status": "ignored"}, 200, None
+
+    def _find_item(self, item_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        if not item_id:
+            return None
+        return next(
+            (item for item in get_linked_items() if item["item_id"] == item_id), None
+        )
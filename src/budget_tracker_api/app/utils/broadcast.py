@@ -0,0 +1,118 @@
+"""
+Fan-out of events to many asyncio subscribers. Publishing is thread-safe and
+costs one loop wake-up per event however many subscribers a topic has; an
+idle subscriber is a bounded queue and nothing else.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber before it is marked as having missed some
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", "64"))
+
+
+class Subscription:
+    """
+    One subscriber's queue of events for a set of topics. A subscriber that
+    falls behind by more than the queue size stops receiving events and is
+    flagged `overflowed`, so it can resynchronize instead of being sent a
+    partial history.
+    """
+
+    def __init__(self, topics: tuple[Hashable, ...], queue_size: int) -> None:
+        self.topics = topics
+        self.overflowed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, event: Any) -> None:
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Wait for the next event.
+        Returns: None when `timeout` seconds pass without one
+        """
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def clear(self) -> None:
+        """Drop buffered events and the overflow flag after a resync."""
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self.overflowed = False
+
+
+class Broadcaster:
+    """
+    Delivers published events to every subscription of their topic, on the
+    event loop the subscriptions were made from.
+    """
+
+    def __init__(self, queue_size: int = BROADCAST_QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[Hashable, set[Subscription]] = {}
+
+    def subscribe(self, topics: Iterable[Hashable]) -> Subscription:
+        """Subscribe to `topics`; must be called on the event loop."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(tuple(topics), self.queue_size)
+        for topic in subscription.topics:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscription; must be called on the event loop."""
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[topic]
+
+    def has_subscribers(self, topic: Hashable) -> bool:
+        """Cheap check from any thread, so publishers can skip building events."""
+        return topic in self._subscribers
+
+    def topics(self) -> list[Hashable]:
+        """Topics with at least one subscriber."""
+        return list(self._subscribers)
+
+    def subscriber_count(self) -> int:
+        subscriptions = set()
+        for subscribers in list(self._subscribers.values()):
+            subscriptions.update(subscribers)
+        return len(subscriptions)
+
+    def publish(self, topic: Hashable, event: Any) -> None:
+        """Send `event` to the subscribers of `topic`, from any thread."""
+        loop = self._loop
+        if loop is None or topic not in self._subscribers:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(topic, event)
+            return
+        try:
+            loop.call_soon_threadsafe(self._deliver, topic, event)
+        except RuntimeError:
+            # The loop closed during shutdown, nobody is listening anymore
+            logger.debug(f"Dropped event for {topic}, event loop is closed")
+
+    def _deliver(self, topic: Hashable, event: Any) -> None:
+        for subscription in list(self._subscribers.get(topic, ())):
+            subscription.put(event)
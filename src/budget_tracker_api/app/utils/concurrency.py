@@ -0,0 +1,87 @@
+"""Concurrency utilities for running blocking Plaid I/O off the event loop."""
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable
+
+# Upper bound on concurrent blocking Plaid/storage calls
+PLAID_MAX_WORKERS = int(os.getenv("PLAID_MAX_WORKERS", "8"))
+
+# Upper bound on linked items queried at once by a single call
+PLAID_FAN_OUT_WORKERS = int(os.getenv("PLAID_FAN_OUT_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=PLAID_MAX_WORKERS, thread_name_prefix="plaid-io"
+)
+# Separate pool for fan-out, callers often already run on _executor and
+# waiting on their own pool could exhaust it
+_fan_out_executor = ThreadPoolExecutor(
+    max_workers=PLAID_FAN_OUT_WORKERS, thread_name_prefix="plaid-fan-out"
+)
+
+
+async def run_blocking(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """
+    Run a blocking call on the bounded Plaid executor and await it. The call
+    sees the caller's context variables (e.g. the request trace).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _executor, functools.partial(context.run, func, *args, **kwargs)
+    )
+
+
+def submit_blocking(func: Callable, *args: Any) -> Future:
+    """Start a blocking call on the Plaid executor without waiting for it."""
+    return _executor.submit(contextvars.copy_context().run, func, *args)
+
+
+def fan_out(func: Callable, items: Iterable[Any]) -> list:
+    """Call func(item) for every item in parallel, results in item order."""
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    # A context can only be entered by one thread at a time, copy per item
+    futures = [
+        _fan_out_executor.submit(contextvars.copy_context().run, func, item)
+        for item in items
+    ]
+    return [future.result() for future in futures]
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls sharing a key into one in-flight call.
+    Every caller that arrives while the call is running gets the same result.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def submit(self, key: Hashable, func: Callable, *args: Any) -> Future:
+        """Start func(*args) on the executor, or join the call already running."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                # The call runs in the context of the caller that started it
+                future = _executor.submit(
+                    contextvars.copy_context().run, self._run, key, func, *args
+                )
+                self._calls[key] = future
+            return future
+
+    async def run(self, key: Hashable, func: Callable, *args: Any) -> Any:
+        """Await the shared result of func(*args) for key."""
+        return await asyncio.wrap_future(self.submit(key, func, *args))
+
+    def _run(self, key: Hashable, func: Callable, *args: Any) -> Any:
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
@@ -1,58 +1,1168 @@
 """Database utilities for SQLite storage."""
+import hashlib
+import logging
+import os
 import sqlite3
+import threading
+from array import array
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional
+
+import orjson
+
+from budget_tracker_api.app.models.transaction import TransactionRecord
+
+logger = logging.getLogger(__name__)
 
 # Use local .data directory in the project root
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
 DATA_DIR = PROJECT_ROOT / ".data"
 DB_FILE = DATA_DIR / "budget_tracker.db"
 
+# Columns selected to build a TransactionRecord, in constructor order
+RECORD_COLUMNS = (
+    "transaction_id, account_id, date, name, merchant_name, amount, "
+    "iso_currency_code, category, pending, transaction_type, pfc_primary, "
+    "payload"
+)
+
+# Page cache per connection in KiB (negative values are KiB for SQLite)
+SQLITE_CACHE_KIB = int(os.getenv("SQLITE_CACHE_KIB", "16384"))
+# How long a writer waits on a locked database before raising
+SQLITE_BUSY_TIMEOUT_SECONDS = float(os.getenv("SQLITE_BUSY_TIMEOUT_SECONDS", "5"))
+# Compiled statements kept per connection, our queries are a small fixed set
+SQLITE_STATEMENT_CACHE_SIZE = 256
+# Values returned per facet by search_transactions
+SEARCH_FACET_LIMIT = 20
+
+# Statement rows stored by the import service carry ids with this prefix
+IMPORT_ID_PREFIX = "import_"
+
+# Whether SQLite has FTS5, set by init_db
+FTS_AVAILABLE = True
+
+_local = threading.local()
+# Writers on this process queue here rather than in SQLite's busy handler,
+# which polls without ordering and can starve one writer past the timeout
+# when a burst of cold months all write at once
+_write_lock = threading.RLock()
+
+
+class MonthChange(NamedTuple):
+    """
+    What one committed write changed in an account month. The id lists are
+    None when the write does not track individual rows (bulk imports).
+    """
+
+    account_name: str
+    year_month: str
+    content_hash: str
+    added: Optional[list[str]]
+    modified: Optional[list[str]]
+    removed: Optional[list[str]]
+
+
+# Called with [MonthChange] after each committed write to transactions
+_change_listeners: list[Callable[[list[MonthChange]], None]] = []
+
+
+def add_change_listener(listener: Callable[[list[MonthChange]], None]) -> None:
+    """
+    Call `listener(changes)` after every committed write to transactions, on
+    the writing thread. Listeners should be quick and must not write.
+    """
+    _change_listeners.append(listener)
+
+
+def _notify_changes(changes: list[MonthChange]) -> None:
+    if not changes:
+        return
+    for listener in list(_change_listeners):
+        try:
+            listener(changes)
+        except Exception:
+            logger.exception("Transaction change listener failed")
+
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Get this thread's connection to budget_tracker.db, opening it on first use.
+    Connections stay open for the life of the thread, run in WAL mode so
+    readers never block the writer, and cache compiled statements.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.db_file == DB_FILE:
+        return conn
+
+    conn = sqlite3.connect(
+        DB_FILE,
+        timeout=SQLITE_BUSY_TIMEOUT_SECONDS,
+        cached_statements=SQLITE_STATEMENT_CACHE_SIZE,
+    )
+    conn.execute("PRAGMA journal_mode = WAL")
+    # NORMAL is durable in WAL mode except for the last commit on power loss
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KIB}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    _local.conn = conn
+    _local.db_file = DB_FILE
+    return conn
+
+
+def close_connection() -> None:
+    """Close this thread's connection, if it has one."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Cursor]:
+    """Cursor on this thread's connection, committed on success else rolled back."""
+    conn = get_connection()
+    with _write_lock, conn:
+        yield conn.cursor()
+
 
 def init_db() -> None:
     """Initialize the database with required tables."""
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    with transaction() as cursor:
+        # Create notes table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS spending_notes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                year TEXT NOT NULL,
+                month TEXT NOT NULL,
+                notes TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(year, month)
+            )
+        """)
+
+        # Create transactions table, the full Plaid payload is kept in
+        # `payload` and the columns we filter on are normalized out so they
+        # can be indexed
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                transaction_id TEXT PRIMARY KEY,
+                account_id TEXT,
+                account_name TEXT NOT NULL,
+                date TEXT NOT NULL,
+                name TEXT,
+                merchant_name TEXT,
+                amount REAL NOT NULL,
+                category TEXT,
+                pending INTEGER NOT NULL DEFAULT 0,
+                iso_currency_code TEXT,
+                transaction_type TEXT,
+                payload BLOB NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                fingerprint TEXT,
+                pfc_primary TEXT
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_fingerprint
+            ON transactions (fingerprint)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_account_date
+            ON transactions (account_name, date)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_date
+            ON transactions (date)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_category
+            ON transactions (category, date)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_merchant
+            ON transactions (merchant_name, date)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_amount
+            ON transactions (amount)
+        """)
+        # Covers the search facet pass, already in GROUP BY order
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_transactions_facets
+            ON transactions (category, merchant_name, account_name, amount, date)
+        """)
+        _create_search_index(cursor)
+
+        # Per-month rollups maintained alongside transactions so summaries
+        # over long ranges only read one row per month and group
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS monthly_rollups (
+                account_name TEXT NOT NULL,
+                year_month TEXT NOT NULL,
+                group_by TEXT NOT NULL,
+                group_key TEXT NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                amounts BLOB NOT NULL,
+                PRIMARY KEY (account_name, group_by, year_month, group_key)
+            )
+        """)
+
+        # Freshness metadata per cached account month, a row with
+        # transaction_count 0 is a negative cache entry
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cached_months (
+                account_name TEXT NOT NULL,
+                year_month TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                finalized INTEGER NOT NULL DEFAULT 0,
+                transaction_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (account_name, year_month)
+            )
+        """)
+
+        # Hash of each account month's stored content, used for HTTP ETags
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS month_hashes (
+                account_name TEXT NOT NULL,
+                year_month TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                PRIMARY KEY (account_name, year_month)
+            )
+        """)
+
+        # Linked Plaid items, access tokens are encrypted (see encryption.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS plaid_items (
+                item_id TEXT PRIMARY KEY,
+                user_id TEXT NOT NULL,
+                access_token TEXT NOT NULL,
+                institution_name TEXT,
+                needs_update INTEGER NOT NULL DEFAULT 0,
+                update_reason TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        _add_missing_plaid_item_columns(cursor)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_plaid_items_user
+            ON plaid_items (user_id)
+        """)
+
+        # Cache of Plaid accounts_get results, per item
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS accounts (
+                account_id TEXT PRIMARY KEY,
+                item_id TEXT,
+                name TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        _add_missing_account_columns(cursor)
+
+        # Track one-time data migrations
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+
+def _create_search_index(cursor: sqlite3.Cursor) -> None:
+    """
+    Full-text index over transaction name and merchant_name, kept in sync by
+    triggers. Builds the index from existing rows the first time it is created.
+    """
+    global FTS_AVAILABLE
+    cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        ("transactions_fts",),
+    )
+    exists = cursor.fetchone() is not None
+
+    try:
+        # External content table, the text lives only in `transactions`
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+                name, merchant_name,
+                content = 'transactions', content_rowid = 'rowid',
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5, search falls back to LIKE scans
+        FTS_AVAILABLE = False
+        return
 
-    # Create notes table
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS spending_notes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            year TEXT NOT NULL,
-            month TEXT NOT NULL,
-            notes TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(year, month)
-        )
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_insert
+        AFTER INSERT ON transactions BEGIN
+            INSERT INTO transactions_fts (rowid, name, merchant_name)
+            VALUES (new.rowid, new.name, new.merchant_name);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_delete
+        AFTER DELETE ON transactions BEGIN
+            INSERT INTO transactions_fts
+                (transactions_fts, rowid, name, merchant_name)
+            VALUES ('delete', old.rowid, old.name, old.merchant_name);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS transactions_fts_update
+        AFTER UPDATE OF name, merchant_name ON transactions BEGIN
+            INSERT INTO transactions_fts
+                (transactions_fts, rowid, name, merchant_name)
+            VALUES ('delete', old.rowid, old.name, old.merchant_name);
+            INSERT INTO transactions_fts (rowid, name, merchant_name)
+            VALUES (new.rowid, new.name, new.merchant_name);
+        END
     """)
+    if not exists:
+        cursor.execute(
+            "INSERT INTO transactions_fts (transactions_fts) VALUES ('rebuild')"
+        )
+    FTS_AVAILABLE = True
 
-    conn.commit()
-    conn.close()
 
+def _add_missing_account_columns(cursor: sqlite3.Cursor) -> None:
+    """Key the accounts cache by item, dropping rows cached before items existed."""
+    cursor.execute("PRAGMA table_info(accounts)")
+    if "item_id" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE accounts ADD COLUMN item_id TEXT")
+        cursor.execute("DELETE FROM accounts")
 
-def save_note(year: str, month: str, notes: str) -> None:
-    """Save or update a note for a specific year/month."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+
+def _add_missing_plaid_item_columns(cursor: sqlite3.Cursor) -> None:
+    """Add the update mode status columns to registries created before them."""
+    cursor.execute("PRAGMA table_info(plaid_items)")
+    if "needs_update" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute(
+            "ALTER TABLE plaid_items ADD COLUMN needs_update INTEGER NOT NULL DEFAULT 0"
+        )
+        cursor.execute("ALTER TABLE plaid_items ADD COLUMN update_reason TEXT")
+
+
+def is_migration_applied(name: str) -> bool:
+    """Check whether a one-time migration has already run."""
+    cursor = get_connection().cursor()
+
+    cursor.execute("SELECT 1 FROM migrations WHERE name = ?", (name,))
+    result = cursor.fetchone()
+
+    return result is not None
+
+
+def mark_migration_applied(name: str) -> None:
+    """Record that a one-time migration has run."""
+    with transaction() as cursor:
+        cursor.execute(
+            "INSERT OR IGNORE INTO migrations (name) VALUES (?)", (name,)
+        )
+
+
+def _transaction_row(account_name: str, tx: Dict[str, Any]) -> tuple:
+    """
+    Flatten a Plaid transaction dict into a transactions table row. `category`
+    falls back to the legacy category list for grouping, `pfc_primary` holds
+    the personal finance category alone.
+    """
+    pfc = tx.get("personal_finance_category") or {}
+    legacy_category = tx.get("category") or [None]
+    return (
+        tx["transaction_id"],
+        tx.get("account_id"),
+        account_name,
+        str(tx["date"]),
+        tx.get("name"),
+        tx.get("merchant_name"),
+        tx.get("amount") or 0.0,
+        pfc.get("primary") or legacy_category[0],
+        1 if tx.get("pending") else 0,
+        tx.get("iso_currency_code"),
+        tx.get("transaction_type"),
+        orjson.dumps(tx),
+        transaction_fingerprint(
+            account_name, str(tx["date"]), tx.get("amount") or 0.0
+        ),
+        pfc.get("primary"),
+    )
+
+
+def transaction_fingerprint(account_name: str, day: str, amount: float) -> str:
+    """
+    Source-independent identity of a transaction, used to spot the same
+    transaction arriving from Plaid and from an imported statement. Names
+    are left out: Plaid's cleaned name rarely equals a statement's raw one.
+    """
+    key = f"{account_name}|{day}|{round(amount * 100)}"
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def matching_fingerprints(account_name: str, day: str, amount: float) -> list[str]:
+    """
+    Fingerprints a transaction may carry in another source: the same amount
+    on the same day, or a day either side since banks and Plaid can date a
+    transaction by posting or authorization. The exact day comes first.
+    """
+    posted = date.fromisoformat(day[:10])
+    return [
+        transaction_fingerprint(
+            account_name, (posted + timedelta(days=offset)).isoformat(), amount
+        )
+        for offset in (0, -1, 1)
+    ]
+
+
+def upsert_transactions(
+    rows: Iterable[tuple[str, Dict[str, Any]]], removed: Iterable[str] = ()
+) -> None:
+    """
+    Delete the `removed` transaction ids and insert or replace
+    (account_name, transaction) pairs in one transaction, so readers never
+    see a month between the two, then refresh the rollups of every month
+    whose content changed. Rows stored unchanged are rewritten but trigger
+    no refresh or notification. A new Plaid transaction replaces an
+    imported statement row it matches (see matching_fingerprints), so the
+    two are never counted twice.
+    """
+    # (account_name, YYYY-MM) -> {"added"|"modified"|"removed": [ids]}
+    affected: Dict[tuple[str, str], Dict[str, list[str]]] = defaultdict(
+        lambda: {"added": [], "modified": [], "removed": []}
+    )
+    # Serialized before the write lock is taken, and written with a few bulk
+    # statements: every statement hands the GIL back, so per-row queries
+    # stretch the lock's hold time under concurrent fetches
+    table_rows = [_transaction_row(account_name, tx) for account_name, tx in rows]
+    removed = list(removed)
+    with transaction() as cursor:
+        if removed:
+            for transaction_id, (account_name, year_month, _) in (
+                _stored_months_and_payloads(cursor, removed).items()
+            ):
+                affected[(account_name, year_month)]["removed"].append(
+                    transaction_id
+                )
+            # Only run when there is something to delete: an empty DELETE
+            # would open the transaction without its write lock, and the
+            # reads below could then not upgrade it under concurrent writers
+            cursor.executemany(
+                "DELETE FROM transactions WHERE transaction_id = ?",
+                ((transaction_id,) for transaction_id in removed),
+            )
+
+        previous_rows = _stored_months_and_payloads(
+            cursor, [row[0] for row in table_rows]
+        )
+        imported = _imported_by_fingerprint(cursor, [
+            fingerprint
+            for row in table_rows
+            if row[0] not in previous_rows
+            and not row[0].startswith(IMPORT_ID_PREFIX)
+            for fingerprint in matching_fingerprints(row[2], row[3], row[6])
+        ])
+        replaced = []
+        for row in table_rows:
+            transaction_id, account_name = row[0], row[2]
+            month = (account_name, row[3][:7])
+            previous = previous_rows.get(transaction_id)
+            previous_rows[transaction_id] = (*month, row[11])
+            if previous is None:
+                affected[month]["added"].append(transaction_id)
+                if imported and not transaction_id.startswith(IMPORT_ID_PREFIX):
+                    match = _pop_imported_match(imported, row)
+                    if match is not None:
+                        replaced.append((match[0],))
+                        affected[(account_name, match[1])]["removed"].append(
+                            match[0]
+                        )
+            elif previous[:2] != month:
+                # A modified transaction may move out of its previous month
+                affected[previous[:2]]["removed"].append(transaction_id)
+                affected[month]["added"].append(transaction_id)
+            elif previous[2] != row[11]:
+                affected[month]["modified"].append(transaction_id)
+
+        cursor.executemany(
+            "DELETE FROM transactions WHERE transaction_id = ?", replaced
+        )
+        cursor.executemany("""
+            INSERT INTO transactions (
+                transaction_id, account_id, account_name, date, name,
+                merchant_name, amount, category, pending, iso_currency_code,
+                transaction_type, payload, fingerprint, pfc_primary, updated_at
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(transaction_id) DO UPDATE SET
+                account_id = excluded.account_id,
+                account_name = excluded.account_name,
+                date = excluded.date,
+                name = excluded.name,
+                merchant_name = excluded.merchant_name,
+                amount = excluded.amount,
+                category = excluded.category,
+                pending = excluded.pending,
+                iso_currency_code = excluded.iso_currency_code,
+                transaction_type = excluded.transaction_type,
+                payload = excluded.payload,
+                fingerprint = excluded.fingerprint,
+                pfc_primary = excluded.pfc_primary,
+                updated_at = CURRENT_TIMESTAMP
+        """, table_rows)
+
+        changes = [
+            MonthChange(
+                account_name,
+                year_month,
+                _refresh_month_derived(cursor, account_name, year_month),
+                ids["added"],
+                ids["modified"],
+                ids["removed"],
+            )
+            for (account_name, year_month), ids in affected.items()
+        ]
+    _notify_changes(changes)
+
+
+def _stored_months_and_payloads(
+    cursor: sqlite3.Cursor, transaction_ids: list[str]
+) -> Dict[str, tuple[str, str, bytes]]:
+    """Returns: {transaction_id: (account_name, YYYY-MM, payload)} of stored ids"""
+    stored = {}
+    # Stay under SQLite's bound parameter limit
+    for start in range(0, len(transaction_ids), 500):
+        chunk = transaction_ids[start:start + 500]
+        cursor.execute(f"""
+            SELECT transaction_id, account_name, substr(date, 1, 7), payload
+            FROM transactions
+            WHERE transaction_id IN ({', '.join('?' * len(chunk))})
+        """, chunk)
+        stored.update((row[0], row[1:]) for row in cursor.fetchall())
+    return stored
+
+
+def _imported_by_fingerprint(
+    cursor: sqlite3.Cursor, fingerprints: list[str]
+) -> Dict[str, list[tuple[str, str]]]:
+    """
+    Imported statement rows carrying any of the given fingerprints.
+    Returns: {fingerprint: [(transaction_id, YYYY-MM)]}
+    """
+    fingerprints = list(dict.fromkeys(fingerprints))
+    imported: Dict[str, list[tuple[str, str]]] = defaultdict(list)
+    for start in range(0, len(fingerprints), 500):
+        chunk = fingerprints[start:start + 500]
+        cursor.execute(f"""
+            SELECT fingerprint, transaction_id, substr(date, 1, 7)
+            FROM transactions
+            WHERE fingerprint IN ({', '.join('?' * len(chunk))})
+              AND substr(transaction_id, 1, {len(IMPORT_ID_PREFIX)}) = ?
+        """, (*chunk, IMPORT_ID_PREFIX))
+        for fingerprint, transaction_id, year_month in cursor.fetchall():
+            imported[fingerprint].append((transaction_id, year_month))
+    return imported
+
+
+def _pop_imported_match(
+    imported: Dict[str, list[tuple[str, str]]], row: tuple
+) -> Optional[tuple[str, str]]:
+    """
+    Take one imported statement row matching a transactions table row,
+    preferring the same day, so each is replaced at most once.
+    Returns: (transaction_id, YYYY-MM), None without a match
+    """
+    for fingerprint in matching_fingerprints(row[2], row[3], row[6]):
+        candidates = imported.get(fingerprint)
+        if candidates:
+            return candidates.pop()
+    return None
+
+
+def insert_new_transactions(rows: Iterable[tuple[str, Dict[str, Any]]]) -> int:
+    """
+    Bulk insert (account_name, transaction) pairs in one transaction, skipping
+    transaction_ids already stored, then refresh each touched month once.
+    Returns: number of rows inserted
+    """
+    table_rows = [_transaction_row(account_name, tx) for account_name, tx in rows]
+    if not table_rows:
+        return 0
+
+    with transaction() as cursor:
+        cursor.executemany("""
+            INSERT OR IGNORE INTO transactions (
+                transaction_id, account_id, account_name, date, name,
+                merchant_name, amount, category, pending, iso_currency_code,
+                transaction_type, payload, fingerprint, pfc_primary
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, table_rows)
+        inserted = cursor.rowcount
+
+        changes = [
+            MonthChange(
+                account_name,
+                year_month,
+                _refresh_month_derived(cursor, account_name, year_month),
+                None,
+                None,
+                None,
+            )
+            for account_name, year_month in {
+                (row[2], row[3][:7]) for row in table_rows
+            }
+        ]
+    if inserted:
+        _notify_changes(changes)
+    return inserted
+
+
+def count_fingerprints(fingerprints: Iterable[str]) -> Dict[str, int]:
+    """How many stored transactions carry each of the given fingerprints."""
+    fingerprints = list(fingerprints)
+    counts: Dict[str, int] = {}
+    cursor = get_connection().cursor()
+    # Stay under SQLite's bound parameter limit
+    for start in range(0, len(fingerprints), 500):
+        chunk = fingerprints[start:start + 500]
+        cursor.execute(f"""
+            SELECT fingerprint, COUNT(*) FROM transactions
+            WHERE fingerprint IN ({', '.join('?' * len(chunk))})
+            GROUP BY fingerprint
+        """, chunk)
+        counts.update(cursor.fetchall())
+    return counts
+
+
+def rebuild_all_rollups() -> None:
+    """Recompute rollups and content hashes for every stored month."""
+    with transaction() as cursor:
+        cursor.execute("""
+            SELECT DISTINCT account_name, substr(date, 1, 7) FROM transactions
+        """)
+        for account_name, year_month in cursor.fetchall():
+            _refresh_month_derived(cursor, account_name, year_month)
+
+
+def get_rollups(
+    account_names: list[str],
+    start_month: str,
+    end_month: str,
+    group_by: str,
+    with_amounts: bool = True,
+) -> list[tuple[str, str, float, int, Optional[bytes]]]:
+    """
+    Get rollup rows for YYYY-MM months in [start_month, end_month]. The
+    amount columns are only read when `with_amounts` is True.
+    Returns: [(year_month, group_key, total, count, amounts)]
+    """
+    cursor = get_connection().cursor()
+
+    placeholders = ", ".join("?" for _ in account_names)
+    cursor.execute(f"""
+        SELECT year_month, group_key, total, count,
+               {"amounts" if with_amounts else "NULL"}
+        FROM monthly_rollups
+        WHERE account_name IN ({placeholders})
+          AND group_by = ? AND year_month >= ? AND year_month <= ?
+    """, (*account_names, group_by, start_month, end_month))
+
+    rows = cursor.fetchall()
+
+    return rows
+
+
+def get_month_content_hash(account_name: str, year_month: str) -> str:
+    """Get the content hash of an account month, computing it if missing."""
+    cursor = get_connection().cursor()
+
+    cursor.execute("""
+        SELECT content_hash FROM month_hashes
+        WHERE account_name = ? AND year_month = ?
+    """, (account_name, year_month))
+    result = cursor.fetchone()
+    if result:
+        return result[0]
+
+    with transaction() as cursor:
+        return _update_month_hash(cursor, account_name, year_month)
+
+
+def _refresh_month_derived(
+    cursor: sqlite3.Cursor, account_name: str, year_month: str
+) -> str:
+    """
+    Refresh everything derived from an account month's transactions.
+    Returns: the month's new content hash
+    """
+    _rebuild_rollups(cursor, account_name, year_month)
+    return _update_month_hash(cursor, account_name, year_month)
+
+
+def _update_month_hash(
+    cursor: sqlite3.Cursor, account_name: str, year_month: str
+) -> str:
+    """Recompute and store the content hash of one account month."""
+    cursor.execute("""
+        SELECT transaction_id, payload FROM transactions
+        WHERE account_name = ? AND date >= ? AND date < ?
+        ORDER BY transaction_id
+    """, (account_name, f"{year_month}-01", f"{year_month}-32"))
+
+    digest = hashlib.sha256()
+    for transaction_id, payload in cursor.fetchall():
+        digest.update(transaction_id.encode())
+        digest.update(payload)
+    content_hash = digest.hexdigest()
+
+    cursor.execute("""
+        INSERT INTO month_hashes (account_name, year_month, content_hash)
+        VALUES (?, ?, ?)
+        ON CONFLICT(account_name, year_month)
+        DO UPDATE SET content_hash = excluded.content_hash
+    """, (account_name, year_month, content_hash))
+    return content_hash
+
+
+def _rebuild_rollups(
+    cursor: sqlite3.Cursor, account_name: str, year_month: str
+) -> None:
+    """Recompute category, merchant and month rollups for one account month."""
+    # Mirror the dashboard, which leaves "special" payments out of spending
+    cursor.execute("""
+        SELECT category, merchant_name, name, amount FROM transactions
+        WHERE account_name = ? AND date >= ? AND date < ?
+          AND transaction_type IS NOT 'special'
+    """, (account_name, f"{year_month}-01", f"{year_month}-32"))
+
+    groups: Dict[tuple[str, str], array] = defaultdict(lambda: array("d"))
+    for category, merchant_name, name, amount in cursor.fetchall():
+        groups[("category", category or "UNCATEGORIZED")].append(amount)
+        groups[("merchant", merchant_name or name or "UNKNOWN")].append(amount)
+        groups[("month", year_month)].append(amount)
+
+    cursor.execute("""
+        DELETE FROM monthly_rollups WHERE account_name = ? AND year_month = ?
+    """, (account_name, year_month))
+    cursor.executemany("""
+        INSERT INTO monthly_rollups (
+            account_name, year_month, group_by, group_key, total, count, amounts
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, (
+        (
+            account_name,
+            year_month,
+            group_by,
+            group_key,
+            sum(amounts),
+            len(amounts),
+            amounts.tobytes(),
+        )
+        for (group_by, group_key), amounts in groups.items()
+    ))
+
+
+def get_transactions_in_range(
+    account_name: str, start_date: str, end_date: str
+) -> list[TransactionRecord]:
+    """
+    Get transactions for an account with start_date <= date < end_date,
+    newest first. Dates are ISO formatted (YYYY-MM-DD).
+    """
+    cursor = get_connection().cursor()
+
+    cursor.execute(f"""
+        SELECT {RECORD_COLUMNS} FROM transactions
+        WHERE account_name = ? AND date >= ? AND date < ?
+        ORDER BY date DESC
+    """, (account_name, start_date, end_date))
+
+    rows = cursor.fetchall()
+
+    return [_record(row) for row in rows]
+
+
+def _record(row: tuple) -> TransactionRecord:
+    """Build a TransactionRecord from a RECORD_COLUMNS row."""
+    record = TransactionRecord(*row)
+    record.pending = bool(record.pending)
+    return record
+
+
+def iter_transactions(
+    account_names: list[str],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    after: Optional[tuple[str, str]] = None,
+    batch_size: int = 1000,
+) -> Iterator[list[TransactionRecord]]:
+    """
+    Yield transactions oldest first, in batches, with start_date <= date <
+    end_date. Each batch is a separate keyset query on (date, transaction_id),
+    so memory stays flat and no read transaction spans the whole iteration.
+    `after` is the (date, transaction_id) of the last row already consumed.
+    """
+    where = [f"account_name IN ({', '.join('?' * len(account_names))})"]
+    params: list[Any] = list(account_names)
+    if start_date is not None:
+        where.append("date >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        where.append("date < ?")
+        params.append(end_date)
+
+    sql = f"""
+        SELECT {RECORD_COLUMNS} FROM transactions
+        WHERE {" AND ".join(where)} AND (date, transaction_id) > (?, ?)
+        ORDER BY date, transaction_id
+        LIMIT ?
+    """
+    last = after or ("", "")
+    while True:
+        cursor = get_connection().cursor()
+        cursor.execute(sql, (*params, *last, batch_size))
+        batch = [_record(row) for row in cursor.fetchall()]
+        if not batch:
+            return
+
+        yield batch
+        if len(batch) < batch_size:
+            return
+        last = (batch[-1].date, batch[-1].transaction_id)
+
+
+def get_transactions_by_ids(transaction_ids: list[str]) -> list[TransactionRecord]:
+    """Get stored transactions by id, newest first; missing ids are skipped."""
+    records = []
+    cursor = get_connection().cursor()
+    # Stay under SQLite's bound parameter limit
+    for start in range(0, len(transaction_ids), 500):
+        chunk = transaction_ids[start:start + 500]
+        cursor.execute(f"""
+            SELECT {RECORD_COLUMNS} FROM transactions
+            WHERE transaction_id IN ({', '.join('?' * len(chunk))})
+        """, chunk)
+        records.extend(_record(row) for row in cursor.fetchall())
+    records.sort(key=lambda record: record.date, reverse=True)
+    return records
+
+
+def get_transaction_date(transaction_id: str) -> Optional[str]:
+    """Get the date of a stored transaction, None when it does not exist."""
+    cursor = get_connection().cursor()
+
+    cursor.execute(
+        "SELECT date FROM transactions WHERE transaction_id = ?", (transaction_id,)
+    )
+    result = cursor.fetchone()
+
+    return result[0] if result else None
+
+
+def search_transactions(
+    account_names: list[str],
+    query: Optional[str] = None,
+    category: Optional[str] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    limit: int = 50,
+    offset: int = 0,
+) -> tuple[list[TransactionRecord], int, Dict[str, list[tuple[str, int]]]]:
+    """
+    Search stored transactions, newest first. `query` matches words (or word
+    prefixes) in name and merchant_name; dates are ISO with start_date <= date
+    < end_date. Facets count matches per category and merchant, ignoring
+    pagination.
+    Returns: (records, total_matches, {"category": [(value, count)], ...})
+    """
+    placeholders = ", ".join("?" * len(account_names))
+    where = [f"account_name IN ({placeholders})"]
+    params: list[Any] = list(account_names)
+
+    # Most transactions belong to one or two accounts, so when a narrower
+    # indexed filter is given the unary + keeps SQLite from driving the
+    # query off the account index instead
+    if query or category is not None or min_amount is not None or (
+        max_amount is not None
+    ):
+        where[0] = f"+account_name IN ({placeholders})"
+
+    terms = _fts_query(query) if query else None
+    if terms and FTS_AVAILABLE:
+        where.append(
+            "rowid IN (SELECT rowid FROM transactions_fts "
+            "WHERE transactions_fts MATCH ?)"
+        )
+        params.append(terms)
+    elif query:
+        for word in query.split():
+            where.append("(name LIKE ? OR merchant_name LIKE ?)")
+            params.extend([f"%{word}%"] * 2)
+
+    for clause, value in (
+        ("category = ?", category),
+        ("amount >= ?", min_amount),
+        ("amount <= ?", max_amount),
+        ("date >= ?", start_date),
+        ("date < ?", end_date),
+    ):
+        if value is not None:
+            where.append(clause)
+            params.append(value)
+
+    where_sql = " AND ".join(where)
+    cursor = get_connection().cursor()
+
+    cursor.execute(f"""
+        SELECT {RECORD_COLUMNS} FROM transactions
+        WHERE {where_sql}
+        ORDER BY date DESC, transaction_id
+        LIMIT ? OFFSET ?
+    """, (*params, limit, offset))
+    records = [_record(row) for row in cursor.fetchall()]
+
+    # One pass over the matches yields the total and both facets
+    cursor.execute(f"""
+        SELECT category, merchant_name, COUNT(*) FROM transactions
+        WHERE {where_sql}
+        GROUP BY category, merchant_name
+    """, params)
+    total = 0
+    counts: Dict[str, Dict[str, int]] = {"category": {}, "merchant": {}}
+    for category_value, merchant, matches in cursor.fetchall():
+        total += matches
+        for facet, value in (("category", category_value), ("merchant", merchant)):
+            value = value or "Unknown"
+            counts[facet][value] = counts[facet].get(value, 0) + matches
+
+    facets = {
+        facet: sorted(values.items(), key=lambda item: (-item[1], item[0]))[
+            :SEARCH_FACET_LIMIT
+        ]
+        for facet, values in counts.items()
+    }
+    return records, total, facets
+
+
+def _fts_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 query matching every word as a prefix."""
+    words = [word.replace('"', '""') for word in query.split()]
+    return " ".join(f'"{word}"*' for word in words) or None
+
+
+def has_transactions_in_range(
+    account_name: str, start_date: str, end_date: str, imported: bool = True
+) -> bool:
+    """
+    Check whether any transaction exists with start_date <= date < end_date,
+    leaving imported statement rows out unless `imported` is True.
+    """
+    cursor = get_connection().cursor()
+
+    cursor.execute(f"""
+        SELECT 1 FROM transactions
+        WHERE account_name = ? AND date >= ? AND date < ?
+          AND (? OR substr(transaction_id, 1, {len(IMPORT_ID_PREFIX)}) != ?)
+        LIMIT 1
+    """, (account_name, start_date, end_date, imported, IMPORT_ID_PREFIX))
+
+    result = cursor.fetchone()
+
+    return result is not None
+
+
+def get_cached_month(
+    account_name: str, year_month: str
+) -> Optional[Dict[str, Any]]:
+    """Get freshness metadata for an account month, None if never fetched."""
+    cursor = get_connection().cursor()
+
+    cursor.execute("""
+        SELECT fetched_at, finalized, transaction_count FROM cached_months
+        WHERE account_name = ? AND year_month = ?
+    """, (account_name, year_month))
+
+    result = cursor.fetchone()
+
+    if not result:
+        return None
+    return {
+        "fetched_at": result[0],
+        "finalized": bool(result[1]),
+        "transaction_count": result[2],
+    }
+
+
+def get_open_cached_months(account_names: Iterable[str]) -> list[tuple[str, str]]:
+    """(account_name, YYYY-MM) of fetched months that are not yet final."""
+    account_names = list(account_names)
+    if not account_names:
+        return []
+    cursor = get_connection().cursor()
+
+    cursor.execute(f"""
+        SELECT account_name, year_month FROM cached_months
+        WHERE finalized = 0
+          AND account_name IN ({",".join("?" * len(account_names))})
+    """, account_names)
+
+    return cursor.fetchall()
+
+
+def save_cached_month(
+    account_name: str, year_month: str, fetched_at: float, finalized: bool
+) -> None:
+    """Record that an account month was fetched, counting what is stored."""
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO cached_months (
+                account_name, year_month, fetched_at, finalized, transaction_count
+            )
+            SELECT ?, ?, ?, ?, COUNT(*) FROM transactions
+            WHERE account_name = ? AND date >= ? AND date < ?
+            ON CONFLICT(account_name, year_month) DO UPDATE SET
+                fetched_at = excluded.fetched_at,
+                finalized = excluded.finalized,
+                transaction_count = excluded.transaction_count
+        """, (
+            account_name,
+            year_month,
+            fetched_at,
+            1 if finalized else 0,
+            account_name,
+            f"{year_month}-01",
+            f"{year_month}-32",
+        ))
+
+
+def save_plaid_item(
+    item_id: str,
+    user_id: str,
+    access_token: str,
+    institution_name: Optional[str] = None,
+) -> None:
+    """Insert or update a linked item. access_token must already be encrypted."""
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO plaid_items (item_id, user_id, access_token, institution_name)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(item_id) DO UPDATE SET
+                user_id = excluded.user_id,
+                access_token = excluded.access_token,
+                institution_name = COALESCE(
+                    excluded.institution_name, plaid_items.institution_name
+                ),
+                needs_update = 0,
+                update_reason = NULL,
+                updated_at = CURRENT_TIMESTAMP
+        """, (item_id, user_id, access_token, institution_name))
+
+
+def get_plaid_items() -> list[tuple]:
+    """
+    Get every linked item, most recently linked first.
+    Returns: [(item_id, user_id, encrypted_access_token, institution_name,
+    needs_update, update_reason)]
+    """
+    cursor = get_connection().cursor()
 
     cursor.execute("""
-        INSERT INTO spending_notes (year, month, notes, updated_at)
-        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
-        ON CONFLICT(year, month)
-        DO UPDATE SET notes = excluded.notes, updated_at = CURRENT_TIMESTAMP
-    """, (year, month, notes))
+        SELECT item_id, user_id, access_token, institution_name,
+            needs_update, update_reason
+        FROM plaid_items
+        ORDER BY created_at DESC, rowid DESC
+    """)
+
+    return cursor.fetchall()
+
+
+def set_plaid_item_status(
+    item_id: str, needs_update: bool, reason: Optional[str] = None
+) -> bool:
+    """
+    Flag an item as needing update mode (re-authentication), or clear it.
+    Returns: whether the item exists
+    """
+    with transaction() as cursor:
+        cursor.execute("""
+            UPDATE plaid_items
+            SET needs_update = ?, update_reason = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE item_id = ?
+        """, (1 if needs_update else 0, reason if needs_update else None, item_id))
+        return cursor.rowcount > 0
 
-    conn.commit()
-    conn.close()
+
+def save_accounts(
+    item_id: str, accounts: list[Dict[str, Any]], fetched_at: float
+) -> None:
+    """Replace an item's cached accounts with a fresh accounts_get result."""
+    with transaction() as cursor:
+        cursor.execute("DELETE FROM accounts WHERE item_id = ?", (item_id,))
+        cursor.executemany("""
+            INSERT OR REPLACE INTO accounts
+                (account_id, item_id, name, payload, fetched_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (
+            (acc["account_id"], item_id, acc["name"], orjson.dumps(acc), fetched_at)
+            for acc in accounts
+        ))
+
+
+def get_cached_accounts(
+    item_id: str,
+) -> tuple[list[Dict[str, Any]], Optional[float]]:
+    """
+    Get an item's cached account list.
+    Returns: (accounts, fetched_at) with fetched_at None when nothing is cached
+    """
+    cursor = get_connection().cursor()
+
+    cursor.execute(
+        "SELECT payload, fetched_at FROM accounts WHERE item_id = ?", (item_id,)
+    )
+    rows = cursor.fetchall()
+
+    if not rows:
+        return [], None
+    return [orjson.loads(row[0]) for row in rows], min(row[1] for row in rows)
+
+
+def clear_cached_accounts(item_id: Optional[str] = None) -> None:
+    """Drop the cached account list of one item, or of every item."""
+    with transaction() as cursor:
+        if item_id is None:
+            cursor.execute("DELETE FROM accounts")
+        else:
+            cursor.execute("DELETE FROM accounts WHERE item_id = ?", (item_id,))
+
+
+def save_note(year: str, month: str, notes: str) -> None:
+    """Save or update a note for a specific year/month."""
+    with transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO spending_notes (year, month, notes, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(year, month)
+            DO UPDATE SET notes = excluded.notes, updated_at = CURRENT_TIMESTAMP
+        """, (year, month, notes))
 
 
 def get_note(year: str, month: str) -> Optional[str]:
     """Get a note for a specific year/month."""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    cursor = get_connection().cursor()
 
     cursor.execute("""
         SELECT notes FROM spending_notes
@@ -60,6 +1170,5 @@ def get_note(year: str, month: str) -> Optional[str]:
     """, (year, month))
 
     result = cursor.fetchone()
-    conn.close()
 
     return result[0] if result else None
@@ -0,0 +1,108 @@
+"""Encryption at rest for secrets stored in SQLite, such as access tokens."""
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from budget_tracker_api.app.utils.database import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Fernet key (urlsafe base64, 32 bytes), generate with Fernet.generate_key().
+# When unset, a key is generated once and kept in TOKEN_KEY_FILE.
+TOKEN_ENCRYPTION_KEY = os.getenv("TOKEN_ENCRYPTION_KEY")
+TOKEN_KEY_FILE = DATA_DIR / "token.key"
+
+# Stored values are prefixed with the scheme used to write them
+FERNET_PREFIX = "fernet:"
+
+_cipher = None
+_cipher_lock = threading.Lock()
+
+
+def _get_cipher():
+    """
+    Fernet cipher for TOKEN_ENCRYPTION_KEY, or for the generated key file.
+    Raises RuntimeError when the cryptography package is not installed.
+    """
+    global _cipher
+    if _cipher is not None:
+        return _cipher
+    with _cipher_lock:
+        if _cipher is None:
+            # Imported on first use, keeping it out of app import time
+            try:
+                from cryptography.fernet import Fernet
+            except ImportError:
+                raise RuntimeError(
+                    "Storing access tokens requires the cryptography package "
+                    "(poetry install)"
+                ) from None
+            key = TOKEN_ENCRYPTION_KEY or _load_or_create_key_file(
+                TOKEN_KEY_FILE, Fernet.generate_key
+            )
+            _cipher = Fernet(key.encode())
+    return _cipher
+
+
+def _load_or_create_key_file(path: Path, generate_key) -> str:
+    """
+    Read the key file, creating it with 0600 permissions on first use. The
+    key is written to a temp file and hard-linked into place, so workers
+    booting together agree on one key and never read a partial file.
+    """
+    try:
+        return path.read_text().strip()
+    except FileNotFoundError:
+        pass
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        os.chmod(temp_path, 0o600)
+        with os.fdopen(fd, "w") as f:
+            f.write(generate_key().decode())
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(temp_path, path)
+            logger.warning(
+                f"TOKEN_ENCRYPTION_KEY is not set, generated a key in {path}. "
+                "Back it up, tokens cannot be read without it."
+            )
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(temp_path)
+    return path.read_text().strip()
+
+
+def check_encryption() -> None:
+    """
+    Load the encryption key at startup, so a missing dependency, an invalid
+    key or an unwritable key file fails boot instead of the first link.
+    """
+    _get_cipher()
+
+
+def encrypt_secret(value: str) -> str:
+    """Encrypt a secret for storage."""
+    return FERNET_PREFIX + _get_cipher().encrypt(value.encode()).decode()
+
+
+def decrypt_secret(stored: str) -> str:
+    """
+    Decrypt a value written by encrypt_secret.
+    Raises ValueError when it cannot be decrypted with the configured key.
+    """
+    if not stored.startswith(FERNET_PREFIX):
+        raise ValueError("Unknown secret encoding")
+
+    cipher = _get_cipher()
+    from cryptography.fernet import InvalidToken
+
+    try:
+        return cipher.decrypt(stored[len(FERNET_PREFIX):].encode()).decode()
+    except InvalidToken as e:
+        raise ValueError("Secret was encrypted with a different key") from e
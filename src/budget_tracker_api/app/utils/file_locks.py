@@ -0,0 +1,147 @@
+"""
+Cross-process coordination for multi-worker serving: exclusive file locks on
+cache keys, so N workers never fetch the same month from Plaid at once, and
+generation stamps that tell workers when another process changed shared state.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from budget_tracker_api.app.utils.database import DATA_DIR
+from budget_tracker_api.app.utils.metrics import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks only coordinate threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+LOCK_DIR = DATA_DIR / "locks"
+
+# How long a worker waits for another worker's fetch of the same key before
+# doing the work itself; a full initial sync can take a minute or more
+CACHE_LOCK_TIMEOUT_SECONDS = float(os.getenv("CACHE_LOCK_TIMEOUT_SECONDS", "120"))
+
+# Polling interval bounds while a lock is held elsewhere
+_POLL_MIN_SECONDS = 0.01
+_POLL_MAX_SECONDS = 0.2
+
+# Fallback when fcntl is unavailable: one threading lock per name
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _lock_name(name: str) -> str:
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+class FileLock:
+    """
+    Exclusive lock on LOCK_DIR/<name>.lock shared by every worker process and
+    thread. The lock is tied to an open file, so the OS releases it when its
+    holder exits or crashes and a dead worker never leaves a stale lease.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = _lock_name(name)
+        self._fd: Optional[int] = None
+        self._thread_lock: Optional[threading.Lock] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None or self._thread_lock is not None
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait up to `timeout` seconds (forever when None, not at all when 0).
+        Returns: whether the lock is now held
+        """
+        if fcntl is None:
+            return self._acquire_thread_lock(timeout)
+
+        LOCK_DIR.mkdir(parents=True, exist_ok=True)
+        fd = os.open(LOCK_DIR / f"{self.name}.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = _POLL_MIN_SECONDS
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                self._fd = fd
+                return True
+            except BlockingIOError:
+                if deadline is not None and time.monotonic() >= deadline:
+                    os.close(fd)
+                    return False
+            time.sleep(delay)
+            delay = min(delay * 2, _POLL_MAX_SECONDS)
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        elif self._thread_lock is not None:
+            self._thread_lock.release()
+            self._thread_lock = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.release()
+
+    def _acquire_thread_lock(self, timeout: Optional[float]) -> bool:
+        with _thread_locks_guard:
+            lock = _thread_locks.setdefault(self.name, threading.Lock())
+        if not lock.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+        self._thread_lock = lock
+        return True
+
+
+@contextmanager
+def cache_key_lock(
+    name: str, timeout: float = CACHE_LOCK_TIMEOUT_SECONDS
+) -> Iterator[bool]:
+    """
+    Hold the lock for a cache key (e.g. "month-<account>-2025-01") while
+    filling it. If another worker holds it past `timeout` the block runs
+    anyway, a duplicate Plaid call being better than a failed request.
+    Yields: whether the lock was acquired
+    """
+    lock = FileLock(name)
+    with stage("cache_lock"):
+        acquired = lock.acquire(timeout)
+    if not acquired:
+        logger.warning(f"Timed out waiting for lock {lock.name}, continuing without")
+    try:
+        yield acquired
+    finally:
+        lock.release()
+
+
+def bump_generation(name: str) -> None:
+    """Tell every worker that shared state `name` changed."""
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    path = LOCK_DIR / f"{_lock_name(name)}.generation"
+    path.touch()
+    # mtime granularity can be coarse, make sure the stamp actually moves
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, max(stat.st_mtime_ns, time.time_ns()) + 1))
+
+
+def get_generation(name: str) -> int:
+    """
+    Current generation of shared state `name`, a single stat() call.
+    Returns: 0 when it was never bumped
+    """
+    try:
+        return (LOCK_DIR / f"{_lock_name(name)}.generation").stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
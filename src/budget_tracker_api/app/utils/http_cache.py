@@ -0,0 +1,285 @@
+"""HTTP caching helpers: ETags, conditional GETs and response compression."""
+import hashlib
+import zlib
+from typing import Any, Optional
+
+import orjson
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MINIMUM_SIZE = 1024
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+# Server-Sent Events are tiny and flushed one by one, compression only adds
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+# Cache-Control for months that can still change vs finalized months
+OPEN_MONTH_CACHE_CONTROL = "private, no-cache"
+FINAL_MONTH_CACHE_CONTROL = "private, max-age=86400"
+
+
+class OrjsonResponse(JSONResponse):
+    """JSON response serialized with orjson instead of the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def make_etag(*parts: str) -> str:
+    """Build a strong ETag from the parts identifying a representation."""
+    digest = hashlib.sha256(":".join(parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag, ignoring the encoding
+    suffix added to ETags of compressed representations.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    base = _strip_encoding(etag)
+    return any(
+        _strip_encoding(candidate) == base for candidate in if_none_match.split(",")
+    )
+
+
+def _strip_encoding(etag: str) -> str:
+    tag = etag.strip().removeprefix("W/").strip('"')
+    for suffix in ("-gzip", "-br"):
+        tag = tag.removesuffix(suffix)
+    return tag
+
+
+class ConditionalGetMiddleware:
+    """
+    Answer GET requests with 304 Not Modified when the response carries an
+    ETag matching If-None-Match. Routes that can derive their ETag from stored
+    state should check it themselves first and skip the work entirely.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        if_none_match = request_headers.get("if-none-match")
+        if not if_none_match:
+            await self.app(scope, receive, send)
+            return
+
+        not_modified = False
+
+        async def send_conditional(message: Message) -> None:
+            nonlocal not_modified
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(raw=message["headers"])
+                etag = headers.get("etag")
+                if message["status"] == 200 and etag and etag_matches(
+                    if_none_match, etag
+                ):
+                    not_modified = True
+                    if _is_compressible(headers) and int(
+                        headers.get("content-length", COMPRESS_MINIMUM_SIZE)
+                    ) >= COMPRESS_MINIMUM_SIZE:
+                        # Repeat the ETag the compressed 200 would carry
+                        headers["etag"] = encoded_etag(
+                            etag, request_headers.get("accept-encoding", "")
+                        )
+                        headers.add_vary_header("Accept-Encoding")
+                    del headers["content-length"]
+                    del headers["content-type"]
+                    message = {**message, "status": 304}
+                await send(message)
+            elif not_modified:
+                # Drop the body, finishing the response on the last chunk
+                if not message.get("more_body", False):
+                    await send({"type": "http.response.body", "body": b""})
+            else:
+                await send(message)
+
+        await self.app(scope, receive, send_conditional)
+
+
+def negotiate_encoding(
+    accept_encoding: str, supported: Optional[tuple[str, ...]] = None
+) -> Optional[str]:
+    """
+    Pick the content coding for an Accept-Encoding header: the supported
+    coding with the highest q-value, the earlier one in `supported` on ties.
+    Codings with q=0, or only covered by "*;q=0", are refused.
+    Returns: the coding, or None for an uncompressed response
+    """
+    qvalues = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        qvalue = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[coding] = qvalue
+
+    if supported is None:
+        supported = ("br", "gzip") if brotli is not None else ("gzip",)
+    default = qvalues.get("*", 0.0)
+    best, best_qvalue = None, 0.0
+    for coding in supported:
+        qvalue = qvalues.get(coding, default)
+        if qvalue > best_qvalue:
+            best, best_qvalue = coding, qvalue
+    return best
+
+
+def encoded_etag(etag: str, accept_encoding: str) -> str:
+    """
+    ETag of the representation CompressionMiddleware sends for this
+    Accept-Encoding, which a 304 must repeat.
+    """
+    encoding = negotiate_encoding(accept_encoding)
+    return _with_encoding(etag, encoding) if encoding else etag
+
+
+def _with_encoding(etag: str, encoding: str) -> str:
+    return etag[:-1] + f'-{encoding}"'
+
+
+def _is_compressible(headers: Headers) -> bool:
+    """Whether CompressionMiddleware compresses a body with these headers."""
+    content_type = headers.get("content-type", "")
+    return (
+        "content-encoding" not in headers
+        and content_type.startswith(COMPRESSIBLE_TYPES)
+        and not content_type.startswith(UNCOMPRESSED_TYPES)
+    )
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON/NDJSON/text responses with brotli when the client accepts
+    it and the optional brotli package is installed, otherwise gzip. Works
+    incrementally, so streamed NDJSON stays streamed.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", "")
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(encoding, self.minimum_size, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Per-response state for CompressionMiddleware."""
+
+    def __init__(self, encoding: str, minimum_size: int, send: Send) -> None:
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self._send = send
+        self._start: Optional[Message] = None
+        self._compressor = None
+        self._passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._passthrough = message["status"] not in (200, 206) or (
+                not _is_compressible(Headers(raw=message["headers"]))
+            )
+            if self._passthrough:
+                await self._send(message)
+            else:
+                # Hold the start message until we know the body size
+                self._start = message
+            return
+
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._start is not None:
+            if not more_body and len(body) < self.minimum_size:
+                await self._send(self._start)
+                self._start = None
+                await self._send(message)
+                self._passthrough = True
+                return
+            await self._send_compressed_start()
+
+        if more_body:
+            await self._send(
+                {
+                    "type": "http.response.body",
+                    "body": self._compress_chunk(body),
+                    "more_body": True,
+                }
+            )
+        else:
+            await self._send(
+                {"type": "http.response.body", "body": self._finish(body)}
+            )
+
+    async def _send_compressed_start(self) -> None:
+        message = self._start
+        self._start = None
+        headers = MutableHeaders(raw=message["headers"])
+        headers["content-encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        del headers["content-length"]
+        # Compressed bytes are a different representation, give it its own ETag
+        if "etag" in headers:
+            headers["etag"] = _with_encoding(headers["etag"], self.encoding)
+
+        if self.encoding == "br":
+            self._compressor = brotli.Compressor()
+        else:
+            self._compressor = zlib.compressobj(
+                6, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+        await self._send(message)
+
+    def _compress_chunk(self, body: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(body) + self._compressor.flush()
+        return self._compressor.compress(body) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def _finish(self, body: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(body) + self._compressor.finish()
+        return self._compressor.compress(body) + self._compressor.flush()
+
@@ -0,0 +1,359 @@
+"""
+In-process metrics: stage timings, cache hit ratios, traces and Prometheus.
+Each worker publishes snapshots of its metrics to a shared directory, so a
+scrape answered by any worker reports the sum over all of them.
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Iterable, Iterator, Optional
+
+import orjson
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from budget_tracker_api.app.utils.database import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+# Record per-request trace spans, sent as Server-Timing and logged
+TRACE_REQUESTS = os.getenv("TRACE_REQUESTS", "0") == "1"
+# Only log traces of requests at least this slow (0 logs every request)
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "0"))
+
+# Seconds, from sub-millisecond cache reads up to slow Plaid syncs
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Snapshots of every worker's metrics, <pid>.json per live worker and
+# retired.json holding the counters of workers that have exited
+METRICS_DIR = DATA_DIR / "metrics"
+# Seconds between snapshots of this worker's metrics
+METRICS_SNAPSHOT_SECONDS = float(os.getenv("METRICS_SNAPSHOT_SECONDS", "5"))
+# A snapshot not refreshed for this long belongs to a dead worker, whose
+# gauges are dropped while its counters keep counting towards the total
+METRICS_STALE_SECONDS = 3 * METRICS_SNAPSHOT_SECONDS
+
+# (name, type, help, [(labels, value), ...]) as rendered by render_families
+MetricFamily = tuple[str, str, str, list[tuple[dict, float]]]
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = defaultdict(float)
+        _registry.append(self)
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] += amount
+
+    def family(self) -> MetricFamily:
+        with self._lock:
+            samples = [
+                (dict(zip(self.labels, key)), value)
+                for key, value in self._values.items()
+            ]
+        return self.name, "counter", self.help, samples
+
+
+class Histogram:
+    """Cumulative latency histogram keyed by label values."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label values -> [count per bucket (+Inf last), sum]
+        self._values: dict[tuple, list] = {}
+        _registry.append(self)
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [
+                    [0] * (len(self.buckets) + 1),
+                    0.0,
+                ]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def family(self) -> MetricFamily:
+        with self._lock:
+            values = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._values.items()
+            ]
+
+        samples = []
+        bounds = [repr(bound) for bound in self.buckets] + ["+Inf"]
+        for key, counts, total in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                samples.append(
+                    ({**labels, "le": bound, "__suffix": "_bucket"}, cumulative)
+                )
+            samples.append(({**labels, "__suffix": "_sum"}, total))
+            samples.append(({**labels, "__suffix": "_count"}, cumulative))
+        return self.name, "histogram", self.help, samples
+
+
+_registry: list = []
+
+STAGE_SECONDS = Histogram(
+    "budget_tracker_stage_seconds",
+    "Time spent in each stage of serving transactions",
+    ("stage",),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "budget_tracker_http_request_seconds",
+    "HTTP request latency by route, method and status",
+    ("route", "method", "status"),
+)
+PLAID_REQUEST_SECONDS = Histogram(
+    "budget_tracker_plaid_request_seconds",
+    "Plaid API call latency per attempt, result is ok or the Plaid error code",
+    ("operation", "result"),
+)
+CACHE_REQUESTS = Counter(
+    "budget_tracker_cache_requests_total",
+    "Cache lookups by cache and result (hit, stale, miss, not_modified)",
+    ("cache", "result"),
+)
+
+
+def record_cache(cache: str, result: str) -> None:
+    """Count a lookup in one of the caches (month, accounts, http)."""
+    CACHE_REQUESTS.inc(cache, result)
+
+
+class RequestTrace:
+    """Spans recorded while serving one request, shared across threads."""
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.spans: list[tuple[str, float, float]] = []
+
+    def add(self, name: str, start: float, seconds: float) -> None:
+        # list.append is atomic, spans may arrive from executor threads
+        self.spans.append((name, start - self.start, seconds))
+
+    def server_timing(self) -> str:
+        """Spans summed per name as a Server-Timing header value."""
+        totals: dict[str, float] = defaultdict(float)
+        for name, _, seconds in self.spans:
+            totals[name] += seconds
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in totals.items()
+        )
+
+    def describe(self) -> str:
+        return " ".join(
+            f"{name}@{offset * 1000:.1f}ms={seconds * 1000:.2f}ms"
+            for name, offset, seconds in sorted(self.spans, key=lambda s: s[1])
+        )
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = (
+    contextvars.ContextVar("request_trace", default=None)
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block into the stage histogram and the current request trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        STAGE_SECONDS.observe(seconds, name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(name, start, seconds)
+
+
+def trace_span(name: str, start: float, seconds: float) -> None:
+    """Add an already timed span to the current request trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, start, seconds)
+
+
+class MetricsMiddleware:
+    """
+    Time every HTTP request by route template. With TRACE_REQUESTS=1 each
+    request also collects stage spans, returned in a Server-Timing header
+    (spans finished before the response starts) and logged when done.
+    """
+
+    def __init__(self, app: ASGIApp, trace: bool = TRACE_REQUESTS) -> None:
+        self.app = app
+        self.trace = trace
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace() if self.trace else None
+        token = _current_trace.set(trace)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if trace is not None and trace.spans:
+                    headers = MutableHeaders(raw=message["headers"])
+                    headers.append("Server-Timing", trace.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            seconds = time.perf_counter() - start
+            _current_trace.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                seconds, route_path, scope["method"], str(status)
+            )
+            if trace is not None and seconds * 1000 >= TRACE_SLOW_MS:
+                logger.info(
+                    f"trace {scope['method']} {scope['path']} {status} "
+                    f"{seconds * 1000:.1f}ms {trace.describe()}"
+                )
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def collect_metrics(*extra: MetricFamily) -> list[MetricFamily]:
+    """This worker's registered metrics plus `extra`."""
+    return [metric.family() for metric in _registry] + list(extra)
+
+
+def publish_metrics(families: list[MetricFamily]) -> None:
+    """Replace this worker's snapshot in METRICS_DIR."""
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    path = METRICS_DIR / f"{os.getpid()}.json"
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_bytes(orjson.dumps(families))
+    os.replace(temp_path, path)
+
+
+def retire_metrics(families: list[MetricFamily]) -> None:
+    """
+    Fold this worker's counters and histograms into retired.json and remove
+    its snapshot, so totals never go backwards when it exits. Callers hold
+    a cross-process lock, the read-modify-write is not atomic.
+    """
+    retired_path = METRICS_DIR / "retired.json"
+    retired = _read_snapshot(retired_path) or []
+    merged = merge_metrics([retired, _without_gauges(families)])
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    temp_path = retired_path.with_suffix(".tmp")
+    temp_path.write_bytes(orjson.dumps(merged))
+    os.replace(temp_path, retired_path)
+    (METRICS_DIR / f"{os.getpid()}.json").unlink(missing_ok=True)
+
+
+def all_worker_metrics(families: list[MetricFamily]) -> list[MetricFamily]:
+    """
+    This worker's `families` summed with the latest snapshot of every other
+    worker and the counters of retired ones. Gauges are summed too, as
+    totals across workers (calls in flight, subscribers, pool size).
+    """
+    snapshots = [families]
+    now = time.time()
+    for path in METRICS_DIR.glob("*.json"):
+        if path.stem == str(os.getpid()):
+            continue
+        snapshot = _read_snapshot(path)
+        if snapshot is None:
+            continue
+        try:
+            stale = now - path.stat().st_mtime > METRICS_STALE_SECONDS
+        except OSError:
+            continue
+        if path.stem == "retired" or stale:
+            snapshot = _without_gauges(snapshot)
+        snapshots.append(snapshot)
+    return merge_metrics(snapshots)
+
+
+def merge_metrics(snapshots: Iterable[list[MetricFamily]]) -> list[MetricFamily]:
+    """Sum samples with the same name and labels across snapshots."""
+    # name -> (type, help, {label items: value})
+    merged: dict[str, tuple[str, str, dict[tuple, float]]] = {}
+    for families in snapshots:
+        for name, metric_type, help, samples in families:
+            entry = merged.setdefault(name, (metric_type, help, {}))
+            for labels, value in samples:
+                key = tuple(labels.items())
+                entry[2][key] = entry[2].get(key, 0) + value
+    return [
+        (name, metric_type, help, [(dict(key), value) for key, value in values.items()])
+        for name, (metric_type, help, values) in merged.items()
+    ]
+
+
+def _without_gauges(families: list[MetricFamily]) -> list[MetricFamily]:
+    return [family for family in families if family[1] != "gauge"]
+
+
+def _read_snapshot(path) -> Optional[list[MetricFamily]]:
+    try:
+        return orjson.loads(path.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        # Gone with its worker, or replaced mid-read on a platform without
+        # atomic renames
+        return None
+
+
+def render_families(families: list[MetricFamily]) -> str:
+    """Metric families in Prometheus text format."""
+    lines = []
+    for name, metric_type, help, samples in families:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            series = name + labels.get("__suffix", "")
+            label_text = ",".join(
+                f'{key}="{_escape(str(label))}"'
+                for key, label in labels.items()
+                if key != "__suffix"
+            )
+            if label_text:
+                series += "{" + label_text + "}"
+            lines.append(f"{series} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,129 @@
+"""
+Crash-safe JSON snapshot files. Writers replace a file atomically (temp file,
+fsync, rename), so readers never take a lock and never see a partial write.
+Each snapshot carries a format version, a sequence number and a checksum.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Header line: b"BTSNAP <format> <sequence> <payload length> <sha256>\n"
+SNAPSHOT_MAGIC = b"BTSNAP"
+SNAPSHOT_FORMAT = 1
+# Longest header line readers look for
+MAX_HEADER_BYTES = 128
+
+
+class Snapshot(NamedTuple):
+    """A snapshot's payload and its sequence number (0 for legacy files)."""
+
+    value: Any
+    sequence: int
+
+
+def write_snapshot(path: Path, value: Any, sequence: int) -> None:
+    """
+    Atomically replace `path` with `value` as a checksummed snapshot.
+    A crash leaves either the old snapshot or the new one, never a mix.
+    """
+    payload = orjson.dumps(value)
+    header = b"%s %d %d %d %s\n" % (
+        SNAPSHOT_MAGIC,
+        SNAPSHOT_FORMAT,
+        sequence,
+        len(payload),
+        hashlib.sha256(payload).hexdigest().encode(),
+    )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    _fsync_directory(path.parent)
+
+
+def read_snapshot(path: Path) -> Optional[Snapshot]:
+    """
+    Read a snapshot without copying it into memory first: the file is
+    memory-mapped and the payload checksummed and parsed in place. A reader
+    keeps the file it opened even if a writer replaces it meanwhile.
+    Returns: None when the file is missing, empty or fails verification
+    """
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return _parse_snapshot(mapped, path)
+    except FileNotFoundError:
+        return None
+
+
+def _parse_snapshot(mapped: mmap.mmap, path: Path) -> Optional[Snapshot]:
+    if mapped[:len(SNAPSHOT_MAGIC) + 1] != SNAPSHOT_MAGIC + b" ":
+        # Plain JSON written before snapshots existed
+        try:
+            return Snapshot(orjson.loads(mapped[:]), 0)
+        except orjson.JSONDecodeError:
+            logger.warning(f"Ignoring unreadable snapshot {path}")
+            return None
+
+    header_end = mapped.find(b"\n", 0, MAX_HEADER_BYTES)
+    if header_end == -1:
+        logger.warning(f"Ignoring snapshot {path} without a header")
+        return None
+    try:
+        _, format_version, sequence, length, checksum = (
+            mapped[:header_end].split()
+        )
+        format_version, sequence, length = (
+            int(format_version), int(sequence), int(length)
+        )
+    except ValueError:
+        logger.warning(f"Ignoring snapshot {path} with a malformed header")
+        return None
+    if format_version != SNAPSHOT_FORMAT:
+        logger.warning(f"Ignoring snapshot {path} in unknown format {format_version}")
+        return None
+
+    payload = memoryview(mapped)[header_end + 1:]
+    try:
+        if (
+            len(payload) != length
+            or hashlib.sha256(payload).hexdigest().encode() != checksum
+        ):
+            logger.warning(f"Ignoring snapshot {path} that fails its checksum")
+            return None
+        return Snapshot(orjson.loads(payload), sequence)
+    finally:
+        # The map cannot close while a view into it is alive
+        payload.release()
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Persist the rename itself, where the platform allows opening directories."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -0,0 +1,190 @@
+"""Streaming parsers for bank statement files (CSV and OFX/QFX)."""
+import csv
+import re
+from datetime import date, datetime
+from typing import IO, Any, Dict, Iterator, Optional
+
+# Header names recognised in bank CSV exports, compared lowercased
+CSV_DATE_COLUMNS = ("date", "transaction date", "posted date", "posting date")
+CSV_NAME_COLUMNS = ("description", "name", "payee", "merchant", "details", "memo")
+CSV_AMOUNT_COLUMNS = ("amount", "transaction amount")
+CSV_DEBIT_COLUMNS = ("debit", "withdrawal", "withdrawals", "money out")
+CSV_CREDIT_COLUMNS = ("credit", "deposit", "deposits", "money in")
+CSV_CATEGORY_COLUMNS = ("category",)
+CSV_CURRENCY_COLUMNS = ("currency", "iso_currency_code")
+
+# Tried in order when no date format is given; month-first wins on 01/02/2024
+CSV_DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%m/%d/%Y",
+    "%Y/%m/%d",
+    "%d-%b-%Y",
+    "%d %b %Y",
+    "%b %d, %Y",
+    "%m/%d/%y",
+)
+
+# Bytes read per step when tokenizing OFX
+OFX_CHUNK_SIZE = 64 * 1024
+OFX_TAG_PATTERN = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+class StatementError(ValueError):
+    """A statement file that cannot be parsed at all."""
+
+
+def parse_csv_statement(
+    stream: IO[str],
+    date_format: Optional[str] = None,
+    negate_amounts: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield transactions from a bank CSV export one row at a time. Amounts use
+    Plaid's sign convention (positive is money out); single amount columns
+    are negated unless negate_amounts is False, debit/credit columns are not.
+    Rows that cannot be parsed are yielded as {"error": message}.
+    Raises StatementError when the header has no recognisable columns.
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    columns = {name.strip().lower(): index for index, name in enumerate(header)}
+    date_index = _find_column(columns, CSV_DATE_COLUMNS)
+    name_index = _find_column(columns, CSV_NAME_COLUMNS)
+    amount_index = _find_column(columns, CSV_AMOUNT_COLUMNS)
+    debit_index = _find_column(columns, CSV_DEBIT_COLUMNS)
+    credit_index = _find_column(columns, CSV_CREDIT_COLUMNS)
+    category_index = _find_column(columns, CSV_CATEGORY_COLUMNS)
+    currency_index = _find_column(columns, CSV_CURRENCY_COLUMNS)
+
+    if date_index is None or name_index is None or (
+        amount_index is None and debit_index is None and credit_index is None
+    ):
+        raise StatementError(
+            f"CSV needs date, description and amount (or debit/credit) columns, "
+            f"got {header}"
+        )
+
+    # Statements use one date format throughout, try the last match first
+    date_formats = [date_format] if date_format else list(CSV_DATE_FORMATS)
+    for line_number, row in enumerate(reader, start=2):
+        if not any(cell.strip() for cell in row):
+            continue
+        try:
+            if amount_index is not None:
+                amount = _parse_amount(row[amount_index])
+                if negate_amounts:
+                    amount = -amount
+            else:
+                amount = _parse_amount(_cell(row, debit_index)) - _parse_amount(
+                    _cell(row, credit_index)
+                )
+            yield {
+                "date": _parse_date(row[date_index], date_formats),
+                "name": row[name_index].strip(),
+                "amount": amount,
+                "category": _cell(row, category_index) or None,
+                "iso_currency_code": _cell(row, currency_index) or None,
+                "external_id": None,
+            }
+        except (IndexError, ValueError) as e:
+            yield {"error": f"line {line_number}: {e}"}
+
+
+def parse_ofx_statement(stream: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """
+    Yield transactions from an OFX/QFX file, SGML (1.x) or XML (2.x), reading
+    it in chunks so the whole file is never held in memory. Amounts use
+    Plaid's sign convention. Unparseable entries are yielded as {"error": ...}.
+    """
+    currency = None
+    current: Optional[Dict[str, str]] = None
+    for closing, tag, value in _ofx_tokens(stream):
+        if tag == "CURDEF" and not closing:
+            currency = value
+        elif tag in ("STMTTRN", "BANKTRANLIST"):
+            # SGML files may omit </STMTTRN>, so an entry also ends where
+            # the next one starts or the transaction list closes
+            if current:
+                yield _ofx_transaction(current, currency)
+            current = {} if tag == "STMTTRN" and not closing else None
+        elif current is not None and not closing and value:
+            current[tag] = value
+
+    if current:
+        yield _ofx_transaction(current, currency)
+
+
+def _ofx_tokens(stream: IO[bytes]) -> Iterator[tuple[bool, str, str]]:
+    """Yield (is_closing, TAG, value) for every tag in the stream."""
+    pending = ""
+    while True:
+        chunk = stream.read(OFX_CHUNK_SIZE)
+        if not chunk:
+            break
+        pending += chunk.decode("latin-1")
+        # Keep the trailing, possibly incomplete, tag for the next chunk
+        cut = pending.rfind("<")
+        complete, pending = pending[:cut], pending[cut:]
+        for match in OFX_TAG_PATTERN.finditer(complete):
+            yield match.group(1) == "/", match.group(2).upper(), match.group(3).strip()
+
+    for match in OFX_TAG_PATTERN.finditer(pending):
+        yield match.group(1) == "/", match.group(2).upper(), match.group(3).strip()
+
+
+def _ofx_transaction(
+    entry: Dict[str, str], currency: Optional[str]
+) -> Dict[str, Any]:
+    try:
+        return {
+            # DTPOSTED is YYYYMMDD[HHMMSS[.XXX]][TZ], only the day matters
+            "date": date(
+                int(entry["DTPOSTED"][:4]),
+                int(entry["DTPOSTED"][4:6]),
+                int(entry["DTPOSTED"][6:8]),
+            ).isoformat(),
+            "name": (entry.get("NAME") or entry.get("MEMO") or "").strip(),
+            "amount": -_parse_amount(entry["TRNAMT"]),
+            "category": None,
+            "iso_currency_code": entry.get("CURRENCY") or currency,
+            "external_id": entry.get("FITID"),
+        }
+    except (KeyError, ValueError) as e:
+        return {"error": f"OFX transaction {entry.get('FITID', '?')}: {e!r}"}
+
+
+def _find_column(columns: Dict[str, int], names: tuple[str, ...]) -> Optional[int]:
+    return next((columns[name] for name in names if name in columns), None)
+
+
+def _cell(row: list[str], index: Optional[int]) -> str:
+    if index is None or index >= len(row):
+        return ""
+    return row[index].strip()
+
+
+def _parse_amount(value: str) -> float:
+    """Parse '1,234.56', '$12.00', '(12.00)' or '' (zero)."""
+    value = value.strip().replace(",", "").replace("$", "")
+    if not value:
+        return 0.0
+    if value.startswith("(") and value.endswith(")"):
+        return -float(value[1:-1])
+    return float(value)
+
+
+def _parse_date(value: str, formats: list[str]) -> str:
+    """Parse a date with the first matching format, moving it to the front."""
+    value = value.strip()
+    for index, candidate in enumerate(formats):
+        try:
+            parsed = datetime.strptime(value, candidate).date().isoformat()
+        except ValueError:
+            continue
+        if index:
+            formats.insert(0, formats.pop(index))
+        return parsed
+    raise ValueError(f"unrecognised date '{value}'")
@@ -0,0 +1,191 @@
+"""In-memory index of the React build for serving static assets."""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+from budget_tracker_api.app.utils.http_cache import brotli, negotiate_encoding
+
+logger = logging.getLogger(__name__)
+
+# Vite emits assets/[name]-[hash][ext], those never change once built
+HASHED_ASSET_PATTERN = re.compile(r"^assets/.+-[A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Files up to this size are held in memory with their compressed variants
+MEMORY_LIMIT_BYTES = 2 * 1024 * 1024
+COMPRESSIBLE_SUFFIXES = {".html", ".js", ".css", ".json", ".svg", ".txt", ".map"}
+# In dev mode, how often to look for a rebuilt index.html
+RELOAD_CHECK_SECONDS = 1.0
+
+
+class StaticAsset:
+    """One servable file with its headers and encoded variants."""
+
+    __slots__ = ("path", "media_type", "etag", "cache_control", "variants")
+
+    def __init__(
+        self,
+        path: Path,
+        media_type: str,
+        etag: str,
+        cache_control: str,
+        variants: Dict[str, bytes],
+    ) -> None:
+        self.path = path
+        self.media_type = media_type
+        self.etag = etag
+        self.cache_control = cache_control
+        # encoding ("identity", "br", "gzip") -> bytes held in memory
+        self.variants = variants
+
+
+class StaticIndex:
+    """
+    Indexes the build directory once so requests cost a dict lookup instead of
+    filesystem checks. Small files (including index.html) are kept in memory
+    with brotli/gzip variants, preferring precompressed .br/.gz files on disk.
+    """
+
+    def __init__(self, root: Path, watch: bool = False) -> None:
+        self.root = root
+        self.watch = watch
+        self._lock = threading.Lock()
+        self._assets: Dict[str, StaticAsset] = {}
+        self._index_mtime: Optional[float] = None
+        self._last_check = 0.0
+        self.build()
+
+    @property
+    def index(self) -> Optional[StaticAsset]:
+        return self._assets.get("index.html")
+
+    def build(self) -> None:
+        """(Re)index every file under root."""
+        assets: Dict[str, StaticAsset] = {}
+        if self.root.exists():
+            for path in self.root.rglob("*"):
+                if path.is_file() and path.suffix not in (".br", ".gz"):
+                    relative = path.relative_to(self.root).as_posix()
+                    assets[relative] = _load_asset(path, relative)
+
+        with self._lock:
+            self._assets = assets
+            self._index_mtime = self._current_index_mtime()
+        logger.info(f"Indexed {len(assets)} static files from {self.root}")
+
+    def response(self, request: Request, full_path: str) -> Optional[Response]:
+        """
+        Response for a path, falling back to index.html for client routes.
+        Missing files (under assets/ or with an extension) are a 404, not the
+        index, so a stale script tag fails loudly instead of parsing HTML.
+        """
+        self._reload_if_rebuilt()
+
+        asset = self._assets.get(full_path)
+        if asset is None:
+            if _is_file_path(full_path):
+                return Response(
+                    status_code=404,
+                    headers={"Cache-Control": REVALIDATE_CACHE_CONTROL},
+                )
+            asset = self.index
+        if asset is None:
+            return None
+
+        headers = {"ETag": asset.etag, "Cache-Control": asset.cache_control}
+        if not asset.variants:
+            return FileResponse(
+                asset.path, media_type=asset.media_type, headers=headers
+            )
+
+        headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate_encoding(
+            request.headers.get("accept-encoding", ""),
+            tuple(coding for coding in ("br", "gzip") if coding in asset.variants),
+        )
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            headers["ETag"] = asset.etag[:-1] + f'-{encoding}"'
+            return Response(
+                asset.variants[encoding],
+                media_type=asset.media_type,
+                headers=headers,
+            )
+        return Response(
+            asset.variants["identity"], media_type=asset.media_type, headers=headers
+        )
+
+    def _reload_if_rebuilt(self) -> None:
+        if not self.watch:
+            return
+
+        now = time.monotonic()
+        if now - self._last_check < RELOAD_CHECK_SECONDS:
+            return
+        self._last_check = now
+
+        if self._current_index_mtime() != self._index_mtime:
+            logger.info("Frontend rebuilt, re-indexing static files")
+            self.build()
+
+    def _current_index_mtime(self) -> Optional[float]:
+        try:
+            return (self.root / "index.html").stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+
+def _is_file_path(full_path: str) -> bool:
+    """Whether a request path names a file rather than a client route."""
+    return full_path.startswith("assets/") or "." in full_path.rsplit("/", 1)[-1]
+
+
+def _load_asset(path: Path, relative: str) -> StaticAsset:
+    """Index a file, loading it and its compressed variants if small enough."""
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    cache_control = (
+        IMMUTABLE_CACHE_CONTROL
+        if HASHED_ASSET_PATTERN.match(relative)
+        else REVALIDATE_CACHE_CONTROL
+    )
+
+    stat = path.stat()
+    if stat.st_size > MEMORY_LIMIT_BYTES:
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        return StaticAsset(path, media_type, etag, cache_control, {})
+
+    content = path.read_bytes()
+    etag = f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+    variants = {"identity": content}
+    if path.suffix in COMPRESSIBLE_SUFFIXES:
+        variants.update(_compressed_variants(path, content))
+    return StaticAsset(path, media_type, etag, cache_control, variants)
+
+
+def _compressed_variants(path: Path, content: bytes) -> Dict[str, bytes]:
+    """Use precompressed siblings when present, otherwise compress once here."""
+    variants = {}
+
+    br_path = path.with_name(path.name + ".br")
+    if br_path.exists():
+        variants["br"] = br_path.read_bytes()
+    elif brotli is not None:
+        variants["br"] = brotli.compress(content, quality=11)
+
+    gz_path = path.with_name(path.name + ".gz")
+    if gz_path.exists():
+        variants["gzip"] = gz_path.read_bytes()
+    else:
+        variants["gzip"] = gzip.compress(content, compresslevel=9, mtime=0)
+
+    return variants
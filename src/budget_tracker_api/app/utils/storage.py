@@ -1,78 +1,405 @@
 """Storage utilities for tokens and data."""
 
 import json
+import logging
 import os
+import threading
+import time
+from datetime import date, timedelta
 from pathlib import Path
 from typing import Any, Dict, Optional
 
 import orjson
 
+from budget_tracker_api.app.models.transaction import TransactionRecord
+from budget_tracker_api.app.utils.database import (
+    IMPORT_ID_PREFIX,
+    get_cached_month,
+    get_plaid_items,
+    get_transactions_in_range,
+    has_transactions_in_range,
+    is_migration_applied,
+    mark_migration_applied,
+    rebuild_all_rollups,
+    save_cached_month,
+    save_plaid_item,
+    set_plaid_item_status,
+    upsert_transactions,
+)
+from budget_tracker_api.app.utils.encryption import decrypt_secret, encrypt_secret
+from budget_tracker_api.app.utils.file_locks import (
+    FileLock,
+    bump_generation,
+    get_generation,
+)
+from budget_tracker_api.app.utils.snapshots import read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
 # Use local .data directory in the project root
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent.parent
 DATA_DIR = PROJECT_ROOT / ".data"
 ACCESS_TOKEN_FILE = DATA_DIR / "access-token.json"
 CACHE_DIR = DATA_DIR / "transactions"
+SYNC_CURSOR_FILE = DATA_DIR / "sync-cursors.json"
+SYNC_CURSOR_LOCK = "sync-cursors"
+JSON_CACHE_MIGRATION = "import_json_transaction_cache"
+ROLLUP_BACKFILL_MIGRATION = "backfill_monthly_rollups"
+TOKEN_FILE_MIGRATION = "import_access_token_file"
 
+# Owner of items linked without an explicit user
+DEFAULT_USER_ID = "default"
 
-def save_access_token(access_token: str, item_id: str) -> None:
-    """Save access token to local storage."""
-    ACCESS_TOKEN_FILE.parent.mkdir(parents=True, exist_ok=True)
+# Open months are served from cache for this long before a background refresh
+OPEN_MONTH_TTL_SECONDS = int(os.getenv("OPEN_MONTH_TTL_SECONDS", "900"))
+# Days after a month ends before pending transactions are assumed settled
+MONTH_FINALIZE_GRACE_DAYS = int(os.getenv("MONTH_FINALIZE_GRACE_DAYS", "7"))
 
-    data = {"access_token": access_token, "item_id": item_id}
+# Generation bumped on every registry write, by whichever worker made it
+LINKED_ITEMS_GENERATION = "linked-items"
 
-    with open(ACCESS_TOKEN_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+# Decrypted token registry, None until first read and after every write
+_linked_items: Optional[list[Dict[str, Any]]] = None
+_linked_items_generation = 0
+_linked_items_lock = threading.Lock()
 
-    print(f"💾 Access token saved to {ACCESS_TOKEN_FILE}")
 
+def save_access_token(
+    access_token: str,
+    item_id: str,
+    user_id: str = DEFAULT_USER_ID,
+    institution_name: Optional[str] = None,
+) -> None:
+    """Add or replace a linked item in the token registry."""
+    save_plaid_item(
+        item_id, user_id, encrypt_secret(access_token), institution_name
+    )
+    invalidate_linked_items()
+    logger.info(f"Access token saved for item {item_id}")
 
-def get_access_token() -> Optional[str]:
-    """Get access token from local storage."""
-    if not ACCESS_TOKEN_FILE.exists():
-        return None
 
-    try:
-        with open(ACCESS_TOKEN_FILE, "r") as f:
-            data = json.load(f)
-        return data.get("access_token")
-    except (json.JSONDecodeError, FileNotFoundError):
-        return None
+def get_linked_items(user_id: Optional[str] = None) -> list[Dict[str, Any]]:
+    """
+    Get linked items with decrypted access tokens, most recently linked first.
+    Served from a process-local cache that is invalidated on every write,
+    including writes made by other worker processes.
+    Returns: [{"item_id", "user_id", "access_token", "institution_name",
+    "needs_update", "update_reason"}]
+    """
+    global _linked_items, _linked_items_generation
+    generation = get_generation(LINKED_ITEMS_GENERATION)
+    items = _linked_items
+    if items is None or generation != _linked_items_generation:
+        with _linked_items_lock:
+            if _linked_items is None or generation != _linked_items_generation:
+                _linked_items = _load_linked_items()
+                _linked_items_generation = generation
+            items = _linked_items
 
+    if user_id is not None:
+        items = [item for item in items if item["user_id"] == user_id]
+    return [dict(item) for item in items]
 
-def get_cached_transactions(
-    accountName: str, year: str, month: str
-) -> Optional[list[Dict[str, Any]]]:
-    """Get cached transactions from local storage."""
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    cache_file = CACHE_DIR / f"transactions_{accountName}_{year}_{month}.json"
 
-    if not os.path.exists(cache_file):
-        return None
+def invalidate_linked_items() -> None:
+    """Drop every worker's cached token registry, the next read goes to SQLite."""
+    global _linked_items
+    bump_generation(LINKED_ITEMS_GENERATION)
+    with _linked_items_lock:
+        _linked_items = None
 
-    # Check if file is empty (corrupt cache)
-    if os.path.getsize(cache_file) == 0:
-        print(f"⚠️  Empty cache file found, removing: {cache_file}")
-        os.remove(cache_file)
-        return None
 
-    print(f"Getting transactions for cache: {accountName} from {year}-{month}")
+def set_item_needs_update(
+    item_id: str, needs_update: bool, reason: Optional[str] = None
+) -> None:
+    """
+    Flag a linked item for update mode (e.g. after ITEM_LOGIN_REQUIRED), or
+    clear the flag once it works again. Unknown items are ignored.
+    """
+    if set_plaid_item_status(item_id, needs_update, reason):
+        invalidate_linked_items()
+        if needs_update:
+            logger.warning(f"Item {item_id} needs update mode: {reason}")
+        else:
+            logger.info(f"Item {item_id} no longer needs update mode")
+
+
+def get_access_token(item_id: Optional[str] = None) -> Optional[str]:
+    """Get an item's access token, or the most recently linked item's."""
+    item = _find_item(item_id)
+    return item["access_token"] if item else None
+
+
+def get_item_id() -> Optional[str]:
+    """Get the most recently linked Plaid item id."""
+    item = _find_item(None)
+    return item["item_id"] if item else None
+
+
+def _find_item(item_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    for item in get_linked_items():
+        if item_id is None or item["item_id"] == item_id:
+            return item
+    return None
+
+
+def _load_linked_items() -> list[Dict[str, Any]]:
+    items = []
+    for (
+        item_id,
+        user_id,
+        access_token,
+        institution_name,
+        needs_update,
+        update_reason,
+    ) in get_plaid_items():
+        try:
+            access_token = decrypt_secret(access_token)
+        except ValueError as e:
+            logger.error(f"Skipping item {item_id}, cannot read its token: {e}")
+            continue
+        items.append({
+            "item_id": item_id,
+            "user_id": user_id,
+            "access_token": access_token,
+            "institution_name": institution_name,
+            "needs_update": bool(needs_update),
+            "update_reason": update_reason,
+        })
+    return items
+
+
+def get_sync_cursor(item_id: str) -> Optional[str]:
+    """Get the /transactions/sync cursor stored for an item, without locking."""
+    snapshot = read_snapshot(SYNC_CURSOR_FILE)
+    return snapshot.value.get(item_id) if snapshot else None
+
+
+def save_sync_cursor(item_id: str, cursor: str) -> None:
+    """
+    Save the /transactions/sync cursor for an item. Items sync in parallel,
+    in this and other workers, so the read-modify-write holds a file lock;
+    the atomic replace means readers never see a partly written file.
+    """
+    with FileLock(SYNC_CURSOR_LOCK):
+        snapshot = read_snapshot(SYNC_CURSOR_FILE)
+        cursors = dict(snapshot.value) if snapshot else {}
+        cursors[item_id] = cursor
+        write_snapshot(
+            SYNC_CURSOR_FILE, cursors, snapshot.sequence + 1 if snapshot else 1
+        )
+
+
+def month_date_range(year: str, month: str) -> tuple[str, str]:
+    """Get the [start, end) ISO date range covering a month."""
+    start = date(int(year), int(month), 1)
+    if start.month == 12:
+        end = date(start.year + 1, 1, 1)
+    else:
+        end = date(start.year, start.month + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def parse_date_bound(value: str, inclusive_end: bool) -> str:
+    """
+    ISO date bound for a YYYY-MM or YYYY-MM-DD parameter. Start bounds are
+    inclusive, end bounds are returned as the exclusive day after.
+    Raises ValueError on malformed input.
+    """
+    if len(value) == 7:
+        year, month = value.split("-")
+        start, end = month_date_range(year, month)
+        return end if inclusive_end else start
+
+    day = date.fromisoformat(value)
+    return (day + timedelta(days=1) if inclusive_end else day).isoformat()
+
+
+def month_range(start: str, end: str) -> list[tuple[str, str]]:
+    """
+    Expand an inclusive YYYY-MM..YYYY-MM range into (year, month) pairs.
+    Raises ValueError on malformed input or when end is before start.
+    """
+    start_year, start_month = (int(part) for part in start.split("-"))
+    end_year, end_month = (int(part) for part in end.split("-"))
+    first = date(start_year, start_month, 1)
+    last = date(end_year, end_month, 1)
+    if last < first:
+        raise ValueError(f"Range end {end} is before start {start}")
+
+    months = []
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        months.append((str(year), f"{month:02d}"))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def has_cached_transactions(
+    accountName: str, year: str, month: str, imported: bool = True
+) -> bool:
+    """Check whether a month has any cached transactions, without loading them."""
+    start_date, end_date = month_date_range(year, month)
+    return has_transactions_in_range(accountName, start_date, end_date, imported)
 
-    try:
-        with open(cache_file, "rb") as f:
-            return orjson.loads(f.read())
-    except orjson.JSONDecodeError:
-        print(f"⚠️  Corrupt cache file found, removing: {cache_file}")
-        os.remove(cache_file)
-        return None
+
+def is_month_closed(year: str, month: str) -> bool:
+    """A month is closed (immutable) once its finalize grace period has passed."""
+    _, end_date = month_date_range(year, month)
+    finalize_on = date.fromisoformat(end_date) + timedelta(
+        days=MONTH_FINALIZE_GRACE_DAYS
+    )
+    return date.today() >= finalize_on
+
+
+def get_month_freshness(accountName: str, year: str, month: str) -> Optional[str]:
+    """
+    Classify a cached month for the cache policy.
+    Returns: None (never fetched), "final" (closed month, never refetched),
+    "fresh" (open month within OPEN_MONTH_TTL_SECONDS) or "stale"
+    """
+    state = get_cached_month(accountName, f"{year}-{month}")
+    if state is None:
+        # Imported statement rows say nothing about what Plaid holds
+        if not has_cached_transactions(accountName, year, month, imported=False):
+            return None
+        # Stored before freshness metadata existed, adopt it as fetched now
+        mark_month_fetched(accountName, year, month)
+        state = get_cached_month(accountName, f"{year}-{month}")
+
+    if state["finalized"]:
+        return "final"
+    if time.time() - state["fetched_at"] < OPEN_MONTH_TTL_SECONDS:
+        return "fresh"
+    return "stale"
+
+
+def mark_month_fetched(accountName: str, year: str, month: str) -> None:
+    """
+    Record a completed fetch of a month, including empty months so they are
+    negatively cached instead of refetched on every request.
+    """
+    save_cached_month(
+        accountName, f"{year}-{month}", time.time(), is_month_closed(year, month)
+    )
+
+
+def get_cached_transactions(
+    accountName: str, year: str, month: str
+) -> Optional[list[TransactionRecord]]:
+    """Get cached transactions from the local transaction store."""
+    start_date, end_date = month_date_range(year, month)
+    transactions = get_transactions_in_range(accountName, start_date, end_date)
+    return transactions or None
 
 
 def save_cached_transactions(
     accountName: str, year: str, month: str, transactions: list[Dict[str, Any]]
 ) -> None:
-    """Save cached transactions to local storage."""
+    """
+    Save a full month of transactions to the local transaction store,
+    dropping stored transactions for that month that Plaid no longer returns.
+    Imported statement rows are kept unless a Plaid transaction replaces them.
+    """
     if not transactions:
         return
 
-    CACHE_DIR.mkdir(parents=True, exist_ok=True)
-    with open(CACHE_DIR / f"transactions_{accountName}_{year}_{month}.json", "wb") as f:
-        f.write(orjson.dumps(transactions, option=orjson.OPT_INDENT_2))
+    current_ids = {tx["transaction_id"] for tx in transactions}
+    stale_ids = [
+        record.transaction_id
+        for record in get_cached_transactions(accountName, year, month) or []
+        if record.transaction_id not in current_ids
+        and not record.transaction_id.startswith(IMPORT_ID_PREFIX)
+    ]
+    upsert_transactions(
+        ((accountName, tx) for tx in transactions), removed=stale_ids
+    )
+
+
+def apply_transaction_changes(
+    account_names: Dict[str, str],
+    added: list[Dict[str, Any]],
+    modified: list[Dict[str, Any]],
+    removed: list[str],
+) -> None:
+    """
+    Apply a /transactions/sync delta to the local transaction store.
+    account_names maps Plaid account_id to the account name used in cache keys.
+    """
+    upsert_transactions(
+        (
+            (account_names[tx["account_id"]], tx)
+            for tx in added + modified
+            if tx["account_id"] in account_names
+        ),
+        removed=removed,
+    )
+
+
+def migrate_json_cache() -> None:
+    """
+    One-time import of the legacy per-month JSON cache files
+    (transactions_{account}_{year}_{month}.json) into the transaction store.
+    """
+    if is_migration_applied(JSON_CACHE_MIGRATION):
+        return
+
+    imported = 0
+    if CACHE_DIR.exists():
+        for cache_file in sorted(CACHE_DIR.glob("transactions_*.json")):
+            # Account names may contain underscores, so split from the right
+            account_name = cache_file.stem[len("transactions_"):].rsplit("_", 2)[0]
+            transactions = _read_cache_file(cache_file)
+            if not transactions:
+                continue
+
+            upsert_transactions((account_name, tx) for tx in transactions)
+            imported += len(transactions)
+
+    mark_migration_applied(JSON_CACHE_MIGRATION)
+    logger.info(f"Imported {imported} transactions from JSON cache files")
+
+
+def migrate_access_token_file() -> None:
+    """
+    One-time import of the legacy single-item access-token.json into the
+    token registry. The plaintext file is removed once imported.
+    """
+    if is_migration_applied(TOKEN_FILE_MIGRATION):
+        return
+
+    if ACCESS_TOKEN_FILE.exists():
+        try:
+            with open(ACCESS_TOKEN_FILE, "r") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            data = {}
+
+        if data.get("access_token") and data.get("item_id"):
+            save_access_token(data["access_token"], data["item_id"])
+            ACCESS_TOKEN_FILE.unlink()
+            logger.info(f"Imported item {data['item_id']} from {ACCESS_TOKEN_FILE}")
+
+    mark_migration_applied(TOKEN_FILE_MIGRATION)
+
+
+def backfill_monthly_rollups() -> None:
+    """One-time build of rollups for months stored before rollups existed."""
+    if is_migration_applied(ROLLUP_BACKFILL_MIGRATION):
+        return
+
+    rebuild_all_rollups()
+    mark_migration_applied(ROLLUP_BACKFILL_MIGRATION)
+
+
+def _read_cache_file(cache_file: Path) -> Optional[list[Dict[str, Any]]]:
+    """Read a legacy cache file, skipping empty or corrupt files."""
+    if os.path.getsize(cache_file) == 0:
+        return None
+
+    try:
+        with open(cache_file, "rb") as f:
+            return orjson.loads(f.read())
+    except orjson.JSONDecodeError:
+        logger.warning(f"Skipping corrupt cache file: {cache_file}")
+        return None
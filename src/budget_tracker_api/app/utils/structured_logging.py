@@ -0,0 +1,245 @@
+"""
+Non-blocking structured logging: JSON records with request IDs, written by a
+background thread, with sampling of high-frequency events and secret redaction.
+"""
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+import orjson
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for one JSON object per line, "text" for human-readable lines
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+# Records waiting for the writer thread; past this they are dropped, not blocked
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Records logged with extra={"sample": key} are kept once per this many per key
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+
+# Loggers uvicorn configures with their own console handlers
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Client supplied request IDs are only trusted when they look like an ID
+VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+# Plaid access/public/link tokens and secret-looking key=value pairs
+SECRET_PATTERNS = (
+    (
+        re.compile(
+            r"\b(access|public|link)-(sandbox|development|production)-[\w-]+"
+        ),
+        r"\1-\2-[REDACTED]",
+    ),
+    (
+        re.compile(
+            r"""(["']?(?:access_token|public_token|secret|client_id|password|"""
+            r"""token_encryption_key)["']?\s*[:=]\s*["']?)[^"'\s,}]+""",
+            re.IGNORECASE,
+        ),
+        r"\1[REDACTED]",
+    ),
+    (re.compile(r"fernet:[\w-]+=*"), "fernet:[REDACTED]"),
+)
+
+# LogRecord attributes, anything else on a record came from extra={...}
+STANDARD_ATTRIBUTES = set(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None))
+) | {"message", "asctime", "request_id", "sample", "sampled_every"}
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "request_id", default=None
+)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+_configure_lock = threading.Lock()
+
+
+def redact(text: str) -> str:
+    """Mask access tokens and other secrets in a log message."""
+    for pattern, replacement in SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep the first and then every `every`-th record per sample key, for
+    records logged with extra={"sample": key}. Kept records carry
+    sampled_every so counts can be scaled back up.
+    """
+
+    def __init__(self, every: int = LOG_SAMPLE_EVERY) -> None:
+        super().__init__()
+        self.every = max(every, 1)
+        self._lock = threading.Lock()
+        self._seen: dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample", None)
+        if key is None or self.every == 1:
+            return True
+        with self._lock:
+            seen = self._seen.get(key, 0)
+            self._seen[key] = seen + 1
+        if seen % self.every:
+            return False
+        record.sampled_every = self.every
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hand records to the writer thread without ever blocking the caller.
+    Messages are rendered and redacted here, while the request ID is still
+    in context, so the writer only serializes and writes.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._exception_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = redact(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = redact(
+                self._exception_formatter.formatException(record.exc_info)
+            )
+            record.exc_info = None
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Losing a log line beats adding latency to a request under load
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with extra={...} fields included."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "thread": record.threadName,
+        }
+        sampled_every = getattr(record, "sampled_every", None)
+        if sampled_every:
+            entry["sampled_every"] = sampled_every
+        for key, value in record.__dict__.items():
+            if key not in STANDARD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class TextFormatter(logging.Formatter):
+    """Readable single-line records with the request ID, for development."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            "%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s"
+        )
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+def configure_logging(
+    level: str = LOG_LEVEL, log_format: str = LOG_FORMAT
+) -> logging.handlers.QueueListener:
+    """
+    Route the root logger (and uvicorn's loggers) through a bounded queue to
+    a background writer on stderr. Safe to call more than once.
+    """
+    global _listener, _queue_handler
+    with _configure_lock:
+        if _listener is not None:
+            return _listener
+
+        log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+        queue_handler = _queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter())
+
+        writer = logging.StreamHandler(sys.stderr)
+        writer.setFormatter(
+            TextFormatter() if log_format == "text" else JsonFormatter()
+        )
+
+        root = logging.getLogger()
+        root.handlers = [queue_handler]
+        root.setLevel(level)
+        for name in UVICORN_LOGGERS:
+            uvicorn_logger = logging.getLogger(name)
+            uvicorn_logger.handlers = []
+            uvicorn_logger.propagate = True
+
+        _listener = logging.handlers.QueueListener(log_queue, writer)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
+
+
+def dropped_log_records() -> int:
+    """Records dropped because the log queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+class RequestIdMiddleware:
+    """
+    Give every HTTP request an ID, taken from a well-formed X-Request-ID
+    header or generated, available to log records via request_id_var and
+    echoed in the response headers.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+        if not request_id or not VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(raw=message["headers"])[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,171 @@
+"""
+Verification of Plaid webhooks: the Plaid-Verification header is an ES256
+JWT over the SHA-256 of the request body, signed by a key Plaid publishes
+through /webhook_verification_key/get. cryptography is imported on first
+verification.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import orjson
+
+# Tokens older than this are rejected, so captured webhooks cannot be replayed
+PLAID_WEBHOOK_MAX_AGE_SECONDS = int(os.getenv("PLAID_WEBHOOK_MAX_AGE_SECONDS", "300"))
+# Tokens issued further than this in the future are rejected (clock skew)
+PLAID_WEBHOOK_CLOCK_SKEW_SECONDS = 60
+# How long a fetched verification key is trusted before asking Plaid again
+WEBHOOK_KEY_CACHE_SECONDS = 24 * 60 * 60
+# How long a key id Plaid could not return is rejected without asking again
+WEBHOOK_KEY_MISS_SECONDS = 5 * 60
+# Key ids kept per cache, Plaid only signs with a handful at a time
+WEBHOOK_KEY_CACHE_SIZE = 16
+# Minimum gap between fetches of uncached key ids, which come from
+# unauthenticated headers and would otherwise let anyone drive Plaid calls
+WEBHOOK_KEY_FETCH_INTERVAL_SECONDS = 10
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+class WebhookVerifier:
+    """
+    Checks Plaid-Verification tokens. `get_key(key_id)` fetches the JWK for
+    a key id from Plaid. Keys and failed lookups are cached per id in
+    bounded LRU caches, and uncached ids are fetched at a limited rate.
+    """
+
+    def __init__(
+        self,
+        get_key: Callable[[str], Dict[str, Any]],
+        max_age_seconds: int = PLAID_WEBHOOK_MAX_AGE_SECONDS,
+    ) -> None:
+        self.get_key = get_key
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        # key_id -> (jwk, expires_at), and key_id -> expires_at for misses
+        self._keys: OrderedDict[str, tuple[Dict[str, Any], float]] = OrderedDict()
+        self._misses: OrderedDict[str, float] = OrderedDict()
+        self._next_fetch_at = 0.0
+
+    def verify(self, body: bytes, token: Optional[str]) -> None:
+        """
+        Raises ValueError when the token is missing, malformed, expired or
+        issued in the future, not issued for this body, or signed by an
+        unknown or expired key. Raises RuntimeError when the cryptography
+        package is not installed.
+        """
+        if not token:
+            raise ValueError("Missing Plaid-Verification header")
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+            header = orjson.loads(_b64url_decode(header_segment))
+            claims = orjson.loads(_b64url_decode(payload_segment))
+            signature = _b64url_decode(signature_segment)
+        except (ValueError, orjson.JSONDecodeError):
+            raise ValueError("Malformed Plaid-Verification token") from None
+
+        if header.get("alg") != "ES256" or not header.get("kid"):
+            raise ValueError("Plaid-Verification token must be ES256 with a kid")
+
+        # Claims are checked before the signature so malformed or replayed
+        # tokens are rejected without fetching a key
+        issued_at = claims.get("iat")
+        if not isinstance(issued_at, (int, float)):
+            raise ValueError("Plaid-Verification token has no issue time")
+        age = time.time() - issued_at
+        if age > self.max_age_seconds:
+            raise ValueError("Plaid-Verification token is too old")
+        if age < -PLAID_WEBHOOK_CLOCK_SKEW_SECONDS:
+            raise ValueError("Plaid-Verification token is issued in the future")
+
+        body_hash = hashlib.sha256(body).hexdigest()
+        if not hmac.compare_digest(
+            body_hash, str(claims.get("request_body_sha256", ""))
+        ):
+            raise ValueError("Webhook body does not match its verification token")
+
+        key = self._get_key(header["kid"])
+        if key.get("expired_at"):
+            raise ValueError(f"Verification key {header['kid']} has expired")
+        _verify_es256(
+            key, f"{header_segment}.{payload_segment}".encode(), signature
+        )
+
+    def _get_key(self, key_id: str) -> Dict[str, Any]:
+        """
+        Raises ValueError when Plaid recently failed to return the key, or
+        when another uncached key was fetched too recently.
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._keys.get(key_id)
+            if cached is not None and now < cached[1]:
+                self._keys.move_to_end(key_id)
+                return cached[0]
+            if now < self._misses.get(key_id, 0.0):
+                raise ValueError(f"Unknown verification key {key_id}")
+            if now < self._next_fetch_at:
+                raise ValueError("Verification key fetches are rate limited")
+            self._next_fetch_at = now + WEBHOOK_KEY_FETCH_INTERVAL_SECONDS
+
+        try:
+            key = self.get_key(key_id)
+        except Exception:
+            with self._lock:
+                _put_bounded(
+                    self._misses, key_id, time.monotonic() + WEBHOOK_KEY_MISS_SECONDS
+                )
+            raise
+        with self._lock:
+            self._misses.pop(key_id, None)
+            _put_bounded(
+                self._keys, key_id, (key, time.monotonic() + WEBHOOK_KEY_CACHE_SECONDS)
+            )
+        return key
+
+
+def _put_bounded(cache: OrderedDict, key: str, value: Any) -> None:
+    """Insert into an LRU cache, evicting the least recently used past its size."""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > WEBHOOK_KEY_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def _verify_es256(key: Dict[str, Any], signing_input: bytes, signature: bytes) -> None:
+    try:
+        from cryptography.exceptions import InvalidSignature
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.hazmat.primitives.asymmetric.utils import (
+            encode_dss_signature,
+        )
+    except ImportError:
+        raise RuntimeError(
+            "Verifying Plaid webhooks requires the cryptography package "
+            "(poetry install)"
+        ) from None
+
+    if key.get("kty") != "EC" or key.get("crv") != "P-256" or len(signature) != 64:
+        raise ValueError("Plaid-Verification token does not match its key type")
+
+    public_key = ec.EllipticCurvePublicNumbers(
+        int.from_bytes(_b64url_decode(key["x"]), "big"),
+        int.from_bytes(_b64url_decode(key["y"]), "big"),
+        ec.SECP256R1(),
+    ).public_key()
+    # JWS carries r || s, cryptography expects a DER encoded signature
+    der_signature = encode_dss_signature(
+        int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:], "big")
+    )
+    try:
+        public_key.verify(der_signature, signing_input, ec.ECDSA(hashes.SHA256()))
+    except InvalidSignature:
+        raise ValueError("Invalid Plaid-Verification signature") from None
@@ -1,4 +1,5 @@
 """Development server script that builds frontend and runs FastAPI."""
+import os
 import subprocess
 import sys
 import signal
@@ -82,13 +83,14 @@ def start() -> None:
     # Give watch mode a moment to start
     time.sleep(2)
 
-    # Start FastAPI server
+    # Start FastAPI server, BUDGET_TRACKER_DEV re-indexes static files on rebuild
     api_process = subprocess.Popen(
         [sys.executable, "-m", "uvicorn",
          "budget_tracker_api.app.main:app",
          "--host", "0.0.0.0",
          "--port", "8000",
-         "--reload"]
+         "--reload"],
+        env={**os.environ, "BUDGET_TRACKER_DEV": "1"},
     )
 
     def cleanup(signum, frame):
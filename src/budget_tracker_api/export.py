@@ -0,0 +1,72 @@
+"""Command line export of stored transactions to a file or stdout."""
+import argparse
+import sys
+
+from dotenv import load_dotenv
+
+from budget_tracker_api.app.models.transaction import parse_fields
+from budget_tracker_api.app.services.export_service import (
+    EXPORT_FORMATS,
+    ExportService,
+)
+from budget_tracker_api.app.utils.database import init_db
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Export cached transactions as CSV, NDJSON, Arrow or Parquet."
+    )
+    parser.add_argument("--format", default="csv", choices=list(EXPORT_FORMATS))
+    parser.add_argument("--from", dest="start", help="YYYY-MM or YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", help="YYYY-MM or YYYY-MM-DD")
+    parser.add_argument(
+        "--accounts", help="Comma separated account names (default ACCOUNT_TO_FILTER)"
+    )
+    parser.add_argument("--fields", help="Comma separated fields to export")
+    parser.add_argument("--after", help="Resume after this transaction_id")
+    parser.add_argument("--limit", type=int, help="Export at most this many rows")
+    parser.add_argument(
+        "--output", "-o", help="File to write (default stdout)"
+    )
+    return parser.parse_args(argv)
+
+
+def start() -> None:
+    """Entry point for `poetry run export`."""
+    load_dotenv()
+    args = parse_args(sys.argv[1:])
+    init_db()
+
+    account_names = (
+        [name.strip() for name in args.accounts.split(",") if name.strip()]
+        if args.accounts
+        else None
+    )
+    result, _, error = ExportService().export(
+        args.format,
+        args.start,
+        args.end,
+        account_names,
+        parse_fields(args.fields),
+        args.after,
+        args.limit,
+    )
+    if error:
+        print(f"❌ {error}", file=sys.stderr)
+        sys.exit(1)
+
+    chunks, _, _ = result
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+
+    if args.output:
+        print(f"✅ Exported to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    start()
@@ -1,23 +1,55 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import apiClient from "../api/client";
 
+// Only the fields the dashboard renders, keeps responses small
+const TRANSACTION_FIELDS = [
+    "transaction_id",
+    "date",
+    "name",
+    "merchant_name",
+    "amount",
+    "pending",
+    "transaction_type",
+    "personal_finance_category",
+].join(",");
+
+// Apply a live "delta" event, replacing transactions by id so applying the
+// same delta twice is harmless
+const applyDelta = (transactions, { added, modified, removed }) => {
+    const changed = [...added, ...modified];
+    const replaced = new Set([
+        ...removed,
+        ...changed.map((transaction) => transaction.transaction_id),
+    ]);
+    return [
+        ...(transactions || []).filter(
+            (transaction) => !replaced.has(transaction.transaction_id),
+        ),
+        ...changed,
+    ];
+};
+
 export const useGetTransactions = (year, month) => {
     const [transactions, setTransactions] = useState([]);
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState(null);
+    // Deltas received while a fetch is in flight, replayed on its result
+    const pendingDeltas = useRef(null);
 
     const fetchTransactions = async () => {
         setLoading(true);
         setError(null);
+        pendingDeltas.current = [];
         try {
             const apiResponse = await apiClient.get("/transactions", {
-                params: { year, month },
+                params: { year, month, fields: TRANSACTION_FIELDS },
             });
             const data = apiResponse?.data?.transactions;
-            setTransactions(data);
+            setTransactions(pendingDeltas.current.reduce(applyDelta, data));
         } catch (error) {
             setError(error.message);
         } finally {
+            pendingDeltas.current = null;
             setLoading(false);
         }
     };
@@ -26,6 +58,42 @@ export const useGetTransactions = (year, month) => {
         fetchTransactions();
     }, [year, month]);
 
+    // Keep the month current from /transactions/live
+    useEffect(() => {
+        const params = new URLSearchParams({
+            year,
+            month,
+            fields: TRANSACTION_FIELDS,
+        });
+        const events = new EventSource(
+            `${apiClient.defaults.baseURL}/transactions/live?${params}`,
+        );
+        // Last content hash seen per account, to spot changes missed while
+        // the stream was reconnecting
+        const hashes = {};
+
+        events.addEventListener("ready", (event) => {
+            const { account, content_hash } = JSON.parse(event.data);
+            if (account in hashes && hashes[account] !== content_hash) {
+                fetchTransactions();
+            }
+            hashes[account] = content_hash;
+        });
+        events.addEventListener("delta", (event) => {
+            const delta = JSON.parse(event.data);
+            hashes[delta.account] = delta.content_hash;
+            pendingDeltas.current?.push(delta);
+            setTransactions((current) => applyDelta(current, delta));
+        });
+        events.addEventListener("changed", (event) => {
+            const { account, content_hash } = JSON.parse(event.data);
+            hashes[account] = content_hash;
+            fetchTransactions();
+        });
+
+        return () => events.close();
+    }, [year, month]);
+
     return {
         transactions,
         transactionsIsLoading: loading,
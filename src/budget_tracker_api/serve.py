@@ -0,0 +1,94 @@
+"""
+Production server: several uvicorn worker processes, no reload, graceful
+shutdown and rolling restarts.
+
+Workers share the SQLite store under .data/ and coordinate through the file
+locks in .data/locks/, so a month missed by every worker is fetched from Plaid
+once, migrations run once at boot and a single worker runs the prefetch
+scheduler.
+
+Signals to the parent process:
+    SIGHUP   replace workers one at a time: each old worker drains and
+             exits, then its replacement starts, so the others keep serving
+             (with --workers 1 there is a gap until the new worker is up)
+    SIGTTIN  add a worker, SIGTTOU removes one
+    SIGTERM  drain in-flight requests for up to --graceful-timeout and exit
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Where the app is served
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+# Worker processes, one per core by default
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# Seconds a stopping worker gets to finish in-flight requests
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30"))
+# Seconds an idle keep-alive connection is held open
+KEEP_ALIVE_SECONDS = int(os.getenv("KEEP_ALIVE_SECONDS", "5"))
+# Recycle a worker after this many requests (0 never recycles)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+# Proxies trusted to set X-Forwarded-For/Proto, comma separated or "*"
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve the Budget Tracker API with multiple worker processes."
+    )
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=WEB_CONCURRENCY,
+        help="Worker processes (default WEB_CONCURRENCY or the CPU count)",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=GRACEFUL_TIMEOUT_SECONDS,
+        help="Seconds to drain in-flight requests on shutdown or restart",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=MAX_REQUESTS,
+        help="Recycle each worker after this many requests (0 never recycles)",
+    )
+    return parser.parse_args(argv)
+
+
+def start() -> None:
+    """Entry point for `poetry run serve`."""
+    import uvicorn
+
+    from budget_tracker_api.app.utils.structured_logging import configure_logging
+
+    load_dotenv()
+    args = parse_args(sys.argv[1:])
+    if args.workers < 1:
+        sys.exit("--workers must be at least 1")
+
+    # The parent logs through the same JSON pipeline as the workers
+    configure_logging()
+    uvicorn.run(
+        "budget_tracker_api.app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        reload=False,
+        log_config=None,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        limit_max_requests=args.max_requests or None,
+    )
+
+
+if __name__ == "__main__":
+    start()
@@ -0,0 +1,91 @@
+"""Command line import of bank CSV and OFX/QFX statements."""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from budget_tracker_api.app.services.import_service import (
+    IMPORT_FORMATS,
+    ImportService,
+    detect_format,
+)
+from budget_tracker_api.app.utils.database import init_db
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Import bank CSV and OFX/QFX statements into the local store."
+    )
+    parser.add_argument("files", nargs="+", help="Statement files to import")
+    parser.add_argument(
+        "--account",
+        default=os.getenv("ACCOUNT_TO_FILTER"),
+        help="Account name to file the transactions under (default ACCOUNT_TO_FILTER)",
+    )
+    parser.add_argument(
+        "--format", choices=list(IMPORT_FORMATS), help="Default: file extension"
+    )
+    parser.add_argument(
+        "--date-format", help="strptime format for CSV dates, e.g. %%d/%%m/%%Y"
+    )
+    parser.add_argument(
+        "--amount-sign",
+        default="bank",
+        choices=["bank", "plaid"],
+        help="Whether negative CSV amounts are money out (bank) or in (plaid)",
+    )
+    return parser.parse_args(argv)
+
+
+def print_progress(summary: dict) -> None:
+    """Overwrite one status line per file on stderr."""
+    total = summary["total_bytes"]
+    percent = f"{summary['bytes_read'] * 100 // total:3d}%" if total else "   "
+    print(
+        f"\r📥 {summary['file']}: {percent} {summary['rows']} rows, "
+        f"{summary['inserted']} new, {summary['duplicates']} duplicates, "
+        f"{summary['errors']} errors",
+        end="",
+        file=sys.stderr,
+    )
+
+
+def start() -> None:
+    """Entry point for `poetry run import-statements`."""
+    load_dotenv()
+    args = parse_args(sys.argv[1:])
+    init_db()
+
+    service = ImportService()
+    failed = False
+    for path in args.files:
+        file_format = args.format or detect_format(path)
+        with open(path, "rb") as stream:
+            summary, _, error = service.import_file(
+                stream,
+                args.account,
+                file_format,
+                os.path.basename(path),
+                os.path.getsize(path),
+                args.date_format,
+                args.amount_sign == "bank",
+                print_progress,
+            )
+
+        if error:
+            print(f"\n❌ {error}", file=sys.stderr)
+            failed = True
+            continue
+
+        print_progress(summary)
+        print(f" in {summary['seconds']}s", file=sys.stderr)
+        for message in summary["error_samples"]:
+            print(f"   ⚠️  {message}", file=sys.stderr)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    start()
@@ -0,0 +1,60 @@
+"""Unknown account names must not cost a Plaid round-trip per request."""
+import pytest
+
+from budget_tracker_api.app.services import account_service
+from budget_tracker_api.app.services.account_service import AccountService
+from budget_tracker_api.app.utils import database, encryption, file_locks, storage
+
+
+class FakePlaidClient:
+    """Counts accounts_get calls."""
+
+    def __init__(self) -> None:
+        self.accounts_gets = 0
+
+    def get_accounts(self, access_token: str) -> list[dict]:
+        self.accounts_gets += 1
+        return [{"account_id": "acc-1", "name": "checking"}]
+
+
+@pytest.fixture(autouse=True)
+def temp_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(database, "DB_FILE", tmp_path / "budget_tracker.db")
+    monkeypatch.setattr(storage, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(storage, "_linked_items", None)
+    monkeypatch.setattr(file_locks, "LOCK_DIR", tmp_path / "locks")
+    monkeypatch.setattr(encryption, "TOKEN_KEY_FILE", tmp_path / "token.key")
+    database.init_db()
+    storage.save_access_token("access-token", "item-1")
+    yield
+    database.close_connection()
+
+
+def test_known_account_is_resolved_from_cache():
+    client = FakePlaidClient()
+    service = AccountService(client)
+
+    for _ in range(3):
+        account, _ = service.resolve_account("checking")
+        assert account["account_id"] == "acc-1"
+
+    assert client.accounts_gets == 1
+
+
+def test_unknown_accounts_force_one_refresh_per_interval(monkeypatch):
+    client = FakePlaidClient()
+    service = AccountService(client)
+    service.resolve_account("checking")
+
+    for name in ("savings", "savings", "brokerage"):
+        account, accounts = service.resolve_account(name)
+        assert account is None
+        assert [acc["name"] for acc in accounts] == ["checking"]
+
+    assert client.accounts_gets == 2
+
+    monkeypatch.setattr(account_service, "ACCOUNTS_MISS_REFRESH_SECONDS", 0)
+    service.resolve_account("savings")
+
+    assert client.accounts_gets == 3
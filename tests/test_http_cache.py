@@ -0,0 +1,76 @@
+"""Content coding negotiation and the validators of compressed responses."""
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from budget_tracker_api.app.utils.http_cache import (
+    CompressionMiddleware,
+    ConditionalGetMiddleware,
+    negotiate_encoding,
+)
+
+ETAG = '"month"'
+BODY = b"[" + b"0," * 1024 + b"0]"
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "encoding"),
+    [
+        ("gzip, deflate", "gzip"),
+        ("GZIP;q=0.5", "gzip"),
+        ("gzip;q=0", None),
+        ("gzip; q=0.000", None),
+        ("*", "gzip"),
+        ("*;q=0", None),
+        ("*, gzip;q=0", None),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, encoding):
+    assert negotiate_encoding(accept_encoding, ("gzip",)) == encoding
+
+
+def test_negotiate_encoding_prefers_higher_qvalue():
+    assert negotiate_encoding("br;q=0.5, gzip", ("br", "gzip")) == "gzip"
+    assert negotiate_encoding("br, gzip", ("br", "gzip")) == "br"
+
+
+@pytest.fixture
+def client() -> TestClient:
+    def month(request):
+        return Response(BODY, media_type="application/json", headers={"ETag": ETAG})
+
+    app = Starlette(routes=[Route("/month", month)])
+    app.add_middleware(ConditionalGetMiddleware)
+    app.add_middleware(CompressionMiddleware)
+    return TestClient(app)
+
+
+def test_not_modified_repeats_the_compressed_etag(client):
+    full = client.get("/month", headers={"Accept-Encoding": "gzip"})
+    assert full.headers["content-encoding"] == "gzip"
+
+    revalidated = client.get(
+        "/month",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": full.headers["etag"]},
+    )
+
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == full.headers["etag"] == '"month-gzip"'
+    assert "Accept-Encoding" in revalidated.headers["vary"]
+
+
+def test_refused_coding_is_not_used(client):
+    full = client.get("/month", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in full.headers
+
+    revalidated = client.get(
+        "/month",
+        headers={"Accept-Encoding": "gzip;q=0", "If-None-Match": ETAG},
+    )
+
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == ETAG
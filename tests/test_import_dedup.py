@@ -0,0 +1,92 @@
+"""Plaid transactions and imported statement rows must not be counted twice."""
+import io
+
+import pytest
+
+from budget_tracker_api.app.services.import_service import ImportService
+from budget_tracker_api.app.utils import database, storage
+
+ACCOUNT = "checking"
+STATEMENT = b"Date,Description,Amount\n2024-03-04,POS 4411 COFFEE SHOP #12,-4.50\n"
+
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(database, "DB_FILE", tmp_path / "budget_tracker.db")
+    database.init_db()
+    yield
+    database.close_connection()
+
+
+def plaid_transaction(day: str) -> dict:
+    return {
+        "transaction_id": "plaid-1",
+        "account_id": "acc-1",
+        "date": day,
+        "name": "Coffee Shop",
+        "amount": 4.5,
+        "personal_finance_category": {"primary": "FOOD_AND_DRINK"},
+    }
+
+
+def import_statement(data: bytes = STATEMENT) -> dict:
+    summary, status, error = ImportService().import_file(
+        io.BytesIO(data), ACCOUNT, "csv"
+    )
+    assert status == 200, error
+    return summary
+
+
+def stored_ids() -> list[str]:
+    cursor = database.get_connection().cursor()
+    cursor.execute("SELECT transaction_id FROM transactions ORDER BY 1")
+    return [row[0] for row in cursor.fetchall()]
+
+
+@pytest.mark.parametrize("plaid_day", ["2024-03-04", "2024-03-03", "2024-03-05"])
+def test_plaid_after_import_replaces_imported_row(plaid_day):
+    assert import_statement()["inserted"] == 1
+
+    database.upsert_transactions([(ACCOUNT, plaid_transaction(plaid_day))])
+
+    assert stored_ids() == ["plaid-1"]
+
+
+@pytest.mark.parametrize("plaid_day", ["2024-03-04", "2024-03-03", "2024-03-05"])
+def test_import_after_plaid_skips_stored_row(plaid_day):
+    database.upsert_transactions([(ACCOUNT, plaid_transaction(plaid_day))])
+
+    summary = import_statement()
+
+    assert (summary["inserted"], summary["duplicates"]) == (0, 1)
+    assert stored_ids() == ["plaid-1"]
+
+
+def test_each_stored_row_absorbs_one_imported_row():
+    database.upsert_transactions([(ACCOUNT, plaid_transaction("2024-03-04"))])
+
+    summary = import_statement(STATEMENT + STATEMENT.split(b"\n", 1)[1])
+
+    assert (summary["inserted"], summary["duplicates"]) == (1, 1)
+    assert len(stored_ids()) == 2
+
+
+def test_other_amounts_and_days_are_kept():
+    import_statement()
+
+    database.upsert_transactions([(ACCOUNT, plaid_transaction("2024-03-06"))])
+
+    assert len(stored_ids()) == 2
+
+
+def test_imported_rows_do_not_count_as_fetched_from_plaid():
+    import_statement()
+
+    assert storage.get_month_freshness(ACCOUNT, "2024", "03") is None
+
+    storage.save_cached_transactions(
+        ACCOUNT, "2024", "03", [dict(plaid_transaction("2024-03-20"), amount=9.0)]
+    )
+
+    assert len(stored_ids()) == 2
@@ -0,0 +1,55 @@
+"""/metrics reports totals over every worker process."""
+import os
+import time
+
+import orjson
+import pytest
+
+from budget_tracker_api.app.utils import metrics
+
+REQUESTS = ("requests_total", "counter", "Requests", [({"route": "/a"}, 2)])
+IN_FLIGHT = ("in_flight", "gauge", "Calls in flight", [({}, 1)])
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", tmp_path)
+    return tmp_path
+
+
+def write_worker_snapshot(directory, pid: int, age_seconds: float = 0) -> None:
+    path = directory / f"{pid}.json"
+    path.write_bytes(orjson.dumps([REQUESTS, IN_FLIGHT]))
+    modified = time.time() - age_seconds
+    os.utime(path, (modified, modified))
+
+
+def totals(families) -> dict:
+    return {name: [value for _, value in samples] for name, _, _, samples in families}
+
+
+def test_live_workers_are_summed(metrics_dir):
+    write_worker_snapshot(metrics_dir, os.getpid() + 1)
+
+    merged = metrics.all_worker_metrics([REQUESTS, IN_FLIGHT])
+
+    assert totals(merged) == {"requests_total": [4], "in_flight": [2]}
+
+
+def test_dead_workers_keep_counters_but_not_gauges(metrics_dir):
+    write_worker_snapshot(
+        metrics_dir, os.getpid() + 1, metrics.METRICS_STALE_SECONDS + 1
+    )
+
+    merged = metrics.all_worker_metrics([REQUESTS, IN_FLIGHT])
+
+    assert totals(merged) == {"requests_total": [4], "in_flight": [1]}
+
+
+def test_retired_workers_keep_counting(metrics_dir):
+    metrics.publish_metrics([REQUESTS, IN_FLIGHT])
+    metrics.retire_metrics([REQUESTS, IN_FLIGHT])
+
+    assert not (metrics_dir / f"{os.getpid()}.json").exists()
+    merged = metrics.all_worker_metrics([REQUESTS, IN_FLIGHT])
+    assert totals(merged) == {"requests_total": [4], "in_flight": [1]}
@@ -0,0 +1,62 @@
+"""/transactions/sync restarts after mid-pagination changes, but not forever."""
+import json
+
+import pytest
+from plaid import ApiException
+
+from budget_tracker_api.app.services import plaid_client
+from budget_tracker_api.app.services.plaid_client import PlaidClient
+
+MUTATION_ERROR = {
+    "error_type": "TRANSACTIONS_ERROR",
+    "error_code": "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION",
+}
+
+
+class MutatingTransport:
+    """Fails the second page of every sync until `failures` run out."""
+
+    backoff_seconds = 0.0
+
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.cursors = []
+
+    def call(self, operation: str, request) -> dict:
+        cursor = request.get("cursor")
+        self.cursors.append(cursor)
+        if cursor == "page-2" and self.failures:
+            self.failures -= 1
+            error = ApiException(status=400, reason="Bad Request")
+            error.body = json.dumps(MUTATION_ERROR)
+            raise error
+        return {
+            "added": [],
+            "modified": [],
+            "removed": [],
+            "has_more": cursor != "page-2",
+            "next_cursor": "page-2" if cursor != "page-2" else "done",
+        }
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(plaid_client.time, "sleep", lambda seconds: None)
+
+
+def test_sync_restarts_from_the_starting_cursor():
+    transport = MutatingTransport(failures=plaid_client.SYNC_MAX_RESTARTS)
+
+    delta = PlaidClient(transport).sync_transactions("token", "start")
+
+    assert delta["next_cursor"] == "done"
+    assert transport.cursors.count("start") == plaid_client.SYNC_MAX_RESTARTS + 1
+
+
+def test_sync_gives_up_after_max_restarts():
+    transport = MutatingTransport(failures=plaid_client.SYNC_MAX_RESTARTS + 1)
+
+    with pytest.raises(ApiException):
+        PlaidClient(transport).sync_transactions("token", "start")
+
+    assert transport.cursors.count("start") == plaid_client.SYNC_MAX_RESTARTS + 1
@@ -0,0 +1,99 @@
+"""A prefetch pass costs one sync, however many open months it keeps warm."""
+import asyncio
+import time
+from datetime import date
+
+import pytest
+
+from budget_tracker_api.app.services.prefetch_scheduler import (
+    PrefetchScheduler,
+    _shift_month,
+)
+from budget_tracker_api.app.services.transaction_service import TransactionService
+from budget_tracker_api.app.utils import (
+    database,
+    encryption,
+    file_locks,
+    metrics,
+    storage,
+)
+
+ACCOUNT = "checking"
+MONTHS_BACK = 3
+
+
+class FakePlaidClient:
+    """Counts Plaid calls; every item syncs with no changes."""
+
+    def __init__(self) -> None:
+        self.syncs = 0
+        self.month_fetches = 0
+
+    def get_accounts(self, access_token: str) -> list[dict]:
+        return [{"account_id": "acc-1", "name": ACCOUNT}]
+
+    def sync_transactions(self, access_token: str, cursor=None) -> dict:
+        self.syncs += 1
+        return {"added": [], "modified": [], "removed": [], "next_cursor": "c1"}
+
+    def get_transactions(self, access_token, account_id, year, month) -> list:
+        self.month_fetches += 1
+        return []
+
+
+@pytest.fixture(autouse=True)
+def temp_data(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(database, "DB_FILE", tmp_path / "budget_tracker.db")
+    monkeypatch.setattr(storage, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(storage, "SYNC_CURSOR_FILE", tmp_path / "sync-cursors.json")
+    monkeypatch.setattr(storage, "_linked_items", None)
+    monkeypatch.setattr(file_locks, "LOCK_DIR", tmp_path / "locks")
+    monkeypatch.setattr(encryption, "TOKEN_KEY_FILE", tmp_path / "token.key")
+    monkeypatch.setattr(metrics, "METRICS_DIR", tmp_path / "metrics")
+    monkeypatch.setenv("ACCOUNT_TO_FILTER", ACCOUNT)
+    database.init_db()
+    storage.save_access_token("access-token", "item-1")
+    yield
+    database.close_connection()
+
+
+def fetch_recent_months(fetched_at: float) -> None:
+    """Record the scheduler's months as fetched at `fetched_at`."""
+    today = date.today()
+    months = storage.month_range(_shift_month(today, -MONTHS_BACK), f"{today:%Y-%m}")
+    for year, month in months:
+        database.save_cached_month(
+            ACCOUNT, f"{year}-{month}", fetched_at, storage.is_month_closed(year, month)
+        )
+
+
+def run_pass(client: FakePlaidClient) -> None:
+    scheduler = PrefetchScheduler(
+        TransactionService(client=client),
+        months_back=MONTHS_BACK,
+        min_interval_seconds=0,
+    )
+    asyncio.run(scheduler.run_once())
+    assert scheduler.status()["last_error"] is None
+
+
+def test_stale_open_months_are_current_after_the_pass_sync():
+    fetch_recent_months(time.time() - storage.OPEN_MONTH_TTL_SECONDS - 60)
+    client = FakePlaidClient()
+
+    run_pass(client)
+
+    assert client.syncs == 1
+    assert client.month_fetches == 0
+
+
+def test_later_passes_sync_once_each():
+    fetch_recent_months(time.time() - storage.OPEN_MONTH_TTL_SECONDS - 60)
+    client = FakePlaidClient()
+
+    run_pass(client)
+    run_pass(client)
+
+    assert client.syncs == 2
+    assert client.month_fetches == 0
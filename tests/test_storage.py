@@ -0,0 +1,48 @@
+"""Refetching a month replaces its stored rows in a single commit."""
+import pytest
+
+from budget_tracker_api.app.utils import database, storage
+
+ACCOUNT = "checking"
+
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(database, "DB_FILE", tmp_path / "budget_tracker.db")
+    monkeypatch.setattr(database, "_change_listeners", [])
+    database.init_db()
+    yield
+    database.close_connection()
+
+
+def plaid_transaction(transaction_id: str, day: str, amount: float) -> dict:
+    return {
+        "transaction_id": transaction_id,
+        "account_id": "acc-1",
+        "date": day,
+        "name": "Coffee Shop",
+        "amount": amount,
+    }
+
+
+def test_refetched_month_is_replaced_in_one_commit():
+    storage.save_cached_transactions(
+        ACCOUNT, "2024", "03", [plaid_transaction("old", "2024-03-04", 4.5)]
+    )
+    changes = []
+    database.add_change_listener(changes.append)
+
+    storage.save_cached_transactions(
+        ACCOUNT, "2024", "03", [plaid_transaction("new", "2024-03-05", 6.0)]
+    )
+
+    stored = storage.get_cached_transactions(ACCOUNT, "2024", "03")
+    assert [record.transaction_id for record in stored] == ["new"]
+    (commit,) = changes
+    (month,) = commit
+    assert (month.year_month, month.added, month.removed) == (
+        "2024-03",
+        ["new"],
+        ["old"],
+    )
@@ -0,0 +1,39 @@
+"""Projected records must match what Plaid sent for the projected fields."""
+import pytest
+
+from budget_tracker_api.app.utils import database
+
+FIELDS = ("category", "personal_finance_category")
+
+
+@pytest.fixture(autouse=True)
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(database, "DB_FILE", tmp_path / "budget_tracker.db")
+    database.init_db()
+    yield
+    database.close_connection()
+
+
+def stored_projection(**fields) -> dict:
+    tx = {"transaction_id": "tx-1", "date": "2024-03-04", "amount": 4.5, **fields}
+    database.upsert_transactions([("checking", tx)])
+    (record,) = database.get_transactions_by_ids(["tx-1"])
+    return record.to_dict(FIELDS)
+
+
+def test_personal_finance_category_is_projected():
+    assert stored_projection(
+        personal_finance_category={"primary": "FOOD_AND_DRINK"},
+        category=["Food and Drink", "Restaurants"],
+    ) == {
+        "category": "FOOD_AND_DRINK",
+        "personal_finance_category": {"primary": "FOOD_AND_DRINK"},
+    }
+
+
+def test_legacy_category_is_not_projected_as_personal_finance_category():
+    assert stored_projection(category=["Food and Drink", "Restaurants"]) == {
+        "category": "Food and Drink",
+        "personal_finance_category": None,
+    }
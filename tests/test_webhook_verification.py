@@ -0,0 +1,107 @@
+"""Plaid-Verification checks, including abuse of the unauthenticated kid."""
+import base64
+import hashlib
+import time
+
+import orjson
+import pytest
+
+ec = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.ec")
+from cryptography.hazmat.primitives import hashes  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric.utils import (  # noqa: E402
+    decode_dss_signature,
+)
+
+from budget_tracker_api.app.utils import webhook_verification  # noqa: E402
+from budget_tracker_api.app.utils.webhook_verification import (  # noqa: E402
+    WebhookVerifier,
+)
+
+BODY = b'{"webhook_type": "TRANSACTIONS"}'
+PRIVATE_KEY = ec.generate_private_key(ec.SECP256R1())
+
+
+def b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def jwk() -> dict:
+    numbers = PRIVATE_KEY.public_key().public_numbers()
+    return {
+        "kty": "EC",
+        "crv": "P-256",
+        "x": b64url(numbers.x.to_bytes(32, "big")),
+        "y": b64url(numbers.y.to_bytes(32, "big")),
+        "expired_at": None,
+    }
+
+
+def token(kid: str = "key-1", issued_at: float = None, body: bytes = BODY) -> str:
+    header = b64url(orjson.dumps({"alg": "ES256", "kid": kid}))
+    claims = b64url(orjson.dumps({
+        "iat": int(time.time() if issued_at is None else issued_at),
+        "request_body_sha256": hashlib.sha256(body).hexdigest(),
+    }))
+    r, s = decode_dss_signature(
+        PRIVATE_KEY.sign(f"{header}.{claims}".encode(), ec.ECDSA(hashes.SHA256()))
+    )
+    return f"{header}.{claims}.{b64url(r.to_bytes(32, 'big') + s.to_bytes(32, 'big'))}"
+
+
+class KeyServer:
+    def __init__(self, known: tuple[str, ...] = ("key-1",)) -> None:
+        self.known = known
+        self.calls: list[str] = []
+
+    def __call__(self, key_id: str) -> dict:
+        self.calls.append(key_id)
+        if key_id not in self.known:
+            raise LookupError(f"No key {key_id}")
+        return jwk()
+
+
+def test_valid_token_fetches_its_key_once():
+    keys = KeyServer()
+    verifier = WebhookVerifier(keys)
+
+    verifier.verify(BODY, token())
+    verifier.verify(BODY, token())
+
+    assert keys.calls == ["key-1"]
+
+
+def test_future_token_is_rejected_without_fetching_a_key():
+    keys = KeyServer()
+
+    with pytest.raises(ValueError, match="future"):
+        WebhookVerifier(keys).verify(BODY, token(issued_at=time.time() + 3600))
+    assert keys.calls == []
+
+
+def test_unknown_key_ids_are_cached_and_rate_limited():
+    keys = KeyServer()
+    verifier = WebhookVerifier(keys)
+
+    with pytest.raises(LookupError):
+        verifier.verify(BODY, token(kid="forged-1"))
+    with pytest.raises(ValueError, match="Unknown verification key"):
+        verifier.verify(BODY, token(kid="forged-1"))
+    with pytest.raises(ValueError, match="rate limited"):
+        verifier.verify(BODY, token(kid="forged-2"))
+
+    assert keys.calls == ["forged-1"]
+
+
+def test_key_caches_are_bounded(monkeypatch):
+    monkeypatch.setattr(webhook_verification, "WEBHOOK_KEY_FETCH_INTERVAL_SECONDS", 0)
+    keys = KeyServer()
+    verifier = WebhookVerifier(keys)
+
+    verifier.verify(BODY, token())
+    for index in range(webhook_verification.WEBHOOK_KEY_CACHE_SIZE * 2):
+        with pytest.raises(LookupError):
+            verifier.verify(BODY, token(kid=f"forged-{index}"))
+    verifier.verify(BODY, token())
+
+    assert len(verifier._misses) == webhook_verification.WEBHOOK_KEY_CACHE_SIZE
+    assert keys.calls.count("key-1") == 1